@@ -0,0 +1,197 @@
+"""
+Content-addressed store for downloadable outputs.
+
+Generated resumes and cover letters used to be written to a fresh
+NamedTemporaryFile on every generation, none of which was ever deleted. Now
+each text is stored once under its SHA-256:
+
+    ARTIFACT_DIR/ab/abcdef.../tailored_resume.txt
+                              tailored_resume.pdf
+
+render(text, name, fmt) returns the path of the text in one of FORMATS,
+rendering it on first request and reusing the file afterwards (so a regen
+that produces the same text writes nothing). Files are written atomically,
+so several processes can share the directory. Every use refreshes a file's
+mtime, and collect_garbage() deletes files unused for ARTIFACT_MAX_AGE_DAYS
+and then the least recently used ones until the store fits in
+ARTIFACT_MAX_BYTES; it runs at most every ARTIFACT_GC_INTERVAL seconds.
+
+.docx needs python-docx; .txt, .md and .pdf have no dependencies (PDFs use
+the standard Helvetica font, so characters outside Windows-1252 become "?").
+"""
+
+import hashlib
+import importlib.util
+import io
+import os
+import textwrap
+import threading
+import time
+
+ARTIFACT_DIR = os.environ.get('ARTIFACT_DIR', 'artifacts')
+ARTIFACT_MAX_BYTES = int(os.environ.get('ARTIFACT_MAX_BYTES', 200 * 1024 * 1024))
+ARTIFACT_MAX_AGE_DAYS = float(os.environ.get('ARTIFACT_MAX_AGE_DAYS', 7))
+ARTIFACT_GC_INTERVAL = float(os.environ.get('ARTIFACT_GC_INTERVAL', 3600))
+
+
+def _blocks(text):
+    # Plain-text resume structure: capitalized headings, "- " bullets, paragraphs and blank lines
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            yield 'blank', ''
+        elif stripped.startswith(('- ', '* ', '• ')):
+            yield 'bullet', stripped[2:].strip()
+        elif stripped.isupper() and len(stripped) <= 60:
+            yield 'heading', stripped
+        else:
+            yield 'para', stripped
+
+
+def render_txt(text):
+    return text.encode('utf-8')
+
+
+def render_md(text):
+    lines = []
+    for kind, line in _blocks(text):
+        lines.append({'heading': f"## {line.title()}", 'bullet': f"- {line}"}.get(kind, line))
+    return '\n'.join(lines).encode('utf-8')
+
+
+def render_docx(text):
+    import docx
+    document = docx.Document()
+    for kind, line in _blocks(text):
+        if kind == 'heading':
+            document.add_heading(line.title(), level=2)
+        elif kind == 'bullet':
+            document.add_paragraph(line, style='List Bullet')
+        elif kind == 'para':
+            document.add_paragraph(line)
+    out = io.BytesIO()
+    document.save(out)
+    return out.getvalue()
+
+
+def render_pdf(text, width_chars=95, lines_per_page=57):
+    """A plain Letter-size text PDF: Helvetica 10pt, bold headings, wrapped lines, as many pages as needed."""
+    rows = []
+    for kind, line in _blocks(text):
+        if kind == 'heading':
+            rows += [('F1', ''), ('F2', line)]
+        elif kind == 'bullet':
+            wrapped = textwrap.wrap(line, width_chars - 4) or ['']
+            rows += [('F1', '- ' + wrapped[0])] + [('F1', '  ' + rest) for rest in wrapped[1:]]
+        else:
+            rows += [('F1', part) for part in (textwrap.wrap(line, width_chars) or [''])]
+    pages = [rows[i:i + lines_per_page] for i in range(0, len(rows), lines_per_page)] or [[]]
+
+    def escape(s):
+        return s.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+    font = "<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>"
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>",
+               "<< /Type /Pages /Kids [%s] /Count %d >>" % (' '.join(f"{5 + 2 * i} 0 R" for i in range(len(pages))), len(pages)),
+               font % 'Helvetica', font % 'Helvetica-Bold']
+    for i, page in enumerate(pages):
+        stream = "BT 12 TL 54 740 Td " + ' '.join(f"/{f} 10 Tf ({escape(s)}) Tj T*" for f, s in page) + " ET"
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents {6 + 2 * i} 0 R >>")
+        objects.append(stream)
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        if number > 4 and number % 2 == 0:
+            data = body.encode('cp1252', 'replace')
+            out += f"{number} 0 obj\n<< /Length {len(data)} >>\nstream\n".encode() + data + b"\nendstream\nendobj\n"
+        else:
+            out += f"{number} 0 obj\n{body}\nendobj\n".encode('latin-1')
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += ''.join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+# format -> (renderer, module it needs)
+FORMATS = {
+    'txt': (render_txt, None),
+    'md': (render_md, None),
+    'docx': (render_docx, 'docx'),
+    'pdf': (render_pdf, None),
+}
+
+
+def available_formats():
+    return [fmt for fmt, (_, module) in FORMATS.items() if module is None or importlib.util.find_spec(module) is not None]
+
+
+_gc_lock = threading.Lock()
+_last_gc = 0.0
+
+
+def render(text, name, fmt='txt', root=None):
+    """Path of `text` rendered as `fmt` and saved as <name>.<fmt>; written only if not stored already."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown artifact format {fmt!r}; expected one of {', '.join(FORMATS)}")
+    root = root or ARTIFACT_DIR
+    digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    directory = os.path.join(root, digest[:2], digest)
+    path = os.path.abspath(os.path.join(directory, f"{name}.{fmt}"))
+    try:
+        # Mark as recently used for garbage collection
+        os.utime(path)
+    except FileNotFoundError:
+        data = FORMATS[fmt][0](text)
+        os.makedirs(directory, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+        maybe_collect_garbage(root)
+    return path
+
+
+def maybe_collect_garbage(root=None):
+    global _last_gc
+    with _gc_lock:
+        if time.monotonic() - _last_gc < ARTIFACT_GC_INTERVAL and _last_gc:
+            return
+        _last_gc = time.monotonic()
+    collect_garbage(root)
+
+
+def collect_garbage(root=None, max_bytes=ARTIFACT_MAX_BYTES, max_age_days=ARTIFACT_MAX_AGE_DAYS):
+    """Delete artifacts older than max_age_days, then the least recently used until under max_bytes; returns how many."""
+    root = root or ARTIFACT_DIR
+    files = []
+    for directory, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+    files.sort()
+    cutoff = time.time() - max_age_days * 86400
+    total = sum(size for _, size, _ in files)
+    removed = 0
+    for mtime, size, path in files:
+        if mtime >= cutoff and total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+    # Drop directories emptied above, deepest first
+    for directory, _, _ in os.walk(root, topdown=False):
+        if directory != root and not os.listdir(directory):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                pass
+    return removed
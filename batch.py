@@ -0,0 +1,131 @@
+"""
+Batch generation: fan a list of job postings out to a bounded worker pool.
+
+Jobs are read from JSONL, one posting per line. Lines may use the full field
+names accepted by tailor_application_pdf (job_description, company_name,
+job_title, ...) or the short request shape ({"request_id", "title", "body"}).
+
+LLM calls are additionally gated per backend by BackendLimiter so a large
+worker pool cannot exceed what a provider (or a local LMStudio box) accepts.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS', 8))
+
+# Max in-flight LLM requests per backend, e.g. LLM_CONCURRENCY_OPENAI=8
+DEFAULT_BACKEND_CONCURRENCY = {'openai': 8, 'lmstudio': 1}
+
+JOB_DEFAULTS = {
+    'company_details': 'Direct to company',
+    'company_name': '',
+    'job_title': '',
+    'job_url': '',
+    'mode': 'Resume',
+    'tone': 'Formal',
+    'emphasis': '',
+    'pdf_file': None,
+    'extractor': None,
+}
+
+
+class BackendLimiter:
+    def __init__(self, limits=None):
+        self._limits = dict(DEFAULT_BACKEND_CONCURRENCY)
+        for backend in list(self._limits):
+            env = os.environ.get(f'LLM_CONCURRENCY_{backend.upper()}')
+            if env:
+                self._limits[backend] = int(env)
+        self._limits.update(limits or {})
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def _semaphore(self, backend):
+        with self._lock:
+            if backend not in self._semaphores:
+                self._semaphores[backend] = threading.BoundedSemaphore(self._limits.get(backend, 4))
+            return self._semaphores[backend]
+
+    @contextmanager
+    def slot(self, backend):
+        sem = self._semaphore(backend)
+        sem.acquire()
+        try:
+            yield
+        finally:
+            sem.release()
+
+
+backend_limits = BackendLimiter()
+
+
+def parse_job(obj, index):
+    job = dict(JOB_DEFAULTS)
+    job.update({k: v for k, v in obj.items() if k in JOB_DEFAULTS and v is not None})
+    job['id'] = str(obj.get('request_id') or obj.get('id') or index + 1)
+    job['job_description'] = obj.get('job_description') or obj.get('body') or ''
+    if not job['job_title'] and obj.get('title'):
+        job['job_title'] = obj['title']
+    return job
+
+
+def load_jobs_jsonl(lines, defaults=None):
+    jobs = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        obj = dict(defaults or {})
+        obj.update(json.loads(line))
+        jobs.append(parse_job(obj, len(jobs)))
+    return jobs
+
+
+def run_batch(jobs, run_job, max_workers=None):
+    """
+    Run run_job(job, report) for every job on a thread pool.
+
+    run_job calls report(status, message) as it makes progress and returns the
+    final (status, message). Yields a snapshot list of per-job status dicts
+    every time any job changes state, finishing once all jobs are done.
+    """
+    statuses = [{'id': job['id'], 'job_title': job.get('job_title', ''), 'company_name': job.get('company_name', ''),
+                 'status': 'queued', 'message': '', 'started': None, 'elapsed': 0.0} for job in jobs]
+    events = queue.Queue()
+
+    def report(i, status, message=''):
+        entry = statuses[i]
+        entry['status'] = status
+        entry['message'] = message or ''
+        if entry['started'] is not None:
+            entry['elapsed'] = time.time() - entry['started']
+        events.put(i)
+
+    def worker(i, job):
+        statuses[i]['started'] = time.time()
+        report(i, 'running')
+        try:
+            status, message = run_job(job, lambda status, message='': report(i, status, message))
+        except Exception as e:
+            status, message = 'error', str(e)
+        report(i, status, message)
+        events.put(None)
+
+    yield [dict(s) for s in statuses]
+    if not jobs:
+        return
+    with ThreadPoolExecutor(max_workers=max_workers or BATCH_WORKERS) as pool:
+        for i, job in enumerate(jobs):
+            pool.submit(worker, i, job)
+        remaining = len(jobs)
+        while remaining:
+            event = events.get()
+            if event is None:
+                remaining -= 1
+            yield [dict(s) for s in statuses]
@@ -0,0 +1,283 @@
+"""
+End-to-end generation benchmark against a local mock LLM server.
+
+Starts benchmarks/mock_llm.py in-process (or uses --mock-url), points the
+bot and the submitter's LLMClient at it, and drives concurrent
+generations, then regenerations of what was generated, then raw LLMClient
+calls. Everything runs against a throwaway database and caches. Reports
+per scenario p50/p95/p99 latency, throughput and errors; per telemetry
+span (pdf_extract, db_read, llm, ...) the same percentiles; and database
+contention from the connection pool (checkouts that waited, lock errors).
+
+    python benchmarks/e2e.py -n 40 --concurrency 8 --latency 0.3 --tokens-per-sec 80
+    python benchmarks/e2e.py --save baseline.json
+    python benchmarks/e2e.py --compare baseline.json   # exits 1 on a regression
+
+Rate limits (LLM_RPM_/LLM_TPM_OPENAI) only apply when set, so by default
+the numbers measure the application, not the limiter.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from mock_llm import add_server_arguments, server_from_args
+
+JOB_DESCRIPTION = """Acme Corp is hiring a Data Engineer to build and run our analytics platform.
+You will design batch and streaming pipelines in Python and SQL, own data quality, and work with
+analysts and product managers. Experience with Airflow, dbt and a cloud warehouse is a plus."""
+
+RESUME_LINES = [
+    "Jane Doe - Senior Data Engineer", "jane@example.com | +1 555 0100 | Remote",
+    "EXPERIENCE", "Globex (2019-2024): built Python/SQL pipelines moving 4 TB a day; cut warehouse cost 30%.",
+    "Initech (2015-2019): owned Airflow scheduling for 300 DAGs; led the dbt migration.",
+    "SKILLS", "Python, SQL, Airflow, dbt, Spark, Kafka, BigQuery, Snowflake, Terraform",
+    "EDUCATION", "BSc Computer Science, State University",
+]
+
+
+def make_sample_pdf(path, pages=2):
+    """Write a small text PDF (Helvetica, one block of resume lines per page) without extra dependencies."""
+    def escape(text):
+        return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>",
+               "<< /Type /Pages /Kids [%s] /Count %d >>" % (' '.join(f"{4 + 2 * i} 0 R" for i in range(pages)), pages),
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    for i in range(pages):
+        text = ' T* '.join(f"({escape(line)}) Tj" for line in RESUME_LINES)
+        stream = f"BT /F1 11 Tf 14 TL 50 740 Td {text} ET"
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>")
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode('latin-1')
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += ''.join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    with open(path, 'wb') as f:
+        f.write(out)
+    return path
+
+
+def percentile(values, q):
+    # Nearest-rank percentile; fine for benchmark-sized samples
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered) + 0.5)) - 1))]
+
+
+def summarize(latencies):
+    return {"count": len(latencies), "p50": percentile(latencies, 50), "p95": percentile(latencies, 95), "p99": percentile(latencies, 99)}
+
+
+def run_scenario(name, tasks, concurrency):
+    """Run the zero-argument callables in `tasks` on `concurrency` threads; each returns an error string or None."""
+    latencies, errors = [], []
+
+    def timed(task):
+        start = time.perf_counter()
+        try:
+            error = task()
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        return time.perf_counter() - start, error
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for elapsed, error in pool.map(timed, tasks):
+            latencies.append(elapsed)
+            if error:
+                errors.append(error)
+    wall = time.perf_counter() - start
+    return {"scenario": name, **summarize(latencies), "errors": len(errors), "first_errors": errors[:3],
+            "wall_s": wall, "throughput_per_s": len(tasks) / wall if wall else None}
+
+
+def span_summary(log_path):
+    spans = {}
+    ttft = []
+    with open(log_path, encoding='utf-8') as f:
+        for line in f:
+            record = json.loads(line)
+            if record.get('event') != 'span':
+                continue
+            spans.setdefault(record['name'], []).append(record['duration_ms'] / 1000)
+            if record['name'] == 'llm' and 'ttft_ms' in record:
+                ttft.append(record['ttft_ms'] / 1000)
+    summary = {name: summarize(values) for name, values in sorted(spans.items())}
+    if ttft:
+        summary['llm.ttft'] = summarize(ttft)
+    return summary
+
+
+def prompt_cache_summary(log_path):
+    # Prompt tokens the backend reported as served from its prefix cache, over all LLM calls that reported any usage
+    sent = cached = calls = 0
+    with open(log_path, encoding='utf-8') as f:
+        for line in f:
+            record = json.loads(line)
+            if record.get('event') == 'span' and record['name'] == 'llm' and 'cached_prompt_tokens' in record:
+                calls += 1
+                sent += record.get('prompt_tokens') or 0
+                cached += record['cached_prompt_tokens']
+    return {"calls": calls, "prompt_tokens": sent, "cached_prompt_tokens": cached}
+
+
+def prepare_environment(tmp, openai_base, lmstudio_url):
+    # Must run before the bot is imported: its modules read these at import time
+    os.environ.update({
+        'OPENAI_API_BASE': openai_base, 'LMSTUDIO_URL': lmstudio_url, 'OPENAI_API_KEY': os.environ.get('OPENAI_API_KEY', 'mock-key'),
+        'FACTS_DB_PATH': os.path.join(tmp, 'bench.db'), 'PDF_CACHE_PATH': os.path.join(tmp, 'pdf_cache.db'),
+        'LLM_CACHE_ENABLED': '0', 'MODEL_REGISTRY_CACHE': os.path.join(tmp, 'model_registry.json'),
+        'TELEMETRY_LOG': os.path.join(tmp, 'spans.jsonl'), 'METRICS_PORT': '0', 'ARTIFACT_DIR': os.path.join(tmp, 'artifacts'),
+    })
+    sys.path.insert(0, REPO_ROOT)
+    sys.path.insert(0, os.path.join(REPO_ROOT, 'resume-o-matic', 'submitter'))
+
+
+def run(args, tmp):
+    mock = None
+    if args.mock_url:
+        base = args.mock_url.rstrip('/')
+    else:
+        mock = server_from_args(args).start()
+        base = mock.url
+    prepare_environment(tmp, base + '/v1', base + '/v1/chat/completions')
+    import datastore
+    import tailored_resume_bot as bot
+    from llm import LLMClient
+    pdf = args.pdf or make_sample_pdf(os.path.join(tmp, 'resume.pdf'), pages=args.pages)
+
+    def generate_task(i):
+        def task():
+            result = bot.generate(JOB_DESCRIPTION, pdf_file=pdf, company_name="Acme Corp", job_title=f"Data Engineer {i}",
+                                  job_url=f"https://example.com/jobs/{i}", bypass_cache=True)
+            return result["message"]
+        return task
+
+    def regen_task(sub_id):
+        def task():
+            message = bot.regenerate(sub_id, bypass_cache=True, force=True)["message"] or ''
+            # Success is reported as "[Info] Regenerated ..."
+            return None if message.startswith("[Info]") else message
+        return task
+
+    def llmclient_task(client, i):
+        def task():
+            client.generate_resume(f"Benchmark prompt {i}. Return only the JSON object.", bypass_cache=True)
+        return task
+
+    # Warm the model registry, tokenizer and connection pools so the first task is not an outlier
+    bot.get_registry("openai")
+    bot.extract_text_from_pdf(pdf)
+
+    results = [run_scenario('generate', [generate_task(i) for i in range(args.n)], args.concurrency)]
+    sub_ids = [row[0] for row in datastore.query('SELECT id FROM submissions ORDER BY id')][:args.regens]
+    if sub_ids:
+        results.append(run_scenario('regenerate', [regen_task(sub_id) for sub_id in sub_ids], args.concurrency))
+    for backend in args.llmclient_backends:
+        client = LLMClient(backend=backend, lmstudio_url=base + '/v1/chat/completions')
+        results.append(run_scenario(f'llmclient.{backend}', [llmclient_task(client, i) for i in range(args.n)], args.concurrency))
+
+    report = {
+        "config": {k: v for k, v in vars(args).items() if k not in ('save', 'compare', 'json')},
+        "scenarios": results,
+        "spans": span_summary(os.environ['TELEMETRY_LOG']),
+        "prompt_cache": prompt_cache_summary(os.environ['TELEMETRY_LOG']),
+        "db": datastore.get_pool().stats(),
+        "mock": dict(mock.counts) if mock else None,
+    }
+    if mock:
+        mock.stop()
+    return report
+
+
+def fmt(seconds):
+    return f"{seconds * 1000:8.1f}" if seconds is not None else f"{'-':>8}"
+
+
+def print_report(report):
+    print(f"{'scenario':<20} {'n':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'ops/s':>8} {'errors':>6}")
+    for s in report["scenarios"]:
+        print(f"{s['scenario']:<20} {s['count']:>5} {fmt(s['p50'])} {fmt(s['p95'])} {fmt(s['p99'])} {s['throughput_per_s']:8.2f} {s['errors']:>6}")
+        for error in s["first_errors"]:
+            print(f"    {error[:120]}")
+    print(f"\n{'span':<20} {'n':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for name, s in report["spans"].items():
+        print(f"{name:<20} {s['count']:>5} {fmt(s['p50'])} {fmt(s['p95'])} {fmt(s['p99'])}")
+    cache = report.get("prompt_cache")
+    if cache and cache["calls"]:
+        print(f"\nPrompt prefix cache: {cache['cached_prompt_tokens']}/{cache['prompt_tokens']} prompt tokens cached "
+              f"({cache['cached_prompt_tokens'] / max(cache['prompt_tokens'], 1):.0%}) over {cache['calls']} LLM calls")
+    db = report["db"]
+    print(f"\nDB pool: {db['acquires']} checkouts, {db['waits']} waited (total {db['wait_seconds'] * 1000:.1f} ms, "
+          f"max {db['max_wait_seconds'] * 1000:.1f} ms), {db['locked_errors']} 'database is locked' errors, {db['timeouts']} checkout timeouts; {db['open']}/{db['size']} connections open")
+    if report["mock"]:
+        m = report["mock"]
+        print(f"Mock LLM: {m['requests']} requests ({m['streamed']} streamed), {m['errors_injected']} injected errors, peak {m['max_in_flight']} in flight")
+
+
+def compare(report, baseline, tolerance):
+    """Regressions against a saved report: p95 latency up or throughput down by more than `tolerance`."""
+    previous = {s['scenario']: s for s in baseline["scenarios"]}
+    problems = []
+    for s in report["scenarios"]:
+        old = previous.get(s['scenario'])
+        if not old:
+            continue
+        if old['p95'] and s['p95'] > old['p95'] * (1 + tolerance):
+            problems.append(f"{s['scenario']}: p95 {old['p95'] * 1000:.0f} -> {s['p95'] * 1000:.0f} ms")
+        if old['throughput_per_s'] and s['throughput_per_s'] < old['throughput_per_s'] * (1 - tolerance):
+            problems.append(f"{s['scenario']}: throughput {old['throughput_per_s']:.2f} -> {s['throughput_per_s']:.2f}/s")
+        if s['errors'] > old['errors']:
+            problems.append(f"{s['scenario']}: errors {old['errors']} -> {s['errors']}")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-n', type=int, default=20, help='generations (and LLMClient calls per backend)')
+    parser.add_argument('--regens', type=int, default=20, help='regenerations of the generated submissions')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--pdf', help='resume PDF to use (default: a generated sample)')
+    parser.add_argument('--pages', type=int, default=2, help='pages in the generated sample PDF')
+    parser.add_argument('--llmclient-backends', type=lambda v: [b for b in v.split(',') if b], default=['openai', 'lmstudio'],
+                        help="comma-separated LLMClient backends to exercise ('' for none)")
+    parser.add_argument('--mock-url', help='use an already running mock (or real) server instead of starting one')
+    add_server_arguments(parser)
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    parser.add_argument('--save', help='write the report to this file')
+    parser.add_argument('--compare', help='fail if worse than the report in this file')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed relative regression for --compare')
+    args = parser.parse_args(argv)
+    with tempfile.TemporaryDirectory() as tmp:
+        report = run(args, tmp)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            problems = compare(report, json.load(f), args.tolerance)
+        for problem in problems:
+            print(f"[REGRESSION] {problem}")
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
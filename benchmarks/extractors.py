@@ -0,0 +1,145 @@
+"""
+Extraction engine benchmark: speed, peak memory and text fidelity per backend.
+
+Runs every installed engine in extractors.EXTRACTORS over a local corpus of
+sample resumes (*.pdf, *.docx). Put the expected text of a sample next to
+it as <name>.txt to get fidelity scores:
+
+    recall   share of the reference words (with multiplicity) found in the output;
+             1.0 means no detail was lost
+    order    difflib similarity of the two word sequences; low when columns,
+             bullets or headings come out scrambled
+
+Each engine runs in a fresh interpreter, parsing in-process (no pool) so
+peak RSS is its own. Usage:
+
+    python benchmarks/extractors.py [--corpus benchmarks/corpus] [--runs 3] [--engines pypdf2,pypdfium2] [--json]
+"""
+
+import argparse
+import collections
+import difflib
+import glob
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def words(text):
+    return re.findall(r'\w+', text.lower())
+
+
+def fidelity(reference, text):
+    ref, out = words(reference), words(text)
+    if not ref:
+        return None
+    recall = sum((collections.Counter(ref) & collections.Counter(out)).values()) / len(ref)
+    order = difflib.SequenceMatcher(None, ref, out, autojunk=False).ratio()
+    return {"recall": recall, "order": order}
+
+
+def peak_rss_mb():
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def corpus_files(corpus):
+    return sorted(path for pattern in ('*.pdf', '*.docx') for path in glob.glob(os.path.join(corpus, pattern)))
+
+
+def probe(engine, corpus, runs):
+    # Runs in the child interpreter: time and measure one engine over the corpus
+    sys.path.insert(0, REPO_ROOT)
+    import extractors
+    page_reader, module, _ = extractors.EXTRACTORS[engine]
+    __import__(module)
+    kind = 'docx' if engine == 'docx' else 'pdf'
+    samples = []
+    for path in corpus_files(corpus):
+        with open(path, 'rb') as f:
+            data = f.read()
+        if extractors.detect_format(data) == kind:
+            samples.append((path, data))
+    baseline = peak_rss_mb()
+    results, total_pages, elapsed = [], 0, 0.0
+    for path, data in samples:
+        entry = {"file": os.path.basename(path)}
+        try:
+            start = time.perf_counter()
+            for _ in range(runs):
+                count, pages = page_reader(data, 0, sys.maxsize)
+            entry["seconds"] = (time.perf_counter() - start) / runs
+        except Exception as e:
+            entry["error"] = f"{type(e).__name__}: {e}"
+            results.append(entry)
+            continue
+        text = ''.join((page_text or '') + "\n" for _, page_text, _ in pages)
+        entry.update(pages=count, failed_pages=sum(1 for _, _, error in pages if error), chars=len(text))
+        total_pages += count
+        elapsed += entry["seconds"]
+        reference = os.path.splitext(path)[0] + '.txt'
+        if os.path.exists(reference):
+            with open(reference, encoding='utf-8') as f:
+                entry["fidelity"] = fidelity(f.read(), text)
+        results.append(entry)
+    return {"engine": engine, "files": results, "pages": total_pages, "seconds": elapsed,
+            "pages_per_s": total_pages / elapsed if elapsed else None, "peak_mb": peak_rss_mb() - baseline}
+
+
+def run_engine(engine, corpus, runs):
+    cmd = [sys.executable, os.path.abspath(__file__), '--probe', engine, '--corpus', corpus, '--runs', str(runs)]
+    out = subprocess.run(cmd, cwd=REPO_ROOT, capture_output=True, text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def mean(values):
+    values = [v for v in values if v is not None]
+    return sum(values) / len(values) if values else None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--corpus', default=os.path.join(REPO_ROOT, 'benchmarks', 'corpus'))
+    parser.add_argument('--runs', type=int, default=3, help='parses per file (timings are averaged)')
+    parser.add_argument('--engines', help='comma-separated engines (default: all installed)')
+    parser.add_argument('--json', action='store_true', help='print raw results as JSON')
+    parser.add_argument('--probe', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    corpus = os.path.abspath(args.corpus)
+    if args.probe:
+        print(json.dumps(probe(args.probe, corpus, args.runs)))
+        return 0
+    if not corpus_files(corpus):
+        print(f"No .pdf or .docx samples in {corpus}", file=sys.stderr)
+        return 1
+    sys.path.insert(0, REPO_ROOT)
+    import extractors
+    engines = args.engines.split(',') if args.engines else extractors.available_extractors()
+    reports = [run_engine(engine, corpus, args.runs) for engine in engines]
+    if args.json:
+        print(json.dumps(reports, indent=2))
+        return 0
+    print(f"{'engine':<10} {'files':>5} {'pages':>6} {'pages/s':>9} {'peak MB':>8} {'recall':>7} {'order':>7} {'errors':>6}")
+    for report in reports:
+        scored = [f["fidelity"] for f in report["files"] if f.get("fidelity")]
+        recall, order = mean([s["recall"] for s in scored]), mean([s["order"] for s in scored])
+        errors = sum(1 for f in report["files"] if f.get("error") or f.get("failed_pages"))
+        rate = f"{report['pages_per_s']:9.1f}" if report["pages_per_s"] else f"{'-':>9}"
+        print(f"{report['engine']:<10} {len(report['files']):>5} {report['pages']:>6} {rate} {report['peak_mb']:8.1f} "
+              f"{recall if recall is not None else float('nan'):7.3f} {order if order is not None else float('nan'):7.3f} {errors:>6}")
+    for report in reports:
+        for f in report["files"]:
+            if f.get("error"):
+                print(f"[{report['engine']}] {f['file']}: {f['error']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""
+Local OpenAI- and LMStudio-compatible mock LLM server for benchmarks.
+
+Serves POST /v1/chat/completions (streaming and not) and GET /v1/models,
+with configurable first-token latency, token rate and error rate, so the
+generation path can be load-tested without spending API money. Replies are
+shaped after the prompt: JSON for the submitter's prompts and metadata
+extraction, plain text for the bot's resumes and cover letters. Like OpenAI,
+it reports how many leading prompt words matched a recent prompt as
+usage.prompt_tokens_details.cached_tokens (with stream_options.include_usage
+when streaming), which exercises the prefix-cache instrumentation. GET /stats reports request and injected-error counts.
+
+    python benchmarks/mock_llm.py --port 8765 --latency 0.3 --tokens-per-sec 80 --error-rate 0.02
+    OPENAI_API_BASE=http://127.0.0.1:8765/v1 LMSTUDIO_URL=http://127.0.0.1:8765/v1/chat/completions python tailored_resume_bot.py ...
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FILLER = ("Delivered data platform improvements across teams, built reliable Python and SQL pipelines, "
+          "mentored engineers, and partnered with product on measurable outcomes.").split()
+
+
+class MockLLMServer:
+    def __init__(self, host='127.0.0.1', port=0, latency=0.2, jitter=0.1, tokens_per_sec=100.0, reply_tokens=300,
+                 error_rate=0.0, error_status=429, retry_after=0, seed=0, models=('gpt-4o', 'gpt-4o-mini')):
+        self.latency, self.jitter = latency, jitter
+        self.tokens_per_sec = tokens_per_sec
+        self.reply_tokens = reply_tokens
+        self.error_rate, self.error_status, self.retry_after = error_rate, error_status, retry_after
+        self.models = list(models)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.counts = {'requests': 0, 'streamed': 0, 'errors_injected': 0, 'in_flight': 0, 'max_in_flight': 0, 'prompt_tokens': 0, 'cached_tokens': 0}
+        self._recent_prompts = deque(maxlen=32)
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, name='mock-llm', daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _draw(self):
+        # One locked draw per request keeps a seeded run's latencies and errors reproducible
+        with self._lock:
+            return self.latency + self._random.uniform(0, self.jitter), self._random.random() < self.error_rate
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.counts[key] += amount
+            if key == 'in_flight':
+                self.counts['max_in_flight'] = max(self.counts['max_in_flight'], self.counts['in_flight'])
+
+    def prompt_usage(self, messages):
+        # Prompt "tokens" are words; the cached ones are the longest prefix shared with a recent prompt
+        words = ' '.join(m.get('content', '') for m in messages).split()
+        with self._lock:
+            cached = 0
+            for previous in self._recent_prompts:
+                shared = 0
+                for a, b in zip(words, previous):
+                    if a != b:
+                        break
+                    shared += 1
+                cached = max(cached, shared)
+            self._recent_prompts.append(words)
+            self.counts['prompt_tokens'] += len(words)
+            self.counts['cached_tokens'] += cached
+        return {"prompt_tokens": len(words), "prompt_tokens_details": {"cached_tokens": cached}}
+
+    def reply_for(self, messages):
+        prompt = messages[-1].get('content', '') if messages else ''
+        body = ' '.join(FILLER[i % len(FILLER)] for i in range(self.reply_tokens))
+        header = {"company_name": "Acme Corp", "job_title": "Data Engineer"}
+        if '"cover_letter"' in prompt:
+            return json.dumps({**header, "cover_letter": body})
+        if '"resume"' in prompt:
+            return json.dumps({**header, "resume": body})
+        if prompt.startswith('Extract the hiring company'):
+            return json.dumps(header)
+        return body
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status, payload, headers=()):
+                out = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(out)))
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(out)
+
+            def _chunk(self, data):
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            def do_GET(self):
+                if self.path.rstrip('/').endswith('/models'):
+                    self._send_json(200, {"object": "list", "data": [{"id": m, "object": "model"} for m in server.models]})
+                elif self.path == '/stats':
+                    with server._lock:
+                        self._send_json(200, dict(server.counts))
+                else:
+                    self._send_json(404, {"error": "not found"})
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                server._count('requests')
+                delay, fail = server._draw()
+                if fail:
+                    server._count('errors_injected')
+                    self._send_json(server.error_status, {"error": {"message": "mock: injected error"}}, [('Retry-After', str(server.retry_after))])
+                    return
+                server._count('in_flight')
+                try:
+                    time.sleep(delay)
+                    usage = server.prompt_usage(body.get('messages', []))
+                    words = server.reply_for(body.get('messages', [])).split(' ')
+                    usage["completion_tokens"] = len(words)
+                    per_token = 1.0 / server.tokens_per_sec if server.tokens_per_sec else 0.0
+                    if body.get('stream'):
+                        server._count('streamed')
+                        self.send_response(200)
+                        self.send_header('Content-Type', 'text/event-stream')
+                        self.send_header('Transfer-Encoding', 'chunked')
+                        self.end_headers()
+                        for i, word in enumerate(words):
+                            delta = word if i == 0 else ' ' + word
+                            self._chunk(("data: " + json.dumps({"choices": [{"delta": {"content": delta}}]}) + "\n\n").encode())
+                            time.sleep(per_token)
+                        if (body.get('stream_options') or {}).get('include_usage'):
+                            self._chunk(("data: " + json.dumps({"choices": [], "usage": usage}) + "\n\n").encode())
+                        self._chunk(b"data: [DONE]\n\n")
+                        self._chunk(b"")
+                    else:
+                        time.sleep(per_token * len(words))
+                        self._send_json(200, {"choices": [{"message": {"role": "assistant", "content": ' '.join(words)}}],
+                                              "usage": usage})
+                finally:
+                    server._count('in_flight', -1)
+
+        return Handler
+
+
+def add_server_arguments(parser):
+    parser.add_argument('--latency', type=float, default=0.2, help='seconds before the first token')
+    parser.add_argument('--jitter', type=float, default=0.1, help='extra random latency, up to this many seconds')
+    parser.add_argument('--tokens-per-sec', type=float, default=100.0, help='streaming rate (0 for instant)')
+    parser.add_argument('--reply-tokens', type=int, default=300, help='words per reply')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of requests answered with --error-status')
+    parser.add_argument('--error-status', type=int, default=429)
+    parser.add_argument('--retry-after', type=float, default=0, help='Retry-After seconds sent with injected errors')
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def server_from_args(args, host='127.0.0.1', port=0):
+    return MockLLMServer(host=host, port=port, latency=args.latency, jitter=args.jitter, tokens_per_sec=args.tokens_per_sec,
+                         reply_tokens=args.reply_tokens, error_rate=args.error_rate, error_status=args.error_status,
+                         retry_after=args.retry_after, seed=args.seed)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    add_server_arguments(parser)
+    args = parser.parse_args(argv)
+    server = server_from_args(args, args.host, args.port)
+    print(f"Mock LLM server at {server.url}/v1 (Ctrl-C to stop)")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,68 @@
+"""
+Cold-start benchmark: import time, UI build time and first-request latency.
+
+Each run is a fresh interpreter against a throwaway database, so nothing is
+warm. Usage:
+
+    python benchmarks/startup.py [--runs 5] [--ui] [--json]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r'''
+import json, sys, time
+t0 = time.perf_counter()
+import tailored_resume_bot as bot
+t1 = time.perf_counter()
+result = {"import_s": t1 - t0, "gradio_imported": "gradio" in sys.modules, "pypdf2_imported": "PyPDF2" in sys.modules}
+t2 = time.perf_counter()
+bot.list_submissions_page(1)
+result["first_db_request_s"] = time.perf_counter() - t2
+t3 = time.perf_counter()
+bot.estimate_token_count("warm up the tokenizer")
+result["first_token_count_s"] = time.perf_counter() - t3
+if "--ui" in sys.argv:
+    t4 = time.perf_counter()
+    bot.build_ui()
+    result["build_ui_s"] = time.perf_counter() - t4
+print(json.dumps(result))
+'''
+
+
+def run_once(ui):
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, FACTS_DB_PATH=os.path.join(tmp, 'bench.db'), PDF_CACHE_PATH=os.path.join(tmp, 'pdf_cache.db'),
+                   MODEL_REGISTRY_CACHE=os.path.join(tmp, 'model_registry.json'))
+        cmd = [sys.executable, '-c', PROBE] + (['--ui'] if ui else [])
+        out = subprocess.run(cmd, cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True).stdout
+        return json.loads(out.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--ui', action='store_true', help='also time building the Gradio UI')
+    parser.add_argument('--json', action='store_true', help='print raw results as JSON')
+    args = parser.parse_args(argv)
+    runs = [run_once(args.ui) for _ in range(args.runs)]
+    if args.json:
+        print(json.dumps(runs, indent=2))
+        return 0
+    for key in [k for k in runs[0] if k.endswith('_s')]:
+        values = [r[key] for r in runs]
+        print(f"{key:<22} median {statistics.median(values) * 1000:8.1f} ms   min {min(values) * 1000:8.1f} ms")
+    print(f"{'gradio imported':<22} {runs[0]['gradio_imported']}")
+    print(f"{'PyPDF2 imported':<22} {runs[0]['pypdf2_imported']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
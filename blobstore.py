@@ -0,0 +1,115 @@
+"""
+Content-addressed, compressed store for large text blobs.
+
+Submissions reference their job description, tailored resume, cover letter
+and facts/tweaks snapshots by SHA-256 instead of inlining them, so list
+queries never read megabytes of text they do not show, and identical texts
+(repeated job descriptions, unchanged facts snapshots) are stored once.
+Blobs are compressed with zstd when the `zstandard` package is installed and
+zlib otherwise; the codec is recorded per blob so either can be read back.
+Blobs left unreferenced by regenerations are deleted by maybe_collect_garbage(),
+at most once per BLOB_GC_INTERVAL seconds across every process sharing the
+database.
+"""
+
+import functools
+import hashlib
+import os
+import time
+import zlib
+
+import datastore as db
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+DEFAULT_CODEC = 'zstd' if zstandard else 'zlib'
+BLOB_GC_INTERVAL = float(os.environ.get('BLOB_GC_INTERVAL', 86400))
+
+
+def init_blobs(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS blobs (
+        hash TEXT PRIMARY KEY,
+        codec TEXT,
+        size INTEGER,
+        data BLOB
+    )''')
+    # When garbage was last collected, shared by every process using the database
+    conn.execute('CREATE TABLE IF NOT EXISTS blob_gc (id INTEGER PRIMARY KEY CHECK (id = 1), last_run REAL NOT NULL)')
+    conn.execute('INSERT OR IGNORE INTO blob_gc (id, last_run) VALUES (1, 0)')
+
+
+def _compress(raw, codec):
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=10).compress(raw)
+    return zlib.compress(raw, 9)
+
+
+def _decompress(data, codec):
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("Blob is zstd-compressed but the zstandard package is not installed.")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return zlib.decompress(data)
+
+
+@db.on_connect
+def _register_sql_functions(conn):
+    # blob_text(hash) lets SQL (views, FTS triggers) read blob contents, including blobs
+    # written earlier in the same transaction on this connection
+    conn.create_function('blob_text', 1, lambda digest: _read_blob(conn, digest))
+
+
+def _read_blob(conn, digest):
+    if not digest:
+        return None
+    row = conn.execute('SELECT codec, data FROM blobs WHERE hash = ?', (digest,)).fetchone()
+    return _decompress(row[1], row[0]).decode('utf-8') if row else None
+
+
+def put_text(conn, text, codec=DEFAULT_CODEC):
+    """Store text (if not already present) on conn and return its hash; None stays None."""
+    if text is None:
+        return None
+    raw = text.encode('utf-8')
+    digest = hashlib.sha256(raw).hexdigest()
+    conn.execute('INSERT OR IGNORE INTO blobs (hash, codec, size, data) VALUES (?,?,?,?)',
+                 (digest, codec, len(raw), _compress(raw, codec)))
+    return digest
+
+
+def get_text(digest):
+    if not digest:
+        return None
+    try:
+        return _cached_text(digest)
+    except KeyError:
+        return None
+
+
+@functools.lru_cache(maxsize=256)
+def _cached_text(digest):
+    # Blobs are immutable, so found texts can be memoized; a miss raises, which lru_cache does not
+    # remember, so a blob stored later (e.g. by another process) is still found
+    row = db.query_one('SELECT codec, data FROM blobs WHERE hash = ?', (digest,))
+    if row is None:
+        raise KeyError(digest)
+    codec, data = row
+    return _decompress(data, codec).decode('utf-8')
+
+
+def collect_garbage(conn, references):
+    """Delete blobs not referenced by any (table, column) pair in references."""
+    referenced = ' UNION '.join(f'SELECT {column} FROM {table} WHERE {column} IS NOT NULL' for table, column in references)
+    return conn.execute(f'DELETE FROM blobs WHERE hash NOT IN ({referenced})').rowcount
+
+
+def maybe_collect_garbage(conn, references, interval=BLOB_GC_INTERVAL):
+    """Run collect_garbage() if no process has in the last interval seconds; returns how many were deleted, or None if skipped."""
+    now = time.time()
+    # The update takes the write lock, so of several processes racing here only one wins the claim
+    if not conn.execute('UPDATE blob_gc SET last_run = ? WHERE id = 1 AND last_run <= ?', (now, now - interval)).rowcount:
+        return None
+    return collect_garbage(conn, references)
@@ -0,0 +1,160 @@
+"""
+Bulk regeneration of submissions as a persistent background job.
+
+A job snapshots the ids of every submission matching a state filter into
+bulk_regen_items and is run as a 'bulk_regen' job on the job queue, whose
+handler (BulkRegenManager.run) works through the items on a thread pool.
+Only the worker holding the queue job's lease runs it, however many
+processes are up; if that worker dies the lease runs out and the next one
+picks up where it left off (items caught mid-flight are retried). Each
+item's status is written back as it finishes, so progress can be polled
+from any session. Throughput is bounded by the provider, not by this pool:
+every LLM call goes through the RPM/TPM limits and 429 backoff in rate_limit.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import datastore as db
+import job_queue
+from telemetry import log_event
+
+BULK_REGEN_WORKERS = int(os.environ.get('BULK_REGEN_WORKERS', 8))
+
+# Item statuses; everything but pending/running is final
+ITEM_STATUSES = ('pending', 'running', 'done', 'skipped', 'failed')
+
+
+def init_bulk_tables(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS bulk_regen_jobs (
+        id INTEGER PRIMARY KEY,
+        state_filter TEXT,
+        force INTEGER DEFAULT 0,
+        bypass_cache INTEGER DEFAULT 0,
+        status TEXT DEFAULT 'running',
+        total INTEGER DEFAULT 0,
+        created REAL,
+        finished REAL,
+        queue_job_id INTEGER
+    )''')
+    if 'queue_job_id' not in {row[1] for row in conn.execute('PRAGMA table_info(bulk_regen_jobs)')}:
+        conn.execute('ALTER TABLE bulk_regen_jobs ADD COLUMN queue_job_id INTEGER')
+        # Jobs from before bulk jobs ran on the job queue have nothing to resume them; start them again instead
+        conn.execute("UPDATE bulk_regen_jobs SET status = 'cancelled', finished = ? WHERE status = 'running'", (time.time(),))
+    conn.execute('''CREATE TABLE IF NOT EXISTS bulk_regen_items (
+        job_id INTEGER,
+        submission_id INTEGER,
+        status TEXT DEFAULT 'pending',
+        attempts INTEGER DEFAULT 0,
+        message TEXT,
+        finished REAL,
+        PRIMARY KEY (job_id, submission_id)
+    )''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_bulk_regen_items_status ON bulk_regen_items (job_id, status)')
+
+
+class BulkRegenManager:
+    def __init__(self, regen_item, workers=BULK_REGEN_WORKERS):
+        # regen_item(submission_id, bypass_cache, force) -> (status, message), status one of done/skipped/failed
+        self.regen_item = regen_item
+        self.workers = workers
+
+    def start(self, state=None, force=False, bypass_cache=False):
+        """Queue every submission in `state` (all if None) for regeneration; returns the job id."""
+        with db.connection() as conn:
+            job_id = conn.execute('INSERT INTO bulk_regen_jobs (state_filter, force, bypass_cache, created) VALUES (?,?,?,?)',
+                                  (state, int(bool(force)), int(bool(bypass_cache)), time.time())).lastrowid
+            total = conn.execute('''INSERT INTO bulk_regen_items (job_id, submission_id)
+                                    SELECT ?, id FROM submissions WHERE ? IS NULL OR state = ? ORDER BY id''',
+                                 (job_id, state, state)).rowcount
+            conn.execute('UPDATE bulk_regen_jobs SET total = ? WHERE id = ?', (total, job_id))
+        queue_job_id = job_queue.enqueue('bulk_regen', {'bulk_id': job_id})
+        db.execute('UPDATE bulk_regen_jobs SET queue_job_id = ? WHERE id = ?', (queue_job_id, job_id))
+        return job_id
+
+    def cancel(self, job_id):
+        db.execute("UPDATE bulk_regen_jobs SET status = 'cancelled', finished = ? WHERE id = ? AND status = 'running'", (time.time(), job_id))
+        row = db.query_one('SELECT queue_job_id FROM bulk_regen_jobs WHERE id = ?', (job_id,))
+        if row and row[0]:
+            # Whichever process is running it stops at its next progress report
+            job_queue.cancel(row[0])
+
+    def is_running(self, job_id):
+        """True while the job is queued or being worked on, in this process or any other."""
+        row = db.query_one('SELECT status, queue_job_id FROM bulk_regen_jobs WHERE id = ?', (job_id,))
+        if row is None or row[0] != 'running':
+            return False
+        if row[1] is None:
+            # start() has not enqueued it yet
+            return True
+        job = job_queue.get_job(row[1])
+        return job is not None and job['status'] in ('queued', 'running')
+
+    def run(self, payload, report, queue_job_id):
+        """job_queue handler for 'bulk_regen' jobs: regenerate the bulk job's pending items."""
+        job_id = payload['bulk_id']
+        force, bypass_cache = db.query_one('SELECT force, bypass_cache FROM bulk_regen_jobs WHERE id = ?', (job_id,))
+        with db.connection() as conn:
+            # This worker holds the lease, so items still marked running were cut off with an earlier attempt
+            if conn.execute("UPDATE bulk_regen_items SET status = 'pending' WHERE job_id = ? AND status = 'running'", (job_id,)).rowcount:
+                log_event('bulk_regen_resumed', job_id=job_id)
+        pending = [row[0] for row in db.query("SELECT submission_id FROM bulk_regen_items WHERE job_id = ? AND status = 'pending' ORDER BY submission_id", (job_id,))]
+        cancelled = threading.Event()
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"bulk-regen-{job_id}")
+        try:
+            remaining = {pool.submit(self._process, job_id, sub_id, bool(force), bool(bypass_cache), cancelled) for sub_id in pending}
+            while remaining:
+                _, remaining = wait(remaining, timeout=1.0)
+                # Raises JobCancelled once the job is cancelled or this worker has lost its lease
+                report({'bulk_id': job_id, 'completed': len(pending) - len(remaining)})
+        except job_queue.JobCancelled:
+            cancelled.set()
+            raise
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+        db.execute("UPDATE bulk_regen_jobs SET status = 'done', finished = ? WHERE id = ? AND status = 'running'", (time.time(), job_id))
+        return {'bulk_id': job_id}
+
+    def _process(self, job_id, sub_id, force, bypass_cache, cancelled):
+        # A cancel from another process shows up in the job row before this worker's next report
+        if cancelled.is_set() or db.query_one('SELECT status FROM bulk_regen_jobs WHERE id = ?', (job_id,))[0] != 'running':
+            return
+        db.execute('UPDATE bulk_regen_items SET status = ?, attempts = attempts + 1 WHERE job_id = ? AND submission_id = ?', ('running', job_id, sub_id))
+        try:
+            status, message = self.regen_item(sub_id, bypass_cache, force)
+        except Exception as e:
+            print(f"[ERROR] Bulk regeneration of submission {sub_id} failed: {e}")
+            status, message = 'failed', str(e)
+        if cancelled.is_set() and status == 'failed':
+            # Interrupted by the cancel; leave it for a later run
+            status = 'pending'
+        db.execute('UPDATE bulk_regen_items SET status = ?, message = ?, finished = ? WHERE job_id = ? AND submission_id = ?',
+                   (status, message, time.time(), job_id, sub_id))
+
+    def progress(self, job_id):
+        job = db.query_one('SELECT state_filter, status, total, created, finished FROM bulk_regen_jobs WHERE id = ?', (job_id,))
+        if job is None:
+            return None
+        state_filter, status, total, created, finished = job
+        if status == 'running' and not self.is_running(job_id):
+            # Its queue job failed for good, e.g. every attempt's worker died
+            status = 'failed'
+        counts = dict.fromkeys(ITEM_STATUSES, 0)
+        counts.update(dict(db.query('SELECT status, COUNT(*) FROM bulk_regen_items WHERE job_id = ? GROUP BY status', (job_id,))))
+        completed = counts['done'] + counts['skipped'] + counts['failed']
+        elapsed = (finished or time.time()) - created
+        rate = completed / elapsed if elapsed > 0 else 0.0
+        remaining = counts['pending'] + counts['running']
+        return {
+            "id": job_id, "state_filter": state_filter, "status": status, "total": total,
+            "completed": completed, **counts, "elapsed": elapsed, "per_minute": rate * 60,
+            "eta": remaining / rate if rate and status == 'running' else None,
+        }
+
+    def failures(self, job_id, limit=50):
+        return db.query("SELECT submission_id, attempts, message FROM bulk_regen_items WHERE job_id = ? AND status = 'failed' ORDER BY submission_id LIMIT ?", (job_id, limit))
+
+    def recent_jobs(self, limit=10):
+        return [row[0] for row in db.query('SELECT id FROM bulk_regen_jobs ORDER BY id DESC LIMIT ?', (limit,))]
@@ -0,0 +1,171 @@
+"""
+Shared SQLite data-access layer.
+
+Every database helper used to open and close its own sqlite3 connection, and
+concurrent Gradio workers contended on the default rollback journal. This
+module owns one small, thread-safe connection pool per database file. Pooled
+connections run in WAL mode with synchronous=NORMAL and a busy timeout, so
+readers never block the writer, and they keep a statement cache so repeated
+queries reuse their prepared statements.
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+DB_PATH = os.environ.get('FACTS_DB_PATH', 'facts_tweaks.db')
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 8))
+DB_BUSY_TIMEOUT_MS = int(os.environ.get('DB_BUSY_TIMEOUT_MS', 5000))
+# How long a checkout waits for a free connection before giving up (a leaked connection would otherwise hang it forever)
+DB_ACQUIRE_TIMEOUT = float(os.environ.get('DB_ACQUIRE_TIMEOUT', 30))
+
+
+_connect_hooks = []
+_schema_hooks = {}
+
+
+def on_connect(hook):
+    """Register hook(conn) to run on every new pooled connection, e.g. to add SQL functions. Register before first use."""
+    _connect_hooks.append(hook)
+    return hook
+
+
+def on_schema(hook, path=None):
+    """
+    Register hook(conn) to create or migrate the schema of `path` (default DB_PATH).
+    Hooks run once per pool, on its first connection, so importing a module that
+    owns tables costs nothing until the database is actually used.
+    """
+    _schema_hooks.setdefault(path or DB_PATH, []).append(hook)
+    return hook
+
+
+class ConnectionPool:
+    def __init__(self, path, size=DB_POOL_SIZE, busy_timeout_ms=DB_BUSY_TIMEOUT_MS, acquire_timeout=DB_ACQUIRE_TIMEOUT):
+        self.path = path
+        self.size = size
+        self.busy_timeout_ms = busy_timeout_ms
+        self.acquire_timeout = acquire_timeout
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._schema_ready = False
+        self._lock = threading.Lock()
+        # Contention counters: checkouts that had to wait for a free connection, and "database is locked" errors
+        self._stats = {'acquires': 0, 'waits': 0, 'wait_seconds': 0.0, 'max_wait_seconds': 0.0, 'locked_errors': 0, 'timeouts': 0}
+        self._stats_lock = threading.Lock()
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000, check_same_thread=False, cached_statements=256)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout_ms)}')
+        for hook in _connect_hooks:
+            hook(conn)
+        if not self._schema_ready:
+            # Called with self._lock held, so concurrent first users wait for the schema
+            try:
+                for hook in _schema_hooks.get(self.path, []):
+                    hook(conn)
+                conn.commit()
+            except Exception:
+                conn.close()
+                raise
+            self._schema_ready = True
+        return conn
+
+    def acquire(self):
+        with self._stats_lock:
+            self._stats['acquires'] += 1
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                try:
+                    return self._open()
+                except Exception:
+                    self._created -= 1
+                    raise
+        start = time.perf_counter()
+        try:
+            conn = self._idle.get(timeout=self.acquire_timeout)
+        except queue.Empty:
+            with self._stats_lock:
+                self._stats['timeouts'] += 1
+            raise sqlite3.OperationalError(
+                f"No free connection to {self.path} after {self.acquire_timeout:g}s; all {self.size} are in use") from None
+        waited = time.perf_counter() - start
+        with self._stats_lock:
+            self._stats['waits'] += 1
+            self._stats['wait_seconds'] += waited
+            self._stats['max_wait_seconds'] = max(self._stats['max_wait_seconds'], waited)
+        return conn
+
+    def release(self, conn):
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; commits on success and rolls back on error."""
+        conn = self.acquire()
+        try:
+            yield conn
+            conn.commit()
+        except BaseException as e:
+            if isinstance(e, sqlite3.OperationalError) and 'locked' in str(e):
+                with self._stats_lock:
+                    self._stats['locked_errors'] += 1
+            conn.rollback()
+            raise
+        finally:
+            self.release(conn)
+
+    def stats(self):
+        with self._stats_lock:
+            return dict(self._stats, size=self.size, open=self._created)
+
+    def close(self):
+        with self._lock:
+            while True:
+                try:
+                    self._idle.get_nowait().close()
+                except queue.Empty:
+                    break
+            self._created = 0
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path=None):
+    path = path or DB_PATH
+    with _pools_lock:
+        if path not in _pools:
+            _pools[path] = ConnectionPool(path)
+        return _pools[path]
+
+
+def connection(path=None):
+    return get_pool(path).connection()
+
+
+def query(sql, params=(), path=None):
+    with connection(path) as conn:
+        return conn.execute(sql, params).fetchall()
+
+
+def query_one(sql, params=(), path=None):
+    with connection(path) as conn:
+        return conn.execute(sql, params).fetchone()
+
+
+def execute(sql, params=(), path=None):
+    """Run a single write statement; returns the cursor's lastrowid."""
+    with connection(path) as conn:
+        return conn.execute(sql, params).lastrowid
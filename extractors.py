@@ -0,0 +1,146 @@
+"""
+Interchangeable text extraction backends for resume/CV uploads.
+
+Every backend is a page reader, page_reader(data, start, end) ->
+(page_count, [(page_number, text or None, error or None)]), run inside the
+pdf_extract worker processes, so it gets the same page-range splitting, time and
+memory limits whichever library does the parsing:
+
+    pypdf2     PyPDF2 (the default; pure Python)
+    pdfminer   pdfminer.six layout analysis (slower, keeps reading order best)
+    pypdfium2  PDFium bindings (fastest by far)
+    docx       python-docx, for .docx uploads (the whole document is one "page")
+
+The engine for PDFs comes from PDF_EXTRACTOR and can be overridden per file.
+DOCX uploads are recognised from their content and always use the docx
+reader (python-docx is required for them). Engines whose library is not installed fall back to pypdf2.
+Extracted text is cached per engine and version in pdf_cache;
+benchmarks/extractors.py compares the engines on a local corpus.
+"""
+
+import importlib.util
+import io
+import os
+
+from pdf_cache import cached_extract, read_pdf_bytes
+from pdf_extract import PartialExtraction, extract_pdf_bytes, pypdf2_pages
+from telemetry import span
+
+PDF_EXTRACTOR = os.environ.get('PDF_EXTRACTOR', 'pypdf2')
+
+
+def pdfminer_pages(data, start, end):
+    from pdfminer.high_level import extract_pages
+    from pdfminer.layout import LTTextContainer
+    from pdfminer.pdfpage import PDFPage
+    count = sum(1 for _ in PDFPage.get_pages(io.BytesIO(data)))
+    numbers = list(range(start, min(end, count)))
+    pages = []
+    try:
+        for number, layout in zip(numbers, extract_pages(io.BytesIO(data), page_numbers=set(numbers))):
+            pages.append((number, ''.join(element.get_text() for element in layout if isinstance(element, LTTextContainer)), None))
+    except Exception as e:
+        # pdfminer parses pages as a stream, so an error ends the range
+        pages += [(number, None, f"{type(e).__name__}: {e}") for number in numbers[len(pages):]]
+    return count, pages
+
+
+def pypdfium2_pages(data, start, end):
+    import pypdfium2
+    pdf = pypdfium2.PdfDocument(data)
+    try:
+        count = len(pdf)
+        pages = []
+        for number in range(start, min(end, count)):
+            try:
+                page = pdf[number]
+                textpage = page.get_textpage()
+                # PDFium marks line ends with \r\n
+                pages.append((number, textpage.get_text_bounded().replace('\r\n', '\n'), None))
+                textpage.close()
+                page.close()
+            except Exception as e:
+                pages.append((number, None, f"{type(e).__name__}: {e}"))
+        return count, pages
+    finally:
+        pdf.close()
+
+
+def docx_pages(data, start, end):
+    import docx
+    from docx.table import Table
+    from docx.text.paragraph import Paragraph
+    if start > 0:
+        return 1, []
+    document = docx.Document(io.BytesIO(data))
+    lines = []
+    # Walk the body in order so tables (often used for skills grids) stay where they were
+    for element in document.element.body.iterchildren():
+        if element.tag.endswith('}p'):
+            lines.append(Paragraph(element, document).text)
+        elif element.tag.endswith('}tbl'):
+            for row in Table(element, document).rows:
+                lines.append(' | '.join(cell.text.strip() for cell in row.cells))
+    return 1, [(0, '\n'.join(lines), None)]
+
+
+# name -> (page reader, module it needs, cache version)
+EXTRACTORS = {
+    'pypdf2': (pypdf2_pages, 'PyPDF2', '1'),
+    'pdfminer': (pdfminer_pages, 'pdfminer', '1'),
+    'pypdfium2': (pypdfium2_pages, 'pypdfium2', '1'),
+    'docx': (docx_pages, 'docx', '1'),
+}
+PDF_EXTRACTORS = ('pypdf2', 'pdfminer', 'pypdfium2')
+
+
+def is_available(name):
+    return name in EXTRACTORS and importlib.util.find_spec(EXTRACTORS[name][1]) is not None
+
+
+def available_extractors():
+    return [name for name in EXTRACTORS if is_available(name)]
+
+
+def detect_format(data):
+    # Word documents are zip archives; anything else is handed to a PDF engine
+    if data[:4] == b'PK\x03\x04' and b'word/' in data[:4096]:
+        return 'docx'
+    return 'pdf'
+
+
+def choose_extractor(data, extractor=None):
+    """The engine for this file: docx for Word documents, else `extractor`, PDF_EXTRACTOR or pypdf2."""
+    if detect_format(data) == 'docx':
+        if not is_available('docx'):
+            # No PDF engine can read it either; say what is missing instead of a parse error
+            raise PartialExtraction('', "This is a Word document, and reading .docx files needs python-docx (pip install python-docx).")
+        return 'docx'
+    name = extractor or PDF_EXTRACTOR
+    if name not in PDF_EXTRACTORS:
+        print(f"[WARN] Unknown PDF extractor {name!r}; using pypdf2")
+        return 'pypdf2'
+    if not is_available(name):
+        print(f"[WARN] PDF extractor {name!r} is not installed; using pypdf2")
+        return 'pypdf2'
+    return name
+
+
+def extract_text(source, extractor=None):
+    """
+    Text of a resume upload (path, file-like object or bytes), cached by content hash.
+    Raises PartialExtraction (not cached) if some pages could not be read, or if the
+    upload is a .docx and python-docx is not installed.
+    """
+    with span('pdf_extract') as s:
+        data = read_pdf_bytes(source)
+        name = choose_extractor(data, extractor)
+        page_reader, _, version = EXTRACTORS[name]
+        s.set(engine=name, bytes=len(data), cached=True)
+
+        def parse(stream):
+            s.set(cached=False)
+            return extract_pdf_bytes(stream.read(), page_reader, 'DOCX' if name == 'docx' else 'PDF')
+        text = cached_extract(data, parse, name, version)
+        s.set(chars=len(text))
+        return text
@@ -0,0 +1,80 @@
+"""
+Company name / job title extraction from a job description.
+
+Runs before generation instead of being parsed out of the cover letter at
+the very end, and its answer is the one the submission is filed under.
+Labelled fields and common phrasings are matched with regexes; only when
+those miss is a small, cheap model asked. The resume and cover letter wait
+for it, so a posting with no recognisable company or title is turned away
+before either of those completions is requested.
+"""
+
+import json
+import re
+
+_FIELD_RES = {
+    'company_name': [
+        re.compile(r'^\s*(?:company(?: name)?|employer|organi[sz]ation|client)\s*[:\-–]\s*(.+?)\s*$', re.I | re.M),
+        # "About Acme:" / "ABOUT Acme"; the name itself must still start with a capital
+        re.compile(r'^\s*(?i:about\s+(?!us\b|the\b|you\b|this\b|our\b))([A-Z][\w&.,\'\- ]{1,60}?)\s*:?\s*$', re.M),
+    ],
+    'job_title': [
+        re.compile(r'^\s*(?:job title|position(?: title)?|role|title)\s*[:\-–]\s*(.+?)\s*$', re.I | re.M),
+    ],
+}
+# "<Company> is hiring a <Title>" / "<Company> is looking for an <Title>"
+_HIRING_RE = re.compile(r'^\s*([A-Z][\w&.,\'\- ]{1,60}?)\s+is\s+(?:hiring|looking for|seeking)\s+(?:an?\s+)?([A-Z][\w/&,\'\- ]{2,80}?)(?:\s+to\b|[.!,]|$)', re.M)
+
+METADATA_PROMPT = """Extract the hiring company's name and the job title from the job description below.
+Return ONLY a JSON object like {{"company_name": "Acme Corp", "job_title": "Senior Data Scientist"}}; use "" for anything not stated.
+
+Job Description:
+{job_desc}
+"""
+
+
+def extract_metadata_regex(job_desc):
+    """Return (company_name, job_title) found by pattern matching; either may be None."""
+    found = {}
+    for field, patterns in _FIELD_RES.items():
+        for pattern in patterns:
+            match = pattern.search(job_desc or '')
+            if match:
+                found[field] = match.group(1).strip(' .')
+                break
+    match = _HIRING_RE.search(job_desc or '')
+    if match:
+        found.setdefault('company_name', match.group(1).strip(' .'))
+        found.setdefault('job_title', match.group(2).strip(' .'))
+    return found.get('company_name'), found.get('job_title')
+
+
+def parse_metadata_response(text):
+    match = re.search(r'\{.*?\}', text or '', re.DOTALL)
+    if not match:
+        return None, None
+    try:
+        data = json.loads(match.group(0))
+    except ValueError:
+        return None, None
+    return (data.get('company_name') or '').strip() or None, (data.get('job_title') or '').strip() or None
+
+
+def extract_metadata(job_desc, company_name=None, job_title=None, ask_model=None):
+    """
+    Resolve (company_name, job_title): explicit values win, then regexes, then
+    ask_model(prompt) -> text (a small model) for whatever is still missing.
+    """
+    if not (company_name and job_title):
+        regex_company, regex_title = extract_metadata_regex(job_desc)
+        company_name = company_name or regex_company
+        job_title = job_title or regex_title
+    if not (company_name and job_title) and ask_model is not None:
+        try:
+            model_company, model_title = parse_metadata_response(ask_model(METADATA_PROMPT.format(job_desc=job_desc)))
+        except Exception as e:
+            print(f"[WARN] Metadata extraction model call failed: {e}")
+            model_company, model_title = None, None
+        company_name = company_name or model_company
+        job_title = job_title or model_title
+    return company_name or None, job_title or None
@@ -0,0 +1,371 @@
+"""
+Durable generation job queue in SQLite, worked by leased workers.
+
+The web tier enqueues a job (kind + JSON payload) and polls it; any number of
+worker processes on the same box claim jobs from the `jobs` table. A claim
+takes a lease of JOB_LEASE_SECONDS that the worker renews with heartbeats
+while the job runs, storing the latest partial output as it goes. If a
+worker dies (or the whole app restarts) its lease runs out and the next
+worker to look requeues the job, up to max_attempts. A browser disconnect no
+longer matters: the job finishes and stays readable by id.
+
+    job_id = enqueue('generate', {...})
+    for job in watch(job_id):      # the UI: progress until done/failed/cancelled
+        ...
+
+Workers: JobWorker(handlers).run_forever() in a process of its own (see the
+`worker` command of tailored_resume_bot.py and submitter_ui.py), or
+start_workers() for threads inside the web process.
+
+Uploads a job needs are copied to JOB_UPLOAD_DIR by stash_upload(). Workers
+delete the ones no queued or running job refers to once they are
+JOB_UPLOAD_MAX_AGE_DAYS old, unless keep_upload() marked them as still needed
+(a stored submission regenerates from its resume, for instance).
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import socket
+import threading
+import time
+import uuid
+
+import datastore as db
+
+JOB_LEASE_SECONDS = float(os.environ.get('JOB_LEASE_SECONDS', 60))
+JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 0.5))
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 3))
+# Worker threads the web process runs itself; 0 leaves all jobs to separate worker processes
+JOB_INLINE_WORKERS = int(os.environ.get('JOB_INLINE_WORKERS', 2))
+JOB_UPLOAD_DIR = os.environ.get('JOB_UPLOAD_DIR', 'job_uploads')
+JOB_UPLOAD_MAX_AGE_DAYS = float(os.environ.get('JOB_UPLOAD_MAX_AGE_DAYS', 1))
+JOB_UPLOAD_GC_INTERVAL = float(os.environ.get('JOB_UPLOAD_GC_INTERVAL', 3600))
+
+FINAL_STATUSES = ('done', 'failed', 'cancelled')
+
+
+class JobCancelled(Exception):
+    """Raised inside a handler (from report()) when its job was cancelled or its lease was lost."""
+
+
+_schema_ready = False
+
+
+def _connection():
+    global _schema_ready
+    if not _schema_ready:
+        with db.connection() as conn:
+            conn.execute('''CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY,
+                kind TEXT,
+                payload TEXT,
+                status TEXT DEFAULT 'queued',
+                attempts INTEGER DEFAULT 0,
+                max_attempts INTEGER,
+                lease_owner TEXT,
+                lease_expires REAL,
+                progress TEXT,
+                result TEXT,
+                error TEXT,
+                created REAL,
+                started REAL,
+                finished REAL
+            )''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, id)')
+            # Stashed uploads, shared by every process using the database; kept ones are never collected
+            conn.execute('CREATE TABLE IF NOT EXISTS job_uploads (path TEXT PRIMARY KEY, stashed REAL, kept INTEGER DEFAULT 0)')
+        _schema_ready = True
+    return db.connection()
+
+
+def stash_upload(path):
+    """Copy an uploaded file (which the web framework may delete) to JOB_UPLOAD_DIR, named by content hash."""
+    if not path or not os.path.exists(path):
+        return path
+    with open(path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    os.makedirs(JOB_UPLOAD_DIR, exist_ok=True)
+    target = os.path.abspath(os.path.join(JOB_UPLOAD_DIR, digest + os.path.splitext(path)[1].lower()))
+    # Record the upload before checking for the file: a collect_uploads() deleting it either finishes
+    # first (and the file is copied again below) or sees the fresh timestamp and leaves it alone
+    with _connection() as conn:
+        conn.execute('INSERT OR IGNORE INTO job_uploads (path) VALUES (?)', (target,))
+        conn.execute('UPDATE job_uploads SET stashed = ? WHERE path = ?', (time.time(), target))
+    if not os.path.exists(target):
+        shutil.copyfile(path, target)
+    return target
+
+
+def keep_upload(path):
+    """Exempt a stashed upload from collect_uploads(); other paths are ignored."""
+    with _connection() as conn:
+        conn.execute('UPDATE job_uploads SET kept = 1 WHERE path = ?', (os.path.abspath(path),))
+
+
+def collect_uploads(max_age_days=JOB_UPLOAD_MAX_AGE_DAYS):
+    """Delete stashed uploads older than max_age_days that are not kept or used by an unfinished job; returns how many."""
+    cutoff = time.time() - max_age_days * 86400
+    removed = 0
+    with _connection() as conn:
+        in_use = {value for (payload,) in conn.execute("SELECT payload FROM jobs WHERE status IN ('queued', 'running')")
+                  for value in json.loads(payload).values() if isinstance(value, str)}
+        for (path,) in conn.execute('SELECT path FROM job_uploads WHERE kept = 0 AND stashed < ?', (cutoff,)).fetchall():
+            if path in in_use:
+                continue
+            conn.execute('DELETE FROM job_uploads WHERE path = ?', (path,))
+            # Removed before the transaction commits, so a concurrent stash_upload() of it waits and then copies it back
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            removed += 1
+    return removed
+
+
+_last_upload_gc = 0.0
+_upload_gc_lock = threading.Lock()
+
+
+def maybe_collect_uploads():
+    global _last_upload_gc
+    with _upload_gc_lock:
+        if time.monotonic() - _last_upload_gc < JOB_UPLOAD_GC_INTERVAL and _last_upload_gc:
+            return
+        _last_upload_gc = time.monotonic()
+    collect_uploads()
+
+
+def enqueue(kind, payload, max_attempts=JOB_MAX_ATTEMPTS):
+    with _connection() as conn:
+        return conn.execute('INSERT INTO jobs (kind, payload, max_attempts, created) VALUES (?,?,?,?)',
+                            (kind, json.dumps(payload), max_attempts, time.time())).lastrowid
+
+
+def _row_to_job(row):
+    if row is None:
+        return None
+    keys = ('id', 'kind', 'payload', 'status', 'attempts', 'max_attempts', 'lease_owner', 'lease_expires',
+            'progress', 'result', 'error', 'created', 'started', 'finished')
+    job = dict(zip(keys, row))
+    for key in ('payload', 'progress', 'result'):
+        job[key] = json.loads(job[key]) if job[key] else None
+    return job
+
+
+def get_job(job_id):
+    with _connection() as conn:
+        return _row_to_job(conn.execute('SELECT * FROM jobs WHERE id = ?', (int(job_id),)).fetchone())
+
+
+def queue_position(job_id):
+    """How many queued jobs are ahead of this one (0 if it is next or already running)."""
+    with _connection() as conn:
+        return conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND id < ?", (int(job_id),)).fetchone()[0]
+
+
+def requeue_expired(now=None):
+    """Return jobs whose worker stopped heartbeating to the queue (or fail them after max_attempts)."""
+    now = now or time.time()
+    with _connection() as conn:
+        conn.execute('''UPDATE jobs SET status = 'failed', error = 'Lease expired after ' || attempts || ' attempt(s)', finished = ?, lease_owner = NULL
+                        WHERE status = 'running' AND lease_expires < ? AND attempts >= max_attempts''', (now, now))
+        return conn.execute('''UPDATE jobs SET status = 'queued', lease_owner = NULL, lease_expires = NULL
+                               WHERE status = 'running' AND lease_expires < ?''', (now,)).rowcount
+
+
+def claim(worker_id, kinds, lease_seconds=JOB_LEASE_SECONDS):
+    """Atomically take the oldest queued job of one of `kinds`; returns the job or None."""
+    placeholders = ','.join('?' * len(kinds))
+    while True:
+        now = time.time()
+        with _connection() as conn:
+            row = conn.execute(f"SELECT id FROM jobs WHERE status = 'queued' AND kind IN ({placeholders}) ORDER BY id LIMIT 1", tuple(kinds)).fetchone()
+            if row is None:
+                return None
+            # Another worker may have won the race for this row; the status check makes the update a no-op then
+            taken = conn.execute('''UPDATE jobs SET status = 'running', lease_owner = ?, lease_expires = ?, attempts = attempts + 1,
+                                    started = COALESCE(started, ?) WHERE id = ? AND status = 'queued' ''',
+                                 (worker_id, now + lease_seconds, now, row[0])).rowcount
+        if taken:
+            return get_job(row[0])
+
+
+def heartbeat(job_id, worker_id, progress=None, lease_seconds=JOB_LEASE_SECONDS):
+    """Extend the lease (and store progress); False if the job was cancelled or the lease went to another worker."""
+    with _connection() as conn:
+        if progress is None:
+            updated = conn.execute("UPDATE jobs SET lease_expires = ? WHERE id = ? AND lease_owner = ? AND status = 'running'",
+                                   (time.time() + lease_seconds, job_id, worker_id)).rowcount
+        else:
+            updated = conn.execute("UPDATE jobs SET lease_expires = ?, progress = ? WHERE id = ? AND lease_owner = ? AND status = 'running'",
+                                   (time.time() + lease_seconds, json.dumps(progress), job_id, worker_id)).rowcount
+    return bool(updated)
+
+
+def complete(job_id, worker_id, result):
+    with _connection() as conn:
+        conn.execute("UPDATE jobs SET status = 'done', result = ?, finished = ?, lease_owner = NULL WHERE id = ? AND lease_owner = ? AND status = 'running'",
+                     (json.dumps(result), time.time(), job_id, worker_id))
+
+
+def fail(job_id, worker_id, error):
+    with _connection() as conn:
+        conn.execute("UPDATE jobs SET status = 'failed', error = ?, finished = ?, lease_owner = NULL WHERE id = ? AND lease_owner = ? AND status = 'running'",
+                     (error, time.time(), job_id, worker_id))
+
+
+def cancel(job_id):
+    # A running job's worker notices at its next heartbeat
+    with _connection() as conn:
+        conn.execute("UPDATE jobs SET status = 'cancelled', finished = ? WHERE id = ? AND status IN ('queued', 'running')", (time.time(), int(job_id)))
+
+
+def watch(job_id, interval=JOB_POLL_INTERVAL):
+    """Yield the job every time its status or progress changes, ending with its final state."""
+    last = None
+    while True:
+        job = get_job(job_id)
+        if job is None:
+            return
+        seen = (job['status'], job['attempts'], json.dumps(job['progress']))
+        if seen != last:
+            last = seen
+            yield job
+        if job['status'] in FINAL_STATUSES:
+            return
+        time.sleep(interval)
+
+
+def run_job(kind, payload, interval=JOB_POLL_INTERVAL):
+    """Enqueue a job and block until it finishes; returns the final job."""
+    job = None
+    for job in watch(enqueue(kind, payload), interval):
+        pass
+    return job
+
+
+class JobWorker:
+    def __init__(self, handlers, worker_id=None, lease_seconds=JOB_LEASE_SECONDS, poll_interval=JOB_POLL_INTERVAL, progress_interval=0.5):
+        # handlers: kind -> handler(payload, report, job_id) returning a JSON-serialisable result.
+        # report(progress) stores partial output; it raises JobCancelled once the job is cancelled.
+        # A requeued job runs again from the start, so side effects should be keyed on job_id.
+        self.handlers = handlers
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.progress_interval = progress_interval
+        self.stopping = threading.Event()
+
+    def run_once(self):
+        """Claim and run one job; returns False if there was nothing to do."""
+        requeue_expired()
+        job = claim(self.worker_id, list(self.handlers), self.lease_seconds)
+        if job is None:
+            return False
+        self._run(job)
+        # The job has reached its final status, so uploads only it was using can go
+        maybe_collect_uploads()
+        return True
+
+    def run_forever(self):
+        print(f"[INFO] Job worker {self.worker_id} handling {', '.join(self.handlers)}")
+        while not self.stopping.is_set():
+            try:
+                if not self.run_once():
+                    self.stopping.wait(self.poll_interval)
+            except Exception as e:
+                # A database hiccup must not kill the worker
+                print(f"[ERROR] Job worker {self.worker_id}: {e}")
+                self.stopping.wait(self.poll_interval)
+
+    def stop(self):
+        self.stopping.set()
+
+    def _run(self, job):
+        job_id = job['id']
+        lost = threading.Event()
+        done = threading.Event()
+        state = {'pending': None, 'written': 0.0}
+        lock = threading.Lock()
+
+        def beat():
+            # Keep the lease alive while the handler runs, even if it reports nothing
+            interval = self.lease_seconds / 3
+            wait = interval
+            while not done.wait(wait):
+                with lock:
+                    progress, state['pending'] = state['pending'], None
+                try:
+                    alive = heartbeat(job_id, self.worker_id, progress, self.lease_seconds)
+                except Exception as e:
+                    # e.g. "database is locked": keep the progress and retry soon, well before the lease runs out
+                    print(f"[WARN] Heartbeat for job {job_id} failed, retrying: {e}")
+                    with lock:
+                        if state['pending'] is None:
+                            state['pending'] = progress
+                    wait = min(interval, 1.0)
+                    continue
+                if not alive:
+                    lost.set()
+                    return
+                wait = interval
+
+        def report(progress):
+            if lost.is_set():
+                raise JobCancelled(job_id)
+            now = time.monotonic()
+            with lock:
+                if now - state['written'] < self.progress_interval:
+                    state['pending'] = progress
+                    return
+                state['written'], state['pending'] = now, None
+            try:
+                alive = heartbeat(job_id, self.worker_id, progress, self.lease_seconds)
+            except Exception as e:
+                # Leave it to the heartbeat thread rather than failing the job
+                print(f"[WARN] Progress for job {job_id} not saved, retrying: {e}")
+                with lock:
+                    if state['pending'] is None:
+                        state['pending'] = progress
+                return
+            if not alive:
+                lost.set()
+                raise JobCancelled(job_id)
+
+        threading.Thread(target=beat, name=f"job-{job_id}-heartbeat", daemon=True).start()
+        try:
+            result = self.handlers[job['kind']](job['payload'], report, job_id)
+        except JobCancelled:
+            print(f"[INFO] Job {job_id} stopped: cancelled or lease lost")
+            return
+        except Exception as e:
+            print(f"[ERROR] Job {job_id} ({job['kind']}) failed: {e}")
+            fail(job_id, self.worker_id, f"{type(e).__name__}: {e}")
+            return
+        finally:
+            done.set()
+        complete(job_id, self.worker_id, result)
+
+
+def start_workers(handlers, count=JOB_INLINE_WORKERS):
+    """Run `count` JobWorker threads in this process; returns them (call .stop() to end)."""
+    workers = []
+    for i in range(count):
+        worker = JobWorker(handlers)
+        threading.Thread(target=worker.run_forever, name=f"job-worker-{i}", daemon=True).start()
+        workers.append(worker)
+    return workers
+
+
+def serve(handlers, count=1):
+    """Body of a dedicated worker process: run `count` workers until interrupted."""
+    workers = start_workers(handlers, count)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        for worker in workers:
+            worker.stop()
+    return 0
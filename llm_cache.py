@@ -0,0 +1,96 @@
+"""
+Opt-in persistent cache of LLM responses.
+
+Regenerating a submission whose facts/tweaks have not changed sends a
+byte-identical prompt; with LLM_CACHE_ENABLED=1 the response is served from
+this cache instead of paying for another completion. Entries are keyed on a
+hash of the backend, model, normalized messages, temperature and max_tokens,
+expire after LLM_CACHE_TTL seconds, and the oldest entries are dropped once
+there are more than LLM_CACHE_MAX_ENTRIES. Callers pass bypass_cache=True
+when the user explicitly wants a fresh sample.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+import datastore as db
+
+LLM_CACHE_ENABLED = os.environ.get('LLM_CACHE_ENABLED', '0').lower() in ('1', 'true', 'yes')
+LLM_CACHE_PATH = os.environ.get('LLM_CACHE_PATH', 'llm_cache.db')
+LLM_CACHE_TTL = float(os.environ.get('LLM_CACHE_TTL', 7 * 24 * 3600))
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get('LLM_CACHE_MAX_ENTRIES', 1000))
+
+
+def normalize_text(text):
+    # Line endings and trailing whitespace never change what the model is asked
+    lines = text.replace('\r\n', '\n').split('\n')
+    return '\n'.join(line.rstrip() for line in lines).strip()
+
+
+def cache_key(backend, model, messages, temperature, max_tokens):
+    normalized = [{"role": m["role"], "content": normalize_text(m["content"])} for m in messages]
+    payload = json.dumps({"backend": backend, "model": model, "messages": normalized,
+                          "temperature": temperature, "max_tokens": max_tokens}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, path=LLM_CACHE_PATH, enabled=LLM_CACHE_ENABLED, ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.enabled = enabled
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._schema_ready = False
+
+    def _connection(self):
+        if not self._schema_ready:
+            with db.connection(self.path) as conn:
+                conn.execute('''CREATE TABLE IF NOT EXISTS llm_response_cache (
+                    key TEXT PRIMARY KEY,
+                    model TEXT,
+                    response TEXT,
+                    created REAL
+                )''')
+            self._schema_ready = True
+        return db.connection(self.path)
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        with self._connection() as conn:
+            row = conn.execute('SELECT response, created FROM llm_response_cache WHERE key = ?', (key,)).fetchone()
+        with self._lock:
+            if row and time.time() - row[1] <= self.ttl:
+                self.hits += 1
+                return row[0]
+            self.misses += 1
+        return None
+
+    def put(self, key, model, response):
+        if not self.enabled or not response:
+            return
+        with self._connection() as conn:
+            conn.execute('INSERT OR REPLACE INTO llm_response_cache (key, model, response, created) VALUES (?,?,?,?)',
+                         (key, model, response, time.time()))
+            conn.execute('DELETE FROM llm_response_cache WHERE created < ?', (time.time() - self.ttl,))
+            conn.execute('''DELETE FROM llm_response_cache WHERE key IN (
+                SELECT key FROM llm_response_cache ORDER BY created DESC LIMIT -1 OFFSET ?)''', (self.max_entries,))
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {"enabled": self.enabled, "hits": self.hits, "misses": self.misses,
+                    "hit_rate": self.hits / total if total else 0.0}
+
+    def clear(self):
+        with self._connection() as conn:
+            conn.execute('DELETE FROM llm_response_cache')
+
+
+response_cache = ResponseCache()
@@ -0,0 +1,313 @@
+"""
+Pooled chat-completion client shared by every generation path.
+
+AsyncChatClient is asyncio-native and keeps one httpx connection pool per
+backend (OpenAI, LMStudio) with keep-alive and, when the `h2` package is
+installed, HTTP/2. ChatClient is the sync wrapper: it runs a single
+AsyncChatClient on a background event loop, so every Gradio session, batch
+worker and LLMClient instance in the process reuses the same warm
+connections instead of paying TCP/TLS setup per request. ChatClient also
+consults the opt-in response cache (llm_cache) before going to the network.
+Every request first reserves capacity from the per-backend RPM/TPM limits in
+rate_limit, and 429/502/503 responses are retried with jittered backoff.
+Each call is recorded as an "llm" telemetry span (time to first token, total
+time, prompt/completion tokens, model, backend, cache hit), along with the
+prompt tokens the backend served from its own prefix cache when it reports
+them (OpenAI usage details, llama.cpp/LMStudio timings).
+"""
+
+import asyncio
+import atexit
+import importlib.util
+import json
+import os
+import queue
+import threading
+
+import httpx
+
+from llm_cache import cache_key, response_cache
+from prompt_budget import count_message_tokens, count_tokens
+from rate_limit import LLM_MAX_RETRIES, RETRYABLE_STATUS, backoff_delay, rate_limits
+from telemetry import llm_span, recording
+
+OPENAI_API_BASE = os.environ.get('OPENAI_API_BASE', 'https://api.openai.com/v1')
+LMSTUDIO_URL = os.environ.get('LMSTUDIO_URL', 'http://192.168.86.101:1234/v1/chat/completions')
+LLM_TIMEOUT = float(os.environ.get('LLM_TIMEOUT', 120))
+LLM_CONNECT_TIMEOUT = float(os.environ.get('LLM_CONNECT_TIMEOUT', 10))
+LLM_MAX_CONNECTIONS = int(os.environ.get('LLM_MAX_CONNECTIONS', 20))
+LLM_KEEPALIVE_EXPIRY = float(os.environ.get('LLM_KEEPALIVE_EXPIRY', 60))
+
+HTTP2_AVAILABLE = importlib.util.find_spec('h2') is not None
+
+SYSTEM_PROMPT = "You are an expert career advisor."
+
+
+def chat_messages(prompt, system=SYSTEM_PROMPT):
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": prompt}
+    ]
+
+
+def prefix_cached_tokens(data):
+    # OpenAI: usage.prompt_tokens_details.cached_tokens; llama.cpp-based servers: timings.cache_n
+    details = (data.get("usage") or {}).get("prompt_tokens_details") or {}
+    if details.get("cached_tokens") is not None:
+        return details["cached_tokens"]
+    return (data.get("timings") or {}).get("cache_n")
+
+
+class AsyncChatClient:
+    def __init__(self, timeout=LLM_TIMEOUT, connect_timeout=LLM_CONNECT_TIMEOUT, max_connections=LLM_MAX_CONNECTIONS,
+                 keepalive_expiry=LLM_KEEPALIVE_EXPIRY, http2=HTTP2_AVAILABLE, lmstudio_url=LMSTUDIO_URL, openai_api_base=OPENAI_API_BASE):
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections, keepalive_expiry=keepalive_expiry)
+        self.http2 = http2
+        self.lmstudio_url = lmstudio_url
+        self.openai_api_base = openai_api_base.rstrip('/')
+        self._clients = {}
+
+    def _client(self, backend):
+        if backend not in self._clients:
+            self._clients[backend] = httpx.AsyncClient(timeout=self.timeout, limits=self.limits, http2=self.http2)
+        return self._clients[backend]
+
+    def _request(self, backend, api_key=None, url=None):
+        if backend == 'openai':
+            key = api_key or os.environ.get('OPENAI_API_KEY')
+            headers = {"Authorization": f"Bearer {key}"} if key else {}
+            return url or f"{self.openai_api_base}/chat/completions", headers
+        elif backend == 'lmstudio':
+            return url or self.lmstudio_url, {}
+        raise ValueError(f"Unknown LLM backend: {backend}")
+
+    async def _throttle(self, backend, messages, model, max_tokens):
+        wait = rate_limits.reserve(backend, count_message_tokens(messages, model) + max_tokens)
+        if wait:
+            await asyncio.sleep(wait)
+
+    def _retry_delay(self, backend, resp, attempt):
+        # Seconds to wait before retrying a failed response, or None to give up
+        if resp.status_code not in RETRYABLE_STATUS or attempt >= LLM_MAX_RETRIES:
+            return None
+        delay = backoff_delay(attempt, resp.headers.get("retry-after"))
+        if resp.status_code == 429:
+            rate_limits.penalize(backend, delay)
+        print(f"[WARN] {backend} returned HTTP {resp.status_code}; retry {attempt + 1}/{LLM_MAX_RETRIES} in {delay:.1f}s")
+        return delay
+
+    async def chat(self, messages, model, max_tokens, temperature, backend='openai', api_key=None, url=None, on_prefix_cache=None):
+        endpoint, headers = self._request(backend, api_key, url)
+        payload = {
+            "model": model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature
+        }
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            await self._throttle(backend, messages, model, max_tokens)
+            resp = await self._client(backend).post(endpoint, json=payload, headers=headers)
+            delay = self._retry_delay(backend, resp, attempt) if resp.is_error else None
+            if delay is None:
+                break
+            await asyncio.sleep(delay)
+        resp.raise_for_status()
+        data = resp.json()
+        cached = prefix_cached_tokens(data)
+        if on_prefix_cache and cached is not None:
+            on_prefix_cache(cached)
+        return data["choices"][0]["message"]["content"].strip()
+
+    async def stream_chat(self, messages, model, max_tokens, temperature, backend='openai', api_key=None, url=None, on_prefix_cache=None):
+        # Server-sent events: OpenAI (stream=True) and LMStudio emit the same "data: {...}" chunks
+        endpoint, headers = self._request(backend, api_key, url)
+        payload = {
+            "model": model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "stream": True
+        }
+        if backend == 'openai':
+            # Adds a final chunk with usage, which is where OpenAI reports cached prompt tokens
+            payload["stream_options"] = {"include_usage": True}
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            await self._throttle(backend, messages, model, max_tokens)
+            async with self._client(backend).stream("POST", endpoint, json=payload, headers=headers) as resp:
+                if resp.is_error:
+                    await resp.aread()
+                    delay = self._retry_delay(backend, resp, attempt)
+                    if delay is None:
+                        resp.raise_for_status()
+                else:
+                    async for line in resp.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[len("data:"):].strip()
+                        if data == "[DONE]":
+                            break
+                        chunk = json.loads(data)
+                        cached = prefix_cached_tokens(chunk)
+                        if on_prefix_cache and cached is not None:
+                            on_prefix_cache(cached)
+                        choices = chunk.get("choices") or [{}]
+                        delta = (choices[0].get("delta") or {}).get("content")
+                        if delta:
+                            yield delta
+                    return
+            # Only errors before the first chunk are retried, so no partial output is ever repeated
+            await asyncio.sleep(delay)
+
+    async def aclose(self):
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+
+
+class ChatClient:
+    """Sync (and cross-loop async) facade over one AsyncChatClient running on a private event loop."""
+
+    def __init__(self, **client_kwargs):
+        self._client_kwargs = client_kwargs
+        self._async_client = None
+        self._loop = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="llm-pool", daemon=True).start()
+                self._async_client = AsyncChatClient(**self._client_kwargs)
+        return self._loop
+
+    def _submit(self, coro_fn, *args, **kwargs):
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(coro_fn(*args, **kwargs), loop)
+
+    def _span(self, messages, model, max_tokens, backend, stream):
+        return llm_span(backend, model, messages, count_message_tokens(messages, model), max_tokens=max_tokens, stream=stream)
+
+    def chat(self, messages, model, max_tokens, temperature, backend='openai', api_key=None, url=None, bypass_cache=False):
+        key = cache_key(backend, model, messages, temperature, max_tokens)
+        with recording(self._span(messages, model, max_tokens, backend, False)) as s:
+            cached = None if bypass_cache else response_cache.get(key)
+            if cached is not None:
+                s.set(cached=True)
+                return cached
+            text = self._submit(self._async_client_chat, messages, model, max_tokens, temperature, backend, api_key, url,
+                                on_prefix_cache=lambda n: s.set(cached_prompt_tokens=n)).result()
+            s.set(completion_tokens=count_tokens(text, model))
+        response_cache.put(key, model, text)
+        return text
+
+    async def achat(self, messages, model, max_tokens, temperature, backend='openai', api_key=None, url=None, bypass_cache=False):
+        # Callable from any event loop; the request itself always runs on the pool's loop
+        key = cache_key(backend, model, messages, temperature, max_tokens)
+        with recording(self._span(messages, model, max_tokens, backend, False)) as s:
+            cached = None if bypass_cache else response_cache.get(key)
+            if cached is not None:
+                s.set(cached=True)
+                return cached
+            future = self._submit(self._async_client_chat, messages, model, max_tokens, temperature, backend, api_key, url,
+                                  on_prefix_cache=lambda n: s.set(cached_prompt_tokens=n))
+            text = await asyncio.wrap_future(future)
+            s.set(completion_tokens=count_tokens(text, model))
+        response_cache.put(key, model, text)
+        return text
+
+    def stream_chat(self, messages, model, max_tokens, temperature, backend='openai', api_key=None, url=None, bypass_cache=False):
+        """Yield content deltas as they arrive; closing the generator cancels the request."""
+        key = cache_key(backend, model, messages, temperature, max_tokens)
+        text = ''
+        with recording(self._span(messages, model, max_tokens, backend, True)) as s:
+            cached = None if bypass_cache else response_cache.get(key)
+            if cached is not None:
+                s.set(cached=True)
+                yield cached
+                return
+            chunks = queue.Queue()
+            future = self._submit(self._pump_stream, chunks.put, messages, model, max_tokens, temperature, backend, api_key, url)
+            try:
+                while True:
+                    kind, value = chunks.get()
+                    if kind == 'chunk':
+                        s.first_token()
+                        text += value
+                        yield value
+                    elif kind == 'prefix_cache':
+                        s.set(cached_prompt_tokens=value)
+                    elif kind == 'error':
+                        raise value
+                    else:
+                        break
+            finally:
+                future.cancel()
+                s.set(completion_tokens=count_tokens(text, model))
+        # Only completed streams are cached
+        response_cache.put(key, model, text.strip())
+
+    async def astream_chat(self, messages, model, max_tokens, temperature, backend='openai', api_key=None, url=None, bypass_cache=False):
+        key = cache_key(backend, model, messages, temperature, max_tokens)
+        text = ''
+        with recording(self._span(messages, model, max_tokens, backend, True)) as s:
+            cached = None if bypass_cache else response_cache.get(key)
+            if cached is not None:
+                s.set(cached=True)
+                yield cached
+                return
+            caller_loop = asyncio.get_running_loop()
+            chunks = asyncio.Queue()
+            put = lambda item: caller_loop.call_soon_threadsafe(chunks.put_nowait, item)
+            future = self._submit(self._pump_stream, put, messages, model, max_tokens, temperature, backend, api_key, url)
+            try:
+                while True:
+                    kind, value = await chunks.get()
+                    if kind == 'chunk':
+                        s.first_token()
+                        text += value
+                        yield value
+                    elif kind == 'prefix_cache':
+                        s.set(cached_prompt_tokens=value)
+                    elif kind == 'error':
+                        raise value
+                    else:
+                        break
+            finally:
+                future.cancel()
+                s.set(completion_tokens=count_tokens(text, model))
+        response_cache.put(key, model, text.strip())
+
+    async def _pump_stream(self, put, *args):
+        try:
+            async for delta in self._async_client.stream_chat(*args, on_prefix_cache=lambda n: put(('prefix_cache', n))):
+                put(('chunk', delta))
+        except Exception as e:
+            put(('error', e))
+        else:
+            put(('done', None))
+
+    async def _async_client_chat(self, *args, **kwargs):
+        return await self._async_client.chat(*args, **kwargs)
+
+    def close(self):
+        with self._lock:
+            if self._loop is None:
+                return
+            asyncio.run_coroutine_threadsafe(self._async_client.aclose(), self._loop).result(timeout=5)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop = None
+
+
+_chat_client = None
+_chat_client_lock = threading.Lock()
+
+
+def get_chat_client():
+    global _chat_client
+    with _chat_client_lock:
+        if _chat_client is None:
+            _chat_client = ChatClient()
+            atexit.register(_chat_client.close)
+        return _chat_client
@@ -0,0 +1,152 @@
+"""
+Cached registry of the models each LLM backend offers.
+
+Model discovery used to run (openai.Model.list()) on every generation. The
+registry resolves the list once, refreshes it in a background thread every
+MODEL_REGISTRY_TTL seconds, and keeps serving the last known good list (also
+persisted to MODEL_REGISTRY_CACHE) whenever discovery fails.
+"""
+
+import json
+import os
+import threading
+import time
+
+MODEL_REGISTRY_TTL = float(os.environ.get('MODEL_REGISTRY_TTL', 3600))
+MODEL_REGISTRY_CACHE = os.environ.get('MODEL_REGISTRY_CACHE', 'model_registry.json')
+
+# Models in order of preference; the last entry is used when nothing is known
+PREFERRED_MODELS = {
+    'openai': ['gpt-4o', 'gpt-3.5-turbo'],
+    'lmstudio': [os.environ.get('LMSTUDIO_MODEL', 'gpt-4o')],
+}
+# Cheap models for small side tasks such as metadata extraction
+SMALL_MODELS = {
+    'openai': [os.environ.get('METADATA_MODEL', 'gpt-4o-mini'), 'gpt-3.5-turbo'],
+    'lmstudio': [os.environ.get('LMSTUDIO_MODEL', 'gpt-4o')],
+}
+
+
+def _list_openai_models():
+    import openai
+    return [m.id for m in openai.Model.list().data]
+
+
+def _list_lmstudio_models():
+    import requests
+    chat_url = os.environ.get('LMSTUDIO_URL', 'http://192.168.86.101:1234/v1/chat/completions')
+    models_url = chat_url.rsplit('/chat/completions', 1)[0] + '/models'
+    resp = requests.get(models_url, timeout=10)
+    resp.raise_for_status()
+    return [m['id'] for m in resp.json().get('data', [])]
+
+
+LISTERS = {
+    'openai': _list_openai_models,
+    'lmstudio': _list_lmstudio_models,
+}
+
+
+class ModelRegistry:
+    def __init__(self, backend, lister=None, preferred=None, ttl=MODEL_REGISTRY_TTL, cache_path=MODEL_REGISTRY_CACHE):
+        self.backend = backend
+        self.lister = lister or LISTERS[backend]
+        self.preferred = preferred or PREFERRED_MODELS.get(backend, [])
+        self.ttl = ttl
+        self.cache_path = cache_path
+        self.fetched_at = None
+        self.last_error = None
+        self._models = self._load_cached()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _load_cached(self):
+        try:
+            with open(self.cache_path, encoding='utf-8') as f:
+                return json.load(f).get(self.backend, [])
+        except (OSError, ValueError):
+            return []
+
+    def _save_cached(self, models):
+        try:
+            try:
+                with open(self.cache_path, encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                data = {}
+            data[self.backend] = models
+            with open(self.cache_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+        except OSError as e:
+            print(f"[WARN] Could not persist model list: {e}")
+
+    def refresh(self):
+        try:
+            models = self.lister()
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"[WARN] Model discovery for {self.backend} failed, using last known good list: {e}")
+            return False
+        with self._lock:
+            self._models = models
+            self.fetched_at = time.time()
+            self.last_error = None
+        self._save_cached(models)
+        return True
+
+    def start(self):
+        # Resolve once up front, then keep the list fresh in the background
+        if self._thread is not None:
+            return self
+        self.refresh()
+        self._thread = threading.Thread(target=self._refresh_loop, name=f"model-registry-{self.backend}", daemon=True)
+        self._thread.start()
+        return self
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.ttl):
+            self.refresh()
+
+    def stop(self):
+        self._stop.set()
+
+    def models(self):
+        with self._lock:
+            return list(self._models)
+
+    def resolve(self, preferred=None):
+        preferred = preferred or self.preferred
+        available = self.models()
+        for model in preferred:
+            if model in available:
+                return model
+        if available and self.backend != 'openai':
+            # Local servers serve whatever is loaded; take the first model they report
+            return available[0]
+        return preferred[-1] if preferred else None
+
+
+_registries = {}
+# One lock per backend: the first lookup blocks on model discovery, which must not hold up other backends
+_registry_locks = {backend: threading.Lock() for backend in LISTERS}
+
+
+def get_registry(backend='openai'):
+    if backend not in LISTERS:
+        raise ValueError(f"Unknown LLM backend: {backend}")
+    registry = _registries.get(backend)
+    if registry is None:
+        with _registry_locks[backend]:
+            registry = _registries.get(backend)
+            if registry is None:
+                registry = _registries[backend] = ModelRegistry(backend).start()
+    return registry
+
+
+def resolve_model(backend='openai'):
+    return get_registry(backend).resolve()
+
+
+def resolve_small_model(backend='openai'):
+    return get_registry(backend).resolve(SMALL_MODELS.get(backend))
@@ -0,0 +1,87 @@
+"""
+Persistent cache for text extracted from resume/CV PDFs.
+
+Entries are keyed by the SHA-256 of the PDF bytes, so an unchanged resume is
+only parsed once no matter how many generations or regenerations use it. Each
+entry records the extractor name and version; bumping the version of an
+extractor invalidates everything it produced. The cache is trimmed
+least-recently-used first once it grows past PDF_CACHE_MAX_BYTES.
+"""
+
+import hashlib
+import io
+import os
+import time
+
+import datastore as db
+
+PDF_CACHE_PATH = os.environ.get('PDF_CACHE_PATH', 'pdf_cache.db')
+PDF_CACHE_MAX_BYTES = int(os.environ.get('PDF_CACHE_MAX_BYTES', 50 * 1024 * 1024))
+
+
+_schema_ready = False
+
+
+def _connection():
+    global _schema_ready
+    if not _schema_ready:
+        with db.connection(PDF_CACHE_PATH) as conn:
+            conn.execute('''CREATE TABLE IF NOT EXISTS pdf_text_cache (
+                sha256 TEXT,
+                extractor TEXT,
+                version TEXT,
+                text TEXT,
+                size INTEGER,
+                last_used REAL,
+                PRIMARY KEY (sha256, extractor)
+            )''')
+        _schema_ready = True
+    return db.connection(PDF_CACHE_PATH)
+
+
+def read_pdf_bytes(pdf_file):
+    # Accept a path, a file-like object or the bytes themselves
+    if isinstance(pdf_file, (bytes, bytearray)):
+        return bytes(pdf_file)
+    if not hasattr(pdf_file, "seek"):
+        with open(pdf_file, "rb") as f:
+            return f.read()
+    pdf_file.seek(0)
+    return pdf_file.read()
+
+
+def cached_extract(pdf_file, extractor, extractor_name, extractor_version):
+    """Return the text of pdf_file, calling extractor(stream) only on a cache miss."""
+    data = read_pdf_bytes(pdf_file)
+    digest = hashlib.sha256(data).hexdigest()
+    with _connection() as conn:
+        row = conn.execute('SELECT version, text FROM pdf_text_cache WHERE sha256 = ? AND extractor = ?', (digest, extractor_name)).fetchone()
+        if row and row[0] == extractor_version:
+            conn.execute('UPDATE pdf_text_cache SET last_used = ? WHERE sha256 = ? AND extractor = ?', (time.time(), digest, extractor_name))
+            return row[1]
+    # Parse outside the connection so a slow PDF never holds a pooled connection
+    text = extractor(io.BytesIO(data))
+    with _connection() as conn:
+        c = conn.cursor()
+        c.execute('INSERT OR REPLACE INTO pdf_text_cache (sha256, extractor, version, text, size, last_used) VALUES (?,?,?,?,?,?)',
+                  (digest, extractor_name, extractor_version, text, len(text.encode('utf-8')), time.time()))
+        _evict(c)
+    return text
+
+
+def _evict(c):
+    c.execute('SELECT COALESCE(SUM(size), 0) FROM pdf_text_cache')
+    total = c.fetchone()[0]
+    if total <= PDF_CACHE_MAX_BYTES:
+        return
+    c.execute('SELECT sha256, extractor, size FROM pdf_text_cache ORDER BY last_used ASC')
+    for sha, extractor_name, size in c.fetchall():
+        if total <= PDF_CACHE_MAX_BYTES:
+            break
+        c.execute('DELETE FROM pdf_text_cache WHERE sha256 = ? AND extractor = ?', (sha, extractor_name))
+        total -= size
+
+
+def clear_cache():
+    with _connection() as conn:
+        conn.execute('DELETE FROM pdf_text_cache')
@@ -0,0 +1,145 @@
+"""
+Out-of-process PDF text extraction.
+
+PyPDF2 is pure Python: parsing a large resume holds the GIL on the request
+thread and stalls every other session, and a malformed upload can spin
+forever. Extraction therefore runs in worker processes. Documents longer
+than PDF_PAGES_PER_CHUNK pages are split into page ranges that are parsed in
+parallel (up to PDF_WORKERS at a time), each worker runs under an
+address-space limit (PDF_MEMORY_LIMIT_MB), and the whole document must
+finish within PDF_TIMEOUT seconds. Whatever did finish is returned. Pages
+that failed or timed out are reported in a PartialExtraction error that
+carries the partial text, so callers can go on with a warning instead of
+failing.
+
+Every document gets its own short-lived workers, so a parser stuck past the
+deadline is killed along with that document's other workers and never
+takes down another upload's extraction. With the forkserver start method
+the workers are forked with the parsers already imported, which keeps that
+cheap.
+"""
+
+import io
+import multiprocessing
+import os
+import threading
+import time
+
+PDF_WORKERS = int(os.environ.get('PDF_WORKERS', min(4, os.cpu_count() or 1)))
+PDF_TIMEOUT = float(os.environ.get('PDF_TIMEOUT', 30))
+PDF_MEMORY_LIMIT_MB = int(os.environ.get('PDF_MEMORY_LIMIT_MB', 1024))
+PDF_PAGES_PER_CHUNK = int(os.environ.get('PDF_PAGES_PER_CHUNK', 10))
+# forkserver/spawn workers do not inherit the app's threads and locks the way fork would
+PDF_START_METHOD = os.environ.get('PDF_START_METHOD', 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn')
+# Imported once in the fork server instead of in every worker
+PDF_PRELOAD = ['pdf_extract', 'PyPDF2']
+
+
+class PartialExtraction(Exception):
+    """Some pages could not be extracted; .text holds what could, .warning says what is missing."""
+    def __init__(self, text, warning):
+        super().__init__(warning)
+        self.text = text
+        self.warning = warning
+
+
+def _limit_memory(limit_mb):
+    try:
+        import resource
+    except ImportError:  # not available on Windows
+        return
+    if limit_mb > 0:
+        limit = limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def pypdf2_pages(data, start, end):
+    """Runs in a worker: (page_count, [(page_number, text or None, error or None)]) for pages [start, end)."""
+    import PyPDF2
+    reader = PyPDF2.PdfReader(io.BytesIO(data))
+    count = len(reader.pages)
+    pages = []
+    for number in range(start, min(end, count)):
+        try:
+            pages.append((number, reader.pages[number].extract_text(), None))
+        except Exception as e:
+            pages.append((number, None, f"{type(e).__name__}: {e}"))
+    return count, pages
+
+
+class ExtractionPool:
+    def __init__(self, workers=PDF_WORKERS, timeout=PDF_TIMEOUT, memory_limit_mb=PDF_MEMORY_LIMIT_MB,
+                 pages_per_chunk=PDF_PAGES_PER_CHUNK, start_method=PDF_START_METHOD):
+        self.workers = workers
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.pages_per_chunk = pages_per_chunk
+        self.start_method = start_method
+
+    def _new_pool(self, processes):
+        ctx = multiprocessing.get_context(self.start_method)
+        if self.start_method == 'forkserver':
+            ctx.set_forkserver_preload(PDF_PRELOAD)
+        return ctx.Pool(processes, initializer=_limit_memory, initargs=(self.memory_limit_mb,))
+
+    def extract(self, data, page_reader=pypdf2_pages, kind='PDF'):
+        """
+        Return the text of the PDF in `data` (bytes), one "\\n"-terminated entry per page.
+        Raises PartialExtraction if any page failed, timed out or ran out of memory; `kind`
+        ('PDF', 'DOCX') names the document in its warning.
+        """
+        deadline = time.monotonic() + self.timeout
+        # The page count is only known once the first range is parsed, so that runs on its own
+        pools = [self._new_pool(1)]
+        try:
+            first = pools[0].apply_async(page_reader, (data, 0, self.pages_per_chunk))
+            try:
+                count, chunk = first.get(timeout=max(0.0, deadline - time.monotonic()))
+            except multiprocessing.TimeoutError:
+                raise PartialExtraction('', f"{kind} extraction timed out after {self.timeout:.0f}s.")
+            except Exception as e:
+                raise PartialExtraction('', f"{kind} could not be read ({type(e).__name__}: {e}).")
+            starts = range(self.pages_per_chunk, count, self.pages_per_chunk)
+            if starts:
+                pools.append(self._new_pool(min(self.workers, len(starts))))
+            pending = [((start, min(start + self.pages_per_chunk, count)), pools[-1].apply_async(page_reader, (data, start, start + self.pages_per_chunk)))
+                       for start in starts]
+            results = [chunk]
+            pages, problems = {}, []
+            for (start, end), result in pending:
+                try:
+                    results.append(result.get(timeout=max(0.0, deadline - time.monotonic()))[1])
+                except multiprocessing.TimeoutError:
+                    problems.append(f"pages {start + 1}-{end} timed out")
+                except Exception as e:
+                    problems.append(f"pages {start + 1}-{end} failed ({type(e).__name__})")
+        finally:
+            # Only this document's workers; a stuck one cannot be stopped any other way
+            for pool in pools:
+                pool.terminate()
+        for chunk in results:
+            for number, text, error in chunk:
+                if error:
+                    problems.append(f"page {number + 1} failed ({error})")
+                else:
+                    pages[number] = text or ''
+        text = ''.join(pages[number] + "\n" for number in sorted(pages))
+        if problems:
+            raise PartialExtraction(text, f"Extracted {len(pages)} of {count} {kind} pages; " + "; ".join(problems) + ".")
+        return text
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_extraction_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ExtractionPool()
+        return _pool
+
+
+def extract_pdf_bytes(data, page_reader=pypdf2_pages, kind='PDF'):
+    return get_extraction_pool().extract(data, page_reader, kind)
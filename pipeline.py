@@ -0,0 +1,135 @@
+"""
+Minimal DAG runner for the generation pipeline.
+
+A Pipeline is a set of named stages, each a callable taking a StageContext.
+A stage starts as soon as every name it depends on is available, either as
+another stage's return value or as an intermediate value some running stage
+published with ctx.publish(). That is what lets the cover letter start from a
+streamed resume prefix while the resume is still being written, and lets
+metadata extraction decide whether either of them starts.
+
+run() is a generator of (stage, kind, value) events in completion order:
+'progress' for ctx.emit() calls, 'published' for ctx.publish(), and 'done'
+with the stage's return value. The first stage error cancels the pipeline
+and is re-raised from run() as a StageError; closing the generator early cancels it too.
+Long-running stages should check ctx.cancelled and return promptly.
+
+Each stage runs as a "stage.<name>" telemetry span, in a copy of the context
+the Pipeline was created in, so it nests under whatever span was active then.
+"""
+
+import contextvars
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from telemetry import span
+
+PIPELINE_WORKERS = int(os.environ.get('PIPELINE_WORKERS', 4))
+
+
+class StageError(Exception):
+    """A stage failed; .stage names it and the original exception is chained."""
+    def __init__(self, stage, error):
+        super().__init__(str(error))
+        self.stage = stage
+        self.error = error
+
+class StageContext:
+    def __init__(self, pipeline, name):
+        self._pipeline = pipeline
+        self.name = name
+
+    def __getitem__(self, key):
+        return self._pipeline.results[key]
+
+    def get(self, key, default=None):
+        return self._pipeline.results.get(key, default)
+
+    @property
+    def cancelled(self):
+        return self._pipeline.cancelled.is_set()
+
+    def emit(self, value):
+        self._pipeline._events.put((self.name, 'progress', value))
+
+    def publish(self, key, value):
+        """Make an intermediate value available to stages that depend on key."""
+        self._pipeline._resolve(key, value)
+        self._pipeline._events.put((self.name, 'published', (key, value)))
+
+
+class Pipeline:
+    def __init__(self, max_workers=PIPELINE_WORKERS):
+        self.max_workers = max_workers
+        self.results = {}
+        self.cancelled = threading.Event()
+        self._stages = {}
+        self._started = set()
+        self._events = queue.Queue()
+        self._lock = threading.Lock()
+        self._executor = None
+        self._context = contextvars.copy_context()
+
+    def stage(self, name, fn, deps=()):
+        self._stages[name] = (fn, tuple(deps))
+        return self
+
+    def _ready(self):
+        return [name for name, (_, deps) in self._stages.items()
+                if name not in self._started and all(d in self.results for d in deps)]
+
+    def _submit_ready(self):
+        with self._lock:
+            ready = self._ready()
+            self._started.update(ready)
+        for name in ready:
+            # A context can only be entered by one thread at a time, so each stage gets its own copy
+            self._executor.submit(self._context.copy().run, self._run_stage, name)
+
+    def _resolve(self, key, value):
+        with self._lock:
+            self.results.setdefault(key, value)
+        if not self.cancelled.is_set():
+            self._submit_ready()
+
+    def _run_stage(self, name):
+        fn, _ = self._stages[name]
+        try:
+            with span(f'stage.{name}'):
+                result = fn(StageContext(self, name))
+        except BaseException as e:
+            self._events.put((name, 'error', e))
+            return
+        with self._lock:
+            self.results[name] = result
+        # Start dependants before reporting completion, so run() never sees a gap with nothing started
+        if not self.cancelled.is_set():
+            self._submit_ready()
+        self._events.put((name, 'done', result))
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def run(self):
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='pipeline')
+        finished = set()
+        try:
+            self._submit_ready()
+            while len(finished) < len(self._stages):
+                with self._lock:
+                    stalled = not self._started - finished and self._events.empty()
+                if stalled:
+                    missing = {n: d for n, (_, d) in self._stages.items() if n not in self._started}
+                    raise RuntimeError(f"Pipeline stages can never start, unmet dependencies: {missing}")
+                name, kind, value = self._events.get()
+                if kind == 'error':
+                    raise StageError(name, value) from value
+                if kind == 'done':
+                    finished.add(name)
+                yield name, kind, value
+        finally:
+            self.cancel()
+            # Do not wait for cancelled stages; they notice ctx.cancelled and wind down on their own
+            self._executor.shutdown(wait=False)
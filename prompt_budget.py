@@ -0,0 +1,201 @@
+"""
+Token counting and prompt budgeting.
+
+Counts tokens with the model's real BPE (tiktoken) instead of the old
+chars/4 heuristic, so long CVs are accepted on large-context models and
+oversized prompts are caught before they reach small-context ones. Rank files
+are loaded from TOKENIZER_DIR (e.g. tokenizers/o200k_base.tiktoken, verified
+against tiktoken's published hash) so no network access is needed at runtime;
+without them tiktoken's own cache is tried, and as a last resort a
+conservative regex-based estimate is used.
+
+Counts are memoized per (text, encoding), so the resume and facts segments
+that repeat across generations are only tokenized once. When a prompt does
+not fit, fit_sections trims the lowest-priority sections first instead of
+refusing the request.
+"""
+
+import functools
+import hashlib
+import math
+import os
+import re
+import threading
+from dataclasses import dataclass
+
+TOKENIZER_DIR = os.environ.get('TOKENIZER_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tokenizers'))
+
+MODEL_CONTEXT_WINDOWS = {
+    'gpt-4o': 128000,
+    'gpt-4o-mini': 128000,
+    'gpt-4-turbo': 128000,
+    'gpt-4': 8192,
+    'gpt-3.5-turbo': 16385,
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+
+# Chat framing: a few tokens per message plus the reply primer
+TOKENS_PER_MESSAGE = 4
+REPLY_PRIMER_TOKENS = 3
+# Headroom kept when counts are estimated rather than exact
+ESTIMATE_MARGIN = 1.15
+
+TRUNCATION_MARKER = "\n[... truncated to fit the model's context window ...]\n"
+
+_encodings = {}
+_encodings_lock = threading.Lock()
+
+
+def encoding_name_for_model(model):
+    model = model or ''
+    if model.startswith(('gpt-4o', 'o1', 'o3', 'o4')):
+        return 'o200k_base'
+    return 'cl100k_base'
+
+
+def context_window(model):
+    for prefix in sorted(MODEL_CONTEXT_WINDOWS, key=len, reverse=True):
+        if (model or '').startswith(prefix):
+            return MODEL_CONTEXT_WINDOWS[prefix]
+    return DEFAULT_CONTEXT_WINDOW
+
+
+# tiktoken's specs for the encodings we use, so vendored rank files can be loaded without touching
+# tiktoken_ext.openai_public (whose constructors always fetch from its URLs)
+_LOCAL_ENCODINGS = {
+    'o200k_base': {
+        'expected_hash': '446a9538cb6c348e3516120d7c08b09f57c36495e2acfffe59a5bf8b0cfb1a2d',
+        'pat_str': '|'.join([
+            r"""[^\r\n\p{L}\p{N}]?[\p{Lu}\p{Lt}\p{Lm}\p{Lo}\p{M}]*[\p{Ll}\p{Lm}\p{Lo}\p{M}]+(?i:'s|'t|'re|'ve|'m|'ll|'d)?""",
+            r"""[^\r\n\p{L}\p{N}]?[\p{Lu}\p{Lt}\p{Lm}\p{Lo}\p{M}]+[\p{Ll}\p{Lm}\p{Lo}\p{M}]*(?i:'s|'t|'re|'ve|'m|'ll|'d)?""",
+            r"""\p{N}{1,3}""",
+            r""" ?[^\s\p{L}\p{N}]+[\r\n/]*""",
+            r"""\s*[\r\n]+""",
+            r"""\s+(?!\S)""",
+            r"""\s+""",
+        ]),
+        'special_tokens': {'<|endoftext|>': 199999, '<|endofprompt|>': 200018},
+    },
+    'cl100k_base': {
+        'expected_hash': '223921b76ee99bde995b7ff738513eef100fb51d18c93597a113bcffe865b2a7',
+        'pat_str': r"""'(?i:[sdmt]|ll|ve|re)|[^\r\n\p{L}\p{N}]?+\p{L}++|\p{N}{1,3}+| ?[^\s\p{L}\p{N}]++[\r\n]*+|\s++$|\s*[\r\n]|\s+(?!\S)|\s""",
+        'special_tokens': {'<|endoftext|>': 100257, '<|fim_prefix|>': 100258, '<|fim_middle|>': 100259,
+                           '<|fim_suffix|>': 100260, '<|endofprompt|>': 100276},
+    },
+}
+
+
+def _load_encoding(name):
+    try:
+        import tiktoken
+        import tiktoken.load
+    except ImportError:
+        return None
+    local_path = os.path.join(TOKENIZER_DIR, f'{name}.tiktoken')
+    try:
+        if os.path.exists(local_path) and name in _LOCAL_ENCODINGS:
+            spec = _LOCAL_ENCODINGS[name]
+            with open(local_path, 'rb') as f:
+                if hashlib.sha256(f.read()).hexdigest() != spec['expected_hash']:
+                    raise ValueError(f"{local_path} does not match tiktoken's published hash")
+            ranks = tiktoken.load.load_tiktoken_bpe(local_path)
+            return tiktoken.Encoding(name=name, pat_str=spec['pat_str'], mergeable_ranks=ranks, special_tokens=spec['special_tokens'])
+        return tiktoken.get_encoding(name)
+    except Exception as e:
+        print(f"[WARN] Tokenizer {name} unavailable, estimating token counts instead: {e}")
+        return None
+
+
+def get_encoding(name):
+    with _encodings_lock:
+        if name not in _encodings:
+            _encodings[name] = _load_encoding(name)
+        return _encodings[name]
+
+
+# Rough stand-in for BPE pre-tokenization: words, numbers, punctuation runs, whitespace
+_PIECE_RE = re.compile(r"""'(?:[sdmt]|ll|ve|re)| ?[^\W\d_]+| ?\d{1,3}| ?[^\s\w]+|\s+""")
+
+
+def _estimate_tokens(text):
+    count = 0
+    for piece in _PIECE_RE.findall(text):
+        # Common words are one token; long or rare words split roughly every 4 characters
+        count += max(1, math.ceil(len(piece.strip() or piece) / 4))
+    return math.ceil(count * ESTIMATE_MARGIN)
+
+
+@functools.lru_cache(maxsize=2048)
+def _count(text, encoding_name):
+    encoding = get_encoding(encoding_name)
+    if encoding is None:
+        return _estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_tokens(text, model=None):
+    return _count(text or '', encoding_name_for_model(model))
+
+
+def count_message_tokens(messages, model=None):
+    return sum(TOKENS_PER_MESSAGE + count_tokens(m["content"], model) for m in messages) + REPLY_PRIMER_TOKENS
+
+
+def prompt_budget(model, max_output_tokens):
+    """Tokens available for the prompt once the reply has been reserved."""
+    return context_window(model) - max_output_tokens
+
+
+def truncate_to_tokens(text, max_tokens, model=None):
+    if max_tokens <= 0:
+        return ''
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    encoding = get_encoding(encoding_name_for_model(model))
+    if encoding is not None:
+        return encoding.decode(encoding.encode(text, disallowed_special=())[:max_tokens])
+    # Estimated counts: binary search on characters
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if count_tokens(text[:mid], model) <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo]
+
+
+@dataclass
+class PromptSection:
+    name: str
+    text: str
+    priority: int  # lower priorities are trimmed first
+    min_tokens: int = 0  # never trim below this
+
+
+def fit_sections(sections, model, max_output_tokens, fixed_tokens=0):
+    """
+    Trim sections (lowest priority first) until fixed_tokens plus all sections
+    fit in the model's prompt budget. Returns ({name: text}, [trimmed names]);
+    raises ValueError if even the untrimmable parts cannot fit.
+    """
+    budget = prompt_budget(model, max_output_tokens) - fixed_tokens
+    texts = {s.name: s.text or '' for s in sections}
+    counts = {s.name: count_tokens(texts[s.name], model) for s in sections}
+    marker_tokens = count_tokens(TRUNCATION_MARKER, model)
+    overflow = sum(counts.values()) - budget
+    trimmed = []
+    for section in sorted(sections, key=lambda s: s.priority):
+        if overflow <= 0:
+            break
+        keep = max(section.min_tokens, counts[section.name] - overflow - marker_tokens)
+        if keep >= counts[section.name]:
+            continue
+        texts[section.name] = truncate_to_tokens(texts[section.name], keep, model) + TRUNCATION_MARKER
+        new_count = count_tokens(texts[section.name], model)
+        overflow -= counts[section.name] - new_count
+        counts[section.name] = new_count
+        trimmed.append(section.name)
+    if overflow > 0:
+        raise ValueError(f"Prompt exceeds the {context_window(model)}-token context window of {model} by {overflow} tokens even after trimming.")
+    return texts, trimmed
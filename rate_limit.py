@@ -0,0 +1,107 @@
+"""
+Per-backend request and token rate limits for LLM calls.
+
+Each backend gets two token buckets, one for requests per minute and one for
+tokens per minute (prompt plus the max_tokens reserved for the reply), which
+is how providers meter usage. reserve() never blocks: it takes the capacity
+up front and returns how long the caller must wait before sending. That
+works for both the sync paths (time.sleep) and the event loop in llm_pool
+(asyncio.sleep). No limit is set by default, since the right numbers depend
+on the account's tier; set them to stay under it. 429 responses that still get
+through are retried with full-jitter exponential backoff, honouring
+Retry-After when the server sends it.
+
+Limits come from LLM_RPM_<BACKEND> / LLM_TPM_<BACKEND>, e.g. LLM_TPM_OPENAI=30000,
+or RateLimiter(limits={'openai': {'tpm': 30000}}).
+"""
+
+import os
+import random
+import threading
+import time
+
+DEFAULT_RATE_LIMITS = {
+    'openai': {'rpm': None, 'tpm': None},
+    'lmstudio': {'rpm': None, 'tpm': None},
+}
+
+LLM_MAX_RETRIES = int(os.environ.get('LLM_MAX_RETRIES', 5))
+LLM_BACKOFF_BASE = float(os.environ.get('LLM_BACKOFF_BASE', 1.0))
+LLM_BACKOFF_MAX = float(os.environ.get('LLM_BACKOFF_MAX', 60.0))
+
+RETRYABLE_STATUS = (429, 502, 503)
+
+
+class TokenBucket:
+    def __init__(self, per_minute, capacity=None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount=1):
+        """Take amount now (the balance may go negative) and return the seconds to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= amount
+            return max(0.0, -self._tokens / self.rate)
+
+    def penalize(self, seconds):
+        # The provider said to back off: drain enough that later reservations wait too
+        with self._lock:
+            self._tokens = min(self._tokens, -seconds * self.rate)
+
+
+class RateLimiter:
+    def __init__(self, limits=None):
+        self._limits = {backend: dict(values) for backend, values in DEFAULT_RATE_LIMITS.items()}
+        for backend, values in self._limits.items():
+            for kind in ('rpm', 'tpm'):
+                env = os.environ.get(f'LLM_{kind.upper()}_{backend.upper()}')
+                if env:
+                    values[kind] = int(env) or None
+        for backend, values in (limits or {}).items():
+            self._limits.setdefault(backend, {}).update(values)
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, backend, kind):
+        with self._lock:
+            key = (backend, kind)
+            if key not in self._buckets:
+                per_minute = self._limits.get(backend, {}).get(kind)
+                self._buckets[key] = TokenBucket(per_minute) if per_minute else None
+            return self._buckets[key]
+
+    def reserve(self, backend, tokens=0):
+        """Reserve one request and `tokens` tokens; returns the seconds to wait before sending."""
+        wait = 0.0
+        requests = self._bucket(backend, 'rpm')
+        if requests:
+            wait = max(wait, requests.reserve(1))
+        token_bucket = self._bucket(backend, 'tpm')
+        if token_bucket and tokens:
+            wait = max(wait, token_bucket.reserve(tokens))
+        return wait
+
+    def penalize(self, backend, seconds):
+        for kind in ('rpm', 'tpm'):
+            bucket = self._bucket(backend, kind)
+            if bucket:
+                bucket.penalize(seconds)
+
+
+def backoff_delay(attempt, retry_after=None):
+    """Seconds to wait before retry number `attempt` (0-based): Retry-After if given, else full jitter."""
+    if retry_after:
+        try:
+            return min(LLM_BACKOFF_MAX, float(retry_after)) + random.uniform(0, LLM_BACKOFF_BASE)
+        except ValueError:
+            pass
+    return random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** attempt))
+
+
+rate_limits = RateLimiter()
@@ -1,15 +1,54 @@
+import os
+import threading
+import time
+
 from db import add_correction, get_corrections, delete_correction, update_correction
 
+# Reloaded after this many seconds even without a local edit, so worker processes see other processes' edits
+CORRECTIONS_CACHE_TTL = float(os.environ.get('CORRECTIONS_CACHE_TTL', 30))
+
 # CORRECTIONS
 
+class CorrectionsIndex:
+    """A snapshot of the corrections table, split by the output it applies to (row[4]: 'resume' or 'cover')."""
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.by_context = {}
+        for row in self.rows:
+            self.by_context.setdefault(row[4], []).append(row)
+        self.loaded = time.monotonic()
+
+    def for_context(self, context):
+        return self.by_context.get(context, [])
+
+
+_index = None
+_index_lock = threading.Lock()
+
+def corrections_index():
+    global _index
+    with _index_lock:
+        if _index is None or time.monotonic() - _index.loaded > CORRECTIONS_CACHE_TTL:
+            _index = CorrectionsIndex(get_corrections("global"))
+        return _index
+
+def invalidate_corrections():
+    global _index
+    with _index_lock:
+        _index = None
+
 def list_corrections(context="global"):
     return get_corrections(context)
 
 def create_correction(section, original_text, corrected_text, context="global"):
     add_correction(section, original_text, corrected_text, context)
+    invalidate_corrections()
 
 def edit_correction(correction_id, section, original_text, corrected_text, context="global"):
     update_correction(correction_id, section, original_text, corrected_text, context)
+    invalidate_corrections()
 
 def remove_correction(correction_id):
     delete_correction(correction_id)
+    invalidate_corrections()
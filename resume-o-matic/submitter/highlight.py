@@ -0,0 +1,104 @@
+"""
+Highlight many phrases in rendered HTML in one pass.
+
+PhraseMatcher is an Aho-Corasick automaton over the phrases, so scanning
+costs the same with five corrections or five hundred. highlight_html()
+runs it over text nodes only, never over tags or attribute values, and
+marks the leftmost-longest matches without overlaps, so one phrase can no
+longer land inside another's <mark> tag.
+"""
+
+import functools
+import html
+import re
+from collections import deque
+
+MARK_OPEN = '<mark style="background: #ffe066;">'
+MARK_CLOSE = '</mark>'
+
+_TAG = re.compile(r'(<!--.*?-->|<[^>]*>)', re.DOTALL)
+
+
+class PhraseMatcher:
+    def __init__(self, phrases):
+        self.goto = [{}]
+        self.fail = [0]
+        self.lengths = [()]
+        for phrase in set(phrases):
+            if phrase:
+                self._add(phrase)
+        self._link()
+
+    def _add(self, phrase):
+        node = 0
+        for char in phrase:
+            nxt = self.goto[node].get(char)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[node][char] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.lengths.append(())
+            node = nxt
+        self.lengths[node] += (len(phrase),)
+
+    def _link(self):
+        # Breadth-first, so every node's failure target is finished before its children need it
+        pending = deque(self.goto[0].values())
+        while pending:
+            node = pending.popleft()
+            for char, child in self.goto[node].items():
+                target = self.fail[node]
+                while target and char not in self.goto[target]:
+                    target = self.fail[target]
+                self.fail[child] = self.goto[target].get(char, 0)
+                self.lengths[child] += self.lengths[self.fail[child]]
+                pending.append(child)
+
+    def find(self, text):
+        """Non-overlapping (start, end) spans, preferring the leftmost and then the longest match."""
+        if len(self.goto) == 1:
+            return []
+        longest = {}
+        node = 0
+        for i, char in enumerate(text):
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+            for length in self.lengths[node]:
+                start = i + 1 - length
+                if longest.get(start, 0) < length:
+                    longest[start] = length
+        spans, end = [], 0
+        for start in sorted(longest):
+            if start >= end:
+                end = start + longest[start]
+                spans.append((start, end))
+        return spans
+
+
+@functools.lru_cache(maxsize=16)
+def _matcher(phrases):
+    return PhraseMatcher(phrases)
+
+
+def matcher_for(phrases):
+    """A cached matcher for this set of phrases."""
+    return _matcher(frozenset(p for p in phrases if p))
+
+
+def highlight_html(markup, matcher):
+    parts = _TAG.split(markup)
+    for i in range(0, len(parts), 2):
+        # Even parts are text between tags; compare unescaped text so "R&D" matches "R&amp;D"
+        text = html.unescape(parts[i])
+        spans = matcher.find(text)
+        if not spans:
+            continue
+        out, pos = [], 0
+        for start, end in spans:
+            out += [html.escape(text[pos:start], quote=False), MARK_OPEN, html.escape(text[start:end], quote=False), MARK_CLOSE]
+            pos = end
+        out.append(html.escape(text[pos:], quote=False))
+        parts[i] = ''.join(out)
+    return ''.join(parts)
@@ -0,0 +1,230 @@
+"""
+Incremental, forgiving parser for the LLM's structured replies.
+
+The submitter asks for one flat JSON object ({"job_title", "company_name",
+"resume" or "cover_letter"}). StreamingJSONObject is fed the reply chunk by
+chunk and keeps .fields up to date as it goes: short fields as soon as their
+closing quote arrives, and the long markdown field growing with every chunk,
+so the UI can show output long before the reply is finished.
+
+It tolerates what models commonly get wrong instead of failing:
+
+- prose or ```json fences around the object
+- raw newlines and tabs inside strings
+- unquoted keys and single-quoted keys or strings
+- unescaped quotes inside a string (a quote only ends a string when the
+  closing brace, or a comma and the next key, follows it)
+- unknown escapes such as \\d, and trailing commas
+- a reply cut off mid-object (max_tokens): what was read so far is kept
+
+Tolerated defects are listed in .defects. structured_reply() turns a finished
+parse into the final dict; only when the body field cannot be recovered does
+it ask for a repair (a small model rewriting the reply as valid JSON) rather
+than a full regeneration.
+"""
+
+import json
+import re
+
+_ESCAPES = {'"': '"', "'": "'", '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+_FENCE = re.compile(r'^\s*```[a-zA-Z]*\s*|\s*```\s*$')
+# What may follow a string's closing quote: the closing brace, or a comma and the next key (or a trailing comma)
+_AFTER_STRING = re.compile(r'\s*(\}|,\s*(["\'}]|[A-Za-z_][\w-]*\s*:))')
+_AFTER_STRING_SO_FAR = re.compile(r'\s*(,\s*([A-Za-z_][\w-]*\s*)?)?')
+
+
+class StreamingJSONObject:
+    def __init__(self):
+        self.fields = {}
+        self.defects = []
+        self.started = False
+        self.complete = False
+        self._state = 'seek'
+        self._key = []
+        self._quote = '"'
+        self._value = []
+        self._raw = []
+        self._depth = 0
+        self._pending = ''
+        self._unicode = ''
+
+    def feed(self, chunk):
+        """Consume the next piece of the reply; returns the names of fields that changed."""
+        changed = set()
+        for char in chunk:
+            self._step(char, changed)
+        if self._state in ('string', 'escape', 'unicode', 'quote'):
+            # Publish the string that is still being written
+            key = ''.join(self._key)
+            self.fields[key] = ''.join(self._value)
+            changed.add(key)
+        return changed
+
+    def close(self):
+        """End of the reply: settle whatever was in progress and return the fields."""
+        if self._state == 'quote':
+            self._end_value(''.join(self._value), set())
+        elif self._state in ('string', 'escape', 'unicode'):
+            self.fields[''.join(self._key)] = ''.join(self._value)
+            self._note('truncated string')
+        elif self._state == 'raw':
+            self._end_value(self._raw_value(), set())
+        if self.started and not self.complete:
+            self._note('unterminated object')
+        self._state = 'done'
+        return self.fields
+
+    def _note(self, defect):
+        if defect not in self.defects:
+            self.defects.append(defect)
+
+    def _step(self, char, changed):
+        state = self._state
+        if state == 'seek':
+            if char == '{':
+                self.started = True
+                self._state = 'key_or_end'
+        elif state == 'key_or_end':
+            if char in '"\'':
+                self._key, self._quote = [], char
+                self._state = 'key'
+            elif char == '}':
+                self.complete = True
+                self._state = 'done'
+            elif char == ',':
+                self._note('extra comma')
+            elif not char.isspace():
+                # Unquoted key
+                self._key, self._quote = [char], ':'
+                self._state = 'key'
+                self._note('unquoted key')
+        elif state == 'key':
+            if self._quote == ':':
+                # Unquoted: the key runs up to the colon
+                if char == ':':
+                    self._key = list(''.join(self._key).strip())
+                    self._state = 'value'
+                else:
+                    self._key.append(char)
+            elif char == self._quote:
+                self._state = 'colon'
+            else:
+                self._key.append(char)
+        elif state == 'colon':
+            if char == ':':
+                self._state = 'value'
+            elif not char.isspace():
+                self._note('missing colon')
+                self._state = 'value'
+                self._step(char, changed)
+        elif state == 'value':
+            if char in '"\'':
+                if char == "'":
+                    self._note('single-quoted string')
+                self._value, self._quote = [], char
+                self._state = 'string'
+            elif not char.isspace():
+                self._raw, self._depth = [], 0
+                self._state = 'raw'
+                self._step(char, changed)
+        elif state == 'string':
+            if char == '\\':
+                self._state = 'escape'
+            elif char == self._quote:
+                self._pending = ''
+                self._state = 'quote'
+            else:
+                if char in '\n\r\t':
+                    self._note('control character in string')
+                self._value.append(char)
+        elif state == 'escape':
+            if char == 'u':
+                self._unicode = ''
+                self._state = 'unicode'
+                return
+            if char not in _ESCAPES:
+                self._note('invalid escape')
+            self._value.append(_ESCAPES.get(char, '\\' + char))
+            self._state = 'string'
+        elif state == 'unicode':
+            if char not in '0123456789abcdefABCDEF':
+                self._note('invalid escape')
+                self._value.append('\\u' + self._unicode)
+                self._state = 'string'
+                self._step(char, changed)
+                return
+            self._unicode += char
+            if len(self._unicode) == 4:
+                self._value.append(chr(int(self._unicode, 16)))
+                self._state = 'string'
+        elif state == 'quote':
+            # Was that quote the end of the string? Only if the closing brace, or a comma and then
+            # another key (quoted or not), comes next
+            after = self._pending + char
+            if _AFTER_STRING.fullmatch(after):
+                self._end_value(''.join(self._value), changed)
+                # Replay what came after the comma (or the brace) as the start of the next key
+                rest = after.lstrip()
+                for replayed in rest[1:] if rest.startswith(',') else rest:
+                    self._step(replayed, changed)
+            elif _AFTER_STRING_SO_FAR.fullmatch(after):
+                self._pending = after
+            else:
+                self._note('unescaped quote in string')
+                self._value.append(self._quote + self._pending)
+                self._state = 'string'
+                self._step(char, changed)
+        elif state == 'raw':
+            # Numbers, literals and nested values, kept whole until their end at depth 0
+            if self._depth == 0 and char in ',}':
+                self._end_value(self._raw_value(), changed)
+                if char == '}':
+                    self.complete = True
+                    self._state = 'done'
+                return
+            if char in '{[':
+                self._depth += 1
+            elif char in '}]':
+                self._depth -= 1
+            self._raw.append(char)
+
+    def _raw_value(self):
+        raw = ''.join(self._raw).strip()
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return raw
+
+    def _end_value(self, value, changed):
+        key = ''.join(self._key)
+        self.fields[key] = value
+        changed.add(key)
+        self._state = 'key_or_end'
+
+
+def parse_json_reply(text):
+    """Parse a whole reply leniently; returns the parser (see .fields, .complete, .defects)."""
+    parser = StreamingJSONObject()
+    parser.feed(text)
+    parser.close()
+    return parser
+
+
+def structured_reply(parser, raw, body_key, repair=None):
+    """
+    Final fields of a streamed reply. The body field may come from a lenient parse, from a
+    reply that was plain text instead of JSON, or, failing both, from repair(raw) -> text
+    (a cheap model call). Raises ValueError if none of them yields the body.
+    """
+    fields = parser.close()
+    if isinstance(fields.get(body_key), str):
+        return fields
+    if not parser.started:
+        # Plain markdown instead of JSON: the whole reply is the body
+        return {body_key: _FENCE.sub('', raw).strip()}
+    if repair is not None:
+        repaired = parse_json_reply(repair(raw))
+        if isinstance(repaired.fields.get(body_key), str):
+            parser.defects.append('repaired')
+            return repaired.fields
+    raise ValueError(f"no {body_key!r} field in the reply ({', '.join(parser.defects) or 'invalid JSON'})")
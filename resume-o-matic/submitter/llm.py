@@ -1,56 +1,78 @@
 import os
-import openai
-import requests
-import datetime
+
+import repo_root  # noqa: F401
+from model_registry import resolve_model, resolve_small_model
+from llm_pool import chat_messages, get_chat_client
+
+REPAIR_PROMPT = """The text below was meant to be a single JSON object with the keys {keys}, but it is not valid JSON.
+Rewrite it as that JSON object. Copy every value exactly as written; do not add, drop or reword anything.
+Return only the JSON object.
+
+{text}"""
 
 class LLMClient:
     def __init__(self, backend=None, openai_api_key=None, lmstudio_url=None):
         self.backend = backend or os.environ.get('LLM_BACKEND', 'openai')
         self.openai_api_key = openai_api_key or os.environ.get('OPENAI_API_KEY')
         self.lmstudio_url = lmstudio_url or os.environ.get('LMSTUDIO_URL', 'http://192.168.86.101:1234/v1/chat/completions')
+        self._pool = get_chat_client()
+
+    def generate_resume(self, prompt, model=None, max_tokens=1800, temperature=0.7, bypass_cache=False):
+        model = model or resolve_model(self.backend)
+        if self.backend == 'openai':
+            return self._openai_chat(prompt, model, max_tokens, temperature, bypass_cache)
+        elif self.backend == 'lmstudio':
+            return self._lmstudio_chat(prompt, model, max_tokens, temperature, bypass_cache)
+        else:
+            raise ValueError(f"Unknown LLM backend: {self.backend}")
+
+    def generate_cover_letter(self, prompt, model=None, max_tokens=1200, temperature=0.7, bypass_cache=False):
+        model = model or resolve_model(self.backend)
         if self.backend == 'openai':
-            openai.api_key = self.openai_api_key
+            return self._openai_chat(prompt, model, max_tokens, temperature, bypass_cache)
+        elif self.backend == 'lmstudio':
+            return self._lmstudio_chat(prompt, model, max_tokens, temperature, bypass_cache)
+        else:
+            raise ValueError(f"Unknown LLM backend: {self.backend}")
+
+    def _openai_chat(self, prompt, model, max_tokens, temperature, bypass_cache=False):
+        return self._pool.chat(chat_messages(prompt), model, max_tokens, temperature, backend='openai', api_key=self.openai_api_key, bypass_cache=bypass_cache)
 
-    def generate_resume(self, prompt, model='gpt-4o', max_tokens=1800, temperature=0.7):
+    def _lmstudio_chat(self, prompt, model, max_tokens, temperature, bypass_cache=False):
+        # LMStudio REST API, same chat payload as OpenAI; shares the process-wide connection pool
+        return self._pool.chat(chat_messages(prompt), model, max_tokens, temperature, backend='lmstudio', url=self.lmstudio_url, bypass_cache=bypass_cache)
+
+    async def agenerate(self, prompt, model=None, max_tokens=1800, temperature=0.7, bypass_cache=False):
+        model = model or resolve_model(self.backend)
         if self.backend == 'openai':
-            return self._openai_chat(prompt, model, max_tokens, temperature)
+            return await self._pool.achat(chat_messages(prompt), model, max_tokens, temperature, backend='openai', api_key=self.openai_api_key, bypass_cache=bypass_cache)
         elif self.backend == 'lmstudio':
-            return self._lmstudio_chat(prompt, model, max_tokens, temperature)
+            return await self._pool.achat(chat_messages(prompt), model, max_tokens, temperature, backend='lmstudio', url=self.lmstudio_url, bypass_cache=bypass_cache)
         else:
             raise ValueError(f"Unknown LLM backend: {self.backend}")
 
-    def generate_cover_letter(self, prompt, model='gpt-4o', max_tokens=1200, temperature=0.7):
+    def stream_resume(self, prompt, model=None, max_tokens=1800, temperature=0.7, bypass_cache=False):
+        return self._stream(prompt, model, max_tokens, temperature, bypass_cache)
+
+    def stream_cover_letter(self, prompt, model=None, max_tokens=1200, temperature=0.7, bypass_cache=False):
+        return self._stream(prompt, model, max_tokens, temperature, bypass_cache)
+
+    def _stream(self, prompt, model, max_tokens, temperature, bypass_cache):
+        # Content deltas as they arrive (OpenAI stream=True / LMStudio SSE)
+        model = model or resolve_model(self.backend)
         if self.backend == 'openai':
-            return self._openai_chat(prompt, model, max_tokens, temperature)
+            return self._pool.stream_chat(chat_messages(prompt), model, max_tokens, temperature, backend='openai', api_key=self.openai_api_key, bypass_cache=bypass_cache)
         elif self.backend == 'lmstudio':
-            return self._lmstudio_chat(prompt, model, max_tokens, temperature)
+            return self._pool.stream_chat(chat_messages(prompt), model, max_tokens, temperature, backend='lmstudio', url=self.lmstudio_url, bypass_cache=bypass_cache)
         else:
             raise ValueError(f"Unknown LLM backend: {self.backend}")
 
-    def _openai_chat(self, prompt, model, max_tokens, temperature):
-        response = openai.ChatCompletion.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": "You are an expert career advisor."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=max_tokens,
-            temperature=temperature
-        )
-        return response.choices[0].message.content.strip()
-
-    def _lmstudio_chat(self, prompt, model, max_tokens, temperature):
-        # LMStudio REST API (non-OpenAI compatible)
-        payload = {
-            "model": model,
-            "messages": [
-                {"role": "system", "content": "You are an expert career advisor."},
-                {"role": "user", "content": prompt}
-            ],
-            "max_tokens": max_tokens,
-            "temperature": temperature
-        }
-        resp = requests.post(self.lmstudio_url, json=payload, timeout=120)
-        resp.raise_for_status()
-        data = resp.json()
-        return data["choices"][0]["message"]["content"].strip()
+    def repair_json(self, text, keys, max_tokens=2200):
+        """Have the backend's small model rewrite a malformed JSON reply; much cheaper than generating it again."""
+        prompt = REPAIR_PROMPT.format(keys=', '.join(keys), text=text)
+        if self.backend == 'openai':
+            return self._pool.chat(chat_messages(prompt), resolve_small_model('openai'), max_tokens, 0, backend='openai', api_key=self.openai_api_key)
+        elif self.backend == 'lmstudio':
+            return self._pool.chat(chat_messages(prompt), resolve_small_model('lmstudio'), max_tokens, 0, backend='lmstudio', url=self.lmstudio_url)
+        else:
+            raise ValueError(f"Unknown LLM backend: {self.backend}")
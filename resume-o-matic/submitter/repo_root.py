@@ -0,0 +1,14 @@
+"""
+Makes the shared modules at the repository root importable from the
+submitter. Import it before them:
+
+    import repo_root  # noqa: F401
+"""
+
+import os
+import sys
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+if REPO_ROOT not in sys.path:
+    sys.path.append(REPO_ROOT)
@@ -1,17 +1,22 @@
-import gradio as gr
-from facts_tweaks import (
-    list_corrections, create_correction, edit_correction, remove_correction
-)
+from facts_tweaks import corrections_index
+from highlight import highlight_html, matcher_for
+from json_stream import StreamingJSONObject, structured_reply
 from llm import LLMClient
+import argparse
 import datetime
-import PyPDF2
-import markdown2
 import os
-import json
-import re
 import socket
 from submission import create_submission
 
+import repo_root  # noqa: F401  (shared helpers live at the repository root)
+from extractors import extract_text
+from pdf_extract import PartialExtraction
+from model_registry import get_registry
+from job_metadata import extract_metadata_regex
+from pipeline import Pipeline, StageError
+from telemetry import METRICS_PORT, span, start_metrics_server
+import job_queue
+
 print = lambda *args, **kwargs: __import__('builtins').print(f"[submitter_ui.py {datetime.datetime.now()}]", *args, **kwargs)
 
 def extract_text_from_pdf(pdf_file, mode):
@@ -21,68 +26,59 @@ def extract_text_from_pdf(pdf_file, mode):
             pdf_file = fallback
     if not pdf_file:
         return ""
-    if not hasattr(pdf_file, "seek") and isinstance(pdf_file, str):
-        with open(pdf_file, "rb") as f:
-            pdf_reader = PyPDF2.PdfReader(f)
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            return text
-    else:
-        pdf_file.seek(0)
-        pdf_reader = PyPDF2.PdfReader(pdf_file)
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text() + "\n"
-        return text
+    try:
+        # PDF engine from PDF_EXTRACTOR; .docx uploads are detected and read with python-docx
+        return extract_text(pdf_file)
+    except PartialExtraction as e:
+        # Generate from what could be read rather than failing the whole request
+        print(f"[WARN] {e.warning}")
+        return e.text
 
-def build_prompt(job_desc, app_type, recruiter_name, resume_mode, resume_text, corrections, target):
-    app_details = f"Application Type: {app_type}"
-    if app_type == "Via Recruiter/Agency" and recruiter_name.strip():
-        app_details += f" (Recruiter: {recruiter_name.strip()})"
+def corrections_block(corrections, target):
+    if not corrections:
+        return ""
+    block = f"\n---\nPersistent Corrections for {'resume' if target == 'resume' else 'cover letter'} (apply these to your output):\n"
+    for corr in corrections:
+        block += f"Section: {corr[1]}\nReplace: {corr[2]}\nWith: {corr[3]}\n\n"
+    return block
+
+def prompt_prefix(resume_text, corrections, target):
+    # The part of the prompt that is the same for every job: instructions, the candidate's resume (for the
+    # resume prompt) and corrections. Keeping it first lets OpenAI / LMStudio reuse their cached prefix.
     if target == 'resume':
-        prompt = f"""
-You are an expert career advisor and resume writer. Given the following job description and resume text, generate a tailored resume in markdown format. Extract the job title and company name from the job description. Return ONLY a JSON object with this structure (no commentary):
+        return f"""
+You are an expert career advisor and resume writer. Given the following resume text and a job description, generate a tailored resume in markdown format. Extract the job title and company name from the job description. Return ONLY a JSON object with this structure (no commentary):
 {{
   \"job_title\": \"<clean job title>\",
   \"company_name\": \"<clean company name>\",
   \"resume\": \"<markdown resume text>\"
 }}
-Job Description:\n{job_desc}\n\n{app_details}\n\nResume Text:\n{resume_text}\n\nMode: {resume_mode}\n"""
-        if corrections:
-            prompt += f"\n---\nPersistent Corrections for resume (apply these to your output):\n"
-            for corr in corrections:
-                prompt += f"Section: {corr[1]}\nReplace: {corr[2]}\nWith: {corr[3]}\n\n"
-        prompt += "\nReturn only the JSON object."
-        return prompt
-    else:
-        prompt = f"""
+Resume Text:\n{resume_text}\n""" + corrections_block(corrections, target)
+    return f"""
 You are an expert career advisor and cover letter writer. Given the following job description and tailored resume, generate a tailored cover letter in markdown format. Extract the job title and company name from the job description. Return ONLY a JSON object with this structure (no commentary):
 {{
   \"job_title\": \"<clean job title>\",
   \"company_name\": \"<clean company name>\",
   \"cover_letter\": \"<markdown cover letter text>\"
 }}
-Job Description:\n{job_desc}\n\nTailored Resume (markdown):\n{resume_text}\n\nMode: {resume_mode}\n"""
-        if corrections:
-            prompt += f"\n---\nPersistent Corrections for cover letter (apply these to your output):\n"
-            for corr in corrections:
-                prompt += f"Section: {corr[1]}\nReplace: {corr[2]}\nWith: {corr[3]}\n\n"
-        prompt += "\nReturn only the JSON object."
-        return prompt
-
-def extract_json(text):
-    match = re.search(r'\{.*\}', text, re.DOTALL)
-    if match:
-        return match.group(0)
-    return text
+""" + corrections_block(corrections, target)
+
+def build_prompt(job_desc, app_type, recruiter_name, resume_mode, resume_text, corrections, target):
+    app_details = f"Application Type: {app_type}"
+    if app_type == "Via Recruiter/Agency" and recruiter_name.strip():
+        app_details += f" (Recruiter: {recruiter_name.strip()})"
+    if target == 'resume':
+        prompt = prompt_prefix(resume_text, corrections, target)
+        prompt += f"\n---\nJob Description:\n{job_desc}\n\n{app_details}\n\nMode: {resume_mode}\n"
+    else:
+        prompt = prompt_prefix(None, corrections, target)
+        prompt += f"\n---\nJob Description:\n{job_desc}\n\nTailored Resume (markdown):\n{resume_text}\n\nMode: {resume_mode}\n"
+    prompt += "\nReturn only the JSON object."
+    return prompt
 
 def highlight_corrections(text, corrections):
-    for corr in corrections:
-        orig = corr[2]
-        if orig and orig in text:
-            text = text.replace(orig, f'<mark style="background: #ffe066;">{orig}</mark>')
-    return text
+    # One pass over the HTML's text nodes for all corrections' original text
+    return highlight_html(text, matcher_for(corr[2] for corr in corrections))
 
 def get_lan_ip():
     s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -95,7 +91,119 @@ def get_lan_ip():
         s.close()
     return ip
 
+_llm_client = None
+
+def get_llm_client():
+    # One client per process; requests share the pooled connections in llm_pool
+    global _llm_client
+    if _llm_client is None:
+        _llm_client = LLMClient()
+    return _llm_client
+
+def generate_outputs(job_desc, job_url, app_type, recruiter_name, resume_mode, resume_file, on_progress=None):
+    """
+    Generate and store a submission. Returns a dict with resume and cover_letter (markdown)
+    plus the corrections applied to each, or {"error": ...} if an LLM reply could not be parsed.
+    on_progress(dict) receives the last finished stage and the fields parsed so far as replies stream in.
+    """
+    llm_client = get_llm_client()
+    raw = {}
+
+    def stream_fields(ctx, chunks, output, body_key):
+        # Parse the reply as it streams, publishing the body field as it grows
+        parser = StreamingJSONObject()
+        text = ''
+        for chunk in chunks:
+            if ctx.cancelled:
+                break
+            text += chunk
+            if body_key in parser.feed(chunk):
+                ctx.emit({body_key: parser.fields[body_key]})
+        raw[output] = text
+        with span('parse', output=output) as s:
+            fields = structured_reply(parser, text, body_key, repair=lambda reply: llm_client.repair_json(reply, ('job_title', 'company_name', body_key)))
+            s.set(defects=parser.defects)
+        if parser.defects:
+            print(f"[WARN] {output} reply was not clean JSON ({', '.join(parser.defects)}); parsed leniently")
+        return fields
+
+    def resume_stage(ctx):
+        corrections_r = ctx['corrections'].for_context('resume')
+        with span('prompt_build', output='resume') as s:
+            prompt_resume = build_prompt(job_desc, app_type, recruiter_name, resume_mode, ctx['resume_text'], corrections_r, target='resume')
+            s.set(chars=len(prompt_resume), prefix_chars=len(prompt_prefix(ctx['resume_text'], corrections_r, target='resume')), corrections=len(corrections_r))
+        return stream_fields(ctx, llm_client.stream_resume(prompt_resume), 'resume', 'resume')
+
+    def cover_stage(ctx):
+        corrections_c = ctx['corrections'].for_context('cover')
+        resume_md = ctx['resume'].get('resume', '').strip()
+        with span('prompt_build', output='cover') as s:
+            prompt_cover = build_prompt(job_desc, app_type, recruiter_name, resume_mode, resume_md, corrections_c, target='cover')
+            s.set(chars=len(prompt_cover), prefix_chars=len(prompt_prefix(None, corrections_c, target='cover')), corrections=len(corrections_c))
+        return stream_fields(ctx, llm_client.stream_cover_letter(prompt_cover), 'cover', 'cover_letter')
+
+    def corrections_stage(ctx):
+        with span('db_read', what='corrections') as s:
+            index = corrections_index()
+            s.set(rows=len(index.rows))
+            return index
+
+    # PDF parsing, the corrections read and regex metadata extraction overlap; the LLM calls follow
+    pipeline = Pipeline()
+    pipeline.stage('resume_text', lambda ctx: extract_text_from_pdf(resume_file, resume_mode))
+    pipeline.stage('corrections', corrections_stage)
+    pipeline.stage('metadata', lambda ctx: extract_metadata_regex(job_desc))
+    pipeline.stage('resume', resume_stage, deps=('resume_text', 'corrections'))
+    pipeline.stage('cover', cover_stage, deps=('resume', 'corrections'))
+    progress = {}
+    try:
+        for name, kind, value in pipeline.run():
+            if kind == 'done':
+                progress['stage'] = name
+            elif kind == 'progress':
+                progress.update(value)
+            if on_progress:
+                on_progress(dict(progress))
+    except StageError as e:
+        if e.stage == 'cover':
+            print(f"[ERROR] LLM cover letter parsing failed: {e}\nRaw output: {raw.get('cover', '')}")
+            return {"error": f"[ERROR] Cover Letter LLM output not in expected JSON format: {e}\nRaw output: {raw.get('cover', '')}"}
+        print(f"[ERROR] LLM resume parsing failed: {e}\nRaw output: {raw.get('resume', '')}")
+        return {"error": f"[ERROR] Resume LLM output not in expected JSON format: {e}\nRaw output: {raw.get('resume', '')}"}
+    resume_json, cover_json = pipeline.results['resume'], pipeline.results['cover']
+    regex_company, regex_title = pipeline.results['metadata']
+    job_title = str(resume_json.get('job_title') or '').strip() or regex_title or ''
+    company_name = str(resume_json.get('company_name') or '').strip() or regex_company or ''
+    resume_md = resume_json.get('resume', '').strip()
+    cover_letter_md = cover_json.get('cover_letter', '').strip()
+    # Store submission with job_url
+    with span('db_write', what='submission'):
+        create_submission(
+            timestamp=datetime.datetime.now().isoformat(),
+            job_description=job_desc,
+            job_url=job_url,
+            company_name=company_name,
+            job_title=job_title,
+            mode=resume_mode,
+            tailored_resume=resume_md,
+            cover_letter=cover_letter_md,
+            state='pending'
+        )
+    return {"resume": resume_md, "cover_letter": cover_letter_md,
+            "corrections_r": [list(c) for c in pipeline.results['corrections'].for_context('resume')],
+            "corrections_c": [list(c) for c in pipeline.results['corrections'].for_context('cover')]}
+
+def generate_job(payload, report, job_id):
+    # The pipeline (and so every span below) nests under this job's "generate" span
+    with span('generate', app='submitter', mode=payload['resume_mode']):
+        return generate_outputs(**payload, on_progress=report)
+
+JOB_HANDLERS = {'submitter.generate': generate_job}
+
 def build_ui():
+    # gradio and markdown2 are only loaded once a UI is built
+    import gradio as gr
+    import markdown2
     with gr.Blocks() as demo:
         gr.Markdown("## ATS-Optimized Resume & CV Tailoring Bot v2 (Submitter)")
         with gr.Column():
@@ -108,60 +216,41 @@ def build_ui():
                 return gr.update(visible=(method == "Via Recruiter/Agency"))
             app_type.change(toggle_recruiter_field, inputs=app_type, outputs=recruiter_name)
             resume_mode = gr.Radio(["Resume", "CV"], value="Resume", label="Mode (Resume or CV)")
-            resume_file = gr.File(label="Upload Resume/CV PDF")
+            resume_file = gr.File(label="Upload Resume/CV (PDF or DOCX)")
             generate_btn = gr.Button("Generate Resume/CV & Cover Letter")
 
         with gr.Tabs() as output_tabs:
             with gr.TabItem("Resume/CV"):
                 resume_html = gr.HTML(label="Tailored Resume/CV Output (right-click selected text to correct)")
-                corrections_table_r = gr.Dataframe(headers=["ID", "Section", "Original", "Corrected", "Context", "Timestamp"], datatype=["number", "str", "str", "str", "str", "str"], label="Resume/CV Corrections", interactive=False, value=[c for c in list_corrections() if c[4] == 'resume'])
+                corrections_table_r = gr.Dataframe(headers=["ID", "Section", "Original", "Corrected", "Context", "Timestamp"], datatype=["number", "str", "str", "str", "str", "str"], label="Resume/CV Corrections", interactive=False)
             with gr.TabItem("Cover Letter"):
                 cover_html = gr.HTML(label="Tailored Cover Letter Output (right-click selected text to correct)")
-                corrections_table_c = gr.Dataframe(headers=["ID", "Section", "Original", "Corrected", "Context", "Timestamp"], datatype=["number", "str", "str", "str", "str", "str"], label="Cover Letter Corrections", interactive=False, value=[c for c in list_corrections() if c[4] == 'cover'])
+                corrections_table_c = gr.Dataframe(headers=["ID", "Section", "Original", "Corrected", "Context", "Timestamp"], datatype=["number", "str", "str", "str", "str", "str"], label="Cover Letter Corrections", interactive=False)
 
         correction_bridge = gr.Textbox(visible=False)
 
         def generate_llm_outputs(job_desc, job_url, app_type, recruiter_name, resume_mode, resume_file):
-            resume_text = extract_text_from_pdf(resume_file, resume_mode)
-            corrections_r = [c for c in list_corrections() if c[4] == 'resume']
-            prompt_resume = build_prompt(job_desc, app_type, recruiter_name, resume_mode, resume_text, corrections_r, target='resume')
-            print("Prompt sent to LLM (Resume):\n", prompt_resume[:1000], "... [truncated]")
-            try:
-                resume_raw = LLMClient().generate_resume(prompt_resume)
-                cleaned_resume_raw = extract_json(resume_raw)
-                resume_json = json.loads(cleaned_resume_raw)
-                job_title = resume_json.get('job_title', '').strip()
-                company_name = resume_json.get('company_name', '').strip()
-                resume_md = resume_json.get('resume', '').strip()
-            except Exception as e:
-                print(f"[ERROR] LLM resume JSON parsing failed: {e}\nRaw output: {resume_raw if 'resume_raw' in locals() else ''}")
-                return f"[ERROR] Resume LLM output not in expected JSON format: {e}\nRaw output: {resume_raw if 'resume_raw' in locals() else ''}", "", [], []
-            corrections_c = [c for c in list_corrections() if c[4] == 'cover']
-            prompt_cover = build_prompt(job_desc, app_type, recruiter_name, resume_mode, resume_md, corrections_c, target='cover')
-            print("Prompt sent to LLM (Cover Letter):\n", prompt_cover[:1000], "... [truncated]")
-            try:
-                cover_raw = LLMClient().generate_cover_letter(prompt_cover)
-                cleaned_cover_raw = extract_json(cover_raw)
-                cover_json = json.loads(cleaned_cover_raw)
-                cover_letter_md = cover_json.get('cover_letter', '').strip()
-            except Exception as e:
-                print(f"[ERROR] LLM cover letter JSON parsing failed: {e}\nRaw output: {cover_raw if 'cover_raw' in locals() else ''}")
-                return f"[ERROR] Cover Letter LLM output not in expected JSON format: {e}\nRaw output: {cover_raw if 'cover_raw' in locals() else ''}", "", [], []
-            # Store submission with job_url
-            create_submission(
-                timestamp=datetime.datetime.now().isoformat(),
-                job_description=job_desc,
-                job_url=job_url,
-                company_name=company_name,
-                job_title=job_title,
-                mode=resume_mode,
-                tailored_resume=resume_md,
-                cover_letter=cover_letter_md,
-                state='pending'
-            )
-            resume_html_out = highlight_corrections(markdown2.markdown(resume_md), corrections_r)
-            cover_html_out = highlight_corrections(markdown2.markdown(cover_letter_md), corrections_c)
-            return resume_html_out, cover_html_out, [c for c in list_corrections() if c[4] == 'resume'], [c for c in list_corrections() if c[4] == 'cover']
+            # Runs as a queued job; a closed tab no longer loses the generation
+            payload = {"job_desc": job_desc, "job_url": job_url, "app_type": app_type, "recruiter_name": recruiter_name,
+                       "resume_mode": resume_mode, "resume_file": job_queue.stash_upload(getattr(resume_file, 'name', resume_file))}
+            job_id = job_queue.enqueue('submitter.generate', payload)
+            for job in job_queue.watch(job_id):
+                if job['status'] == 'done':
+                    out = job['result']
+                    if 'error' in out:
+                        yield out['error'], "", [], []
+                    else:
+                        yield (highlight_corrections(markdown2.markdown(out['resume']), out['corrections_r']),
+                               highlight_corrections(markdown2.markdown(out['cover_letter']), out['corrections_c']),
+                               out['corrections_r'], out['corrections_c'])
+                elif job['status'] in ('failed', 'cancelled'):
+                    yield f"[ERROR] Job {job_id} {job['status']}: {job['error'] or ''}", "", [], []
+                else:
+                    progress = job['progress'] or {}
+                    status = f"Job {job_id}: {job['status']}" + (f" ({progress['stage']} done)" if progress.get('stage') else "")
+                    # Partial outputs render as they stream in; corrections are highlighted once the job is done
+                    yield (f"<p><em>{status}</em></p>" + markdown2.markdown(progress.get('resume', '')),
+                           markdown2.markdown(progress.get('cover_letter', '')), gr.update(), gr.update())
 
         generate_btn.click(
             generate_llm_outputs,
@@ -169,15 +258,32 @@ def build_ui():
             outputs=[resume_html, cover_html, corrections_table_r, corrections_table_c]
         )
 
+        # Corrections are read on page load, not while the UI is built
+        def load_corrections():
+            index = corrections_index()
+            return index.for_context('resume'), index.for_context('cover')
+        demo.load(load_corrections, outputs=[corrections_table_r, corrections_table_c])
+
         gr.Markdown("---")
         reviewer_url = "https://reviewer.gavincowie.com"
         gr.HTML(f'''<button onclick="window.location.href='{reviewer_url}'" style="font-size:1.1em;padding:0.5em 1em;">Go to Submissions Management & Review App</button>''')
 
     return demo
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Resume/CV submitter UI")
+    parser.add_argument('command', nargs='?', choices=['ui', 'worker'], default='ui', help="'worker' runs queued generation jobs without a UI")
+    parser.add_argument('--threads', type=int, default=2, help='Jobs a worker process runs at once')
+    parser.add_argument('--metrics-port', type=int, default=METRICS_PORT, help='Port for /metrics; give each process on a box its own (0 disables)')
+    args = parser.parse_args(argv)
+    # Resolve available models once at startup; the registry refreshes itself in the background
+    get_registry(os.environ.get('LLM_BACKEND', 'openai'))
+    start_metrics_server(args.metrics_port)
+    if args.command == 'worker':
+        return job_queue.serve(JOB_HANDLERS, args.threads)
+    job_queue.start_workers(JOB_HANDLERS, job_queue.JOB_INLINE_WORKERS)
     demo = build_ui()
     demo.launch(server_name='0.0.0.0', server_port=7960)
 
 if __name__ == '__main__':
-    main() 
\ No newline at end of file
+    main()
@@ -17,8 +17,9 @@ This approach respects the original author's Colab-first intent, but allows loca
 """
 
 import os
-import tempfile
-import sqlite3
+import sys
+import argparse
+import contextlib
 
 # Detect if running in Google Colab
 try:
@@ -40,20 +41,40 @@ else:
     load_dotenv()
     openai_api_key = os.environ.get("OPENAI_API_KEY")
 
-import gradio as gr
-import openai
-import PyPDF2
 import datetime
 import json
 import re
+import time
+import datastore as db
+import blobstore
+import artifacts
+from extractors import PDF_EXTRACTORS, extract_text
+from pdf_extract import PartialExtraction
+from llm_pool import chat_messages, get_chat_client
+from prompt_budget import PromptSection, count_message_tokens, count_tokens, fit_sections
+from model_registry import get_registry, resolve_model, resolve_small_model
+from job_metadata import extract_metadata
+from pipeline import Pipeline
+from telemetry import METRICS_PORT, activate, recording, span, start_metrics_server, start_span
+from bulk_regen import BULK_REGEN_WORKERS, BulkRegenManager, init_bulk_tables
+import job_queue
+from batch import BATCH_WORKERS, backend_limits, load_jobs_jsonl, run_batch
 
-openai.api_key = openai_api_key
+if openai_api_key:
+    # Shared with the model registry's openai client, which is imported lazily
+    os.environ.setdefault("OPENAI_API_KEY", openai_api_key)
+llm = get_chat_client()
 
-def init_db():
-    conn = sqlite3.connect('facts_tweaks.db')
+@db.on_schema
+def init_db(conn):
+    # Runs on the first connection to the database, not at import time
     c = conn.cursor()
     c.execute('''CREATE TABLE IF NOT EXISTS facts (id INTEGER PRIMARY KEY, text TEXT)''')
     c.execute('''CREATE TABLE IF NOT EXISTS tweaks (id INTEGER PRIMARY KEY, text TEXT)''')
+    # Which output a fact/tweak feeds: 'both', 'resume' or 'cover'
+    for table in ('facts', 'tweaks'):
+        if 'applies_to' not in {row[1] for row in c.execute(f'PRAGMA table_info({table})')}:
+            c.execute(f"ALTER TABLE {table} ADD COLUMN applies_to TEXT NOT NULL DEFAULT 'both'")
     c.execute('''CREATE TABLE IF NOT EXISTS submissions (
         id INTEGER PRIMARY KEY,
         timestamp TEXT,
@@ -74,54 +95,163 @@ def init_db():
         state TEXT DEFAULT 'pending',
         reviewer_notes TEXT
     )''')
-    conn.commit()
-    conn.close()
+    # Indexes backing the paginated, filterable submissions listing
+    c.execute('CREATE INDEX IF NOT EXISTS idx_submissions_timestamp ON submissions (timestamp)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_submissions_state ON submissions (state, timestamp)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_submissions_company ON submissions (company_name COLLATE NOCASE)')
+    # The queued job that stored a submission, so a retried job cannot store it twice
+    if 'job_id' not in {row[1] for row in c.execute('PRAGMA table_info(submissions)')}:
+        c.execute('ALTER TABLE submissions ADD COLUMN job_id INTEGER')
+    c.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_submissions_job ON submissions (job_id)')
+    blobstore.init_blobs(conn)
+    migrate_submission_blobs(conn)
+    init_search_index(conn)
+    init_bulk_tables(conn)
 
-def get_facts():
-    conn = sqlite3.connect('facts_tweaks.db')
-    c = conn.cursor()
-    c.execute('SELECT text FROM facts')
-    facts = [row[0] for row in c.fetchall()]
-    conn.close()
-    return facts
+# Large text columns stored in the blob store; the row keeps a <column>_ref hash
+SUBMISSION_BLOB_COLUMNS = ("job_description", "tailored_resume", "cover_letter", "facts", "tweaks")
+SUBMISSION_BLOB_REFS = [('submissions', f'{column}_ref') for column in SUBMISSION_BLOB_COLUMNS]
 
-def get_tweaks():
-    conn = sqlite3.connect('facts_tweaks.db')
-    c = conn.cursor()
-    c.execute('SELECT text FROM tweaks')
-    tweaks = [row[0] for row in c.fetchall()]
-    conn.close()
-    return tweaks
+def migrate_submission_blobs(conn):
+    existing = {row[1] for row in conn.execute('PRAGMA table_info(submissions)')}
+    for column in SUBMISSION_BLOB_COLUMNS:
+        if f'{column}_ref' not in existing:
+            conn.execute(f'ALTER TABLE submissions ADD COLUMN {column}_ref TEXT')
+    # Move text inlined by older versions into the blob store, a batch at a time
+    inline = ' OR '.join(f'{column} IS NOT NULL' for column in SUBMISSION_BLOB_COLUMNS)
+    while True:
+        rows = conn.execute(f'SELECT id, {", ".join(SUBMISSION_BLOB_COLUMNS)} FROM submissions WHERE {inline} LIMIT 200').fetchall()
+        if not rows:
+            break
+        for sub_id, *values in rows:
+            for column, value in zip(SUBMISSION_BLOB_COLUMNS, values):
+                if value is not None:
+                    conn.execute(f'UPDATE submissions SET {column}_ref = ?, {column} = NULL WHERE id = ?', (blobstore.put_text(conn, value), sub_id))
 
-def add_fact(fact):
-    conn = sqlite3.connect('facts_tweaks.db')
-    c = conn.cursor()
-    c.execute('INSERT INTO facts (text) VALUES (?)', (fact,))
-    conn.commit()
-    conn.close()
+# Full-text search: an FTS5 index over a view that decodes the blob-backed columns,
+# kept in sync by triggers on submissions (inserts, regen updates, deletes)
+SEARCH_COLUMNS = ("job_description", "company_name", "job_title", "tailored_resume", "cover_letter")
 
-def add_tweak(tweak):
-    conn = sqlite3.connect('facts_tweaks.db')
-    c = conn.cursor()
-    c.execute('INSERT INTO tweaks (text) VALUES (?)', (tweak,))
-    conn.commit()
-    conn.close()
+def init_search_index(conn):
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'submissions_fts'").fetchone()
+    conn.execute('''CREATE VIEW IF NOT EXISTS submissions_search_content AS
+        SELECT id,
+               COALESCE(job_description, blob_text(job_description_ref)) AS job_description,
+               company_name,
+               job_title,
+               COALESCE(tailored_resume, blob_text(tailored_resume_ref)) AS tailored_resume,
+               COALESCE(cover_letter, blob_text(cover_letter_ref)) AS cover_letter
+        FROM submissions''')
+    conn.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS submissions_fts USING fts5(
+        job_description, company_name, job_title, tailored_resume, cover_letter,
+        content='submissions_search_content', content_rowid='id', tokenize='porter unicode61'
+    )''')
+    new_values = "new.id, COALESCE(new.job_description, blob_text(new.job_description_ref)), new.company_name, new.job_title, COALESCE(new.tailored_resume, blob_text(new.tailored_resume_ref)), COALESCE(new.cover_letter, blob_text(new.cover_letter_ref))"
+    old_values = new_values.replace("new.", "old.")
+    columns = ", ".join(SEARCH_COLUMNS)
+    conn.execute(f'''CREATE TRIGGER IF NOT EXISTS submissions_fts_insert AFTER INSERT ON submissions BEGIN
+        INSERT INTO submissions_fts (rowid, {columns}) VALUES ({new_values});
+    END''')
+    conn.execute(f'''CREATE TRIGGER IF NOT EXISTS submissions_fts_delete AFTER DELETE ON submissions BEGIN
+        INSERT INTO submissions_fts (submissions_fts, rowid, {columns}) VALUES ('delete', {old_values});
+    END''')
+    conn.execute(f'''CREATE TRIGGER IF NOT EXISTS submissions_fts_update AFTER UPDATE OF
+        job_description, job_description_ref, company_name, job_title, tailored_resume, tailored_resume_ref, cover_letter, cover_letter_ref
+        ON submissions BEGIN
+        INSERT INTO submissions_fts (submissions_fts, rowid, {columns}) VALUES ('delete', {old_values});
+        INSERT INTO submissions_fts (rowid, {columns}) VALUES ({new_values});
+    END''')
+    if not exists:
+        # First run: index everything already in the table
+        conn.execute("INSERT INTO submissions_fts (submissions_fts) VALUES ('rebuild')")
+
+def fts_query(text):
+    # Turn free text into an FTS5 query: every word must match, as a prefix
+    return " ".join(f'"{word}"*' for word in re.findall(r"\w+", text or ""))
+
+def search_submissions(text, limit=20):
+    query = fts_query(text)
+    if not query:
+        return []
+    # bm25 weights favour company name and job title over the long text columns
+    return db.query('''SELECT s.id, s.timestamp, s.job_title, s.company_name, s.state,
+                               snippet(submissions_fts, -1, '**', '**', ' ... ', 12)
+                        FROM submissions_fts JOIN submissions s ON s.id = submissions_fts.rowid
+                        WHERE submissions_fts MATCH ?
+                        ORDER BY bm25(submissions_fts, 1.0, 4.0, 4.0, 0.5, 0.5)
+                        LIMIT ?''', (query, int(limit)))
+
+def load_submission_texts(sub_id, columns):
+    # Resolve blob-backed columns for one submission; returns None if it does not exist
+    row = db.query_one(f'SELECT {", ".join(f"{c}, {c}_ref" for c in columns)} FROM submissions WHERE id = ?', (sub_id,))
+    if row is None:
+        return None
+    return {column: row[2 * i] if row[2 * i] is not None else blobstore.get_text(row[2 * i + 1]) for i, column in enumerate(columns)}
+
+FACT_SCOPES = {"Both": "both", "Resume/CV only": "resume", "Cover letter only": "cover"}
+
+def get_facts(output=None):
+    # output='resume' or 'cover' limits to the facts that feed that output
+    if output:
+        return [row[0] for row in db.query("SELECT text FROM facts WHERE applies_to IN ('both', ?)", (output,))]
+    return [row[0] for row in db.query('SELECT text FROM facts')]
+
+def get_tweaks(output=None):
+    if output:
+        return [row[0] for row in db.query("SELECT text FROM tweaks WHERE applies_to IN ('both', ?)", (output,))]
+    return [row[0] for row in db.query('SELECT text FROM tweaks')]
+
+def get_fact_items():
+    return db.query('SELECT text, applies_to FROM facts')
+
+def get_tweak_items():
+    return db.query('SELECT text, applies_to FROM tweaks')
+
+def add_fact(fact, applies_to='both'):
+    db.execute('INSERT INTO facts (text, applies_to) VALUES (?, ?)', (fact, applies_to))
+
+def add_tweak(tweak, applies_to='both'):
+    db.execute('INSERT INTO tweaks (text, applies_to) VALUES (?, ?)', (tweak, applies_to))
+
+# Submissions snapshot the facts/tweaks they were generated with. Items that apply to both
+# outputs are stored as plain strings (the format older rows already use); scoped ones as
+# {"text": ..., "applies_to": ...}
+def snapshot_items(items):
+    return [text if applies_to == 'both' else {"text": text, "applies_to": applies_to} for text, applies_to in items]
+
+def parse_snapshot(snapshot_json):
+    items = set()
+    for item in json.loads(snapshot_json or '[]'):
+        if isinstance(item, dict):
+            items.add((item.get("text"), item.get("applies_to", "both")))
+        else:
+            items.add((item, "both"))
+    return items
+
+def outputs_affected(stored_facts_json, stored_tweaks_json, fact_items, tweak_items):
+    """Return ({'resume', 'cover'} subset to regenerate, number of changed items)."""
+    changed = (parse_snapshot(stored_facts_json) ^ set(map(tuple, fact_items))) | (parse_snapshot(stored_tweaks_json) ^ set(map(tuple, tweak_items)))
+    scopes = {applies_to for _, applies_to in changed}
+    if scopes & {'both', 'resume'}:
+        # The cover letter is written from the tailored resume, so it follows it
+        return {'resume', 'cover'}, len(changed)
+    if 'cover' in scopes:
+        return {'cover'}, len(changed)
+    return set(), len(changed)
+
+def format_facts_tweaks(facts, tweaks):
+    facts_tweaks_str = ''
+    if facts:
+        facts_tweaks_str += 'FACTS (persistent):\n' + '\n'.join(f'- {f}' for f in facts) + '\n'
+    if tweaks:
+        facts_tweaks_str += 'TWEAKS (situational):\n' + '\n'.join(f'- {t}' for t in tweaks) + '\n'
+    return facts_tweaks_str
 
 def remove_fact(fact):
-    conn = sqlite3.connect('facts_tweaks.db')
-    c = conn.cursor()
-    c.execute('DELETE FROM facts WHERE text = ?', (fact,))
-    conn.commit()
-    conn.close()
+    db.execute('DELETE FROM facts WHERE text = ?', (fact,))
 
 def remove_tweak(tweak):
-    conn = sqlite3.connect('facts_tweaks.db')
-    c = conn.cursor()
-    c.execute('DELETE FROM tweaks WHERE text = ?', (tweak,))
-    conn.commit()
-    conn.close()
-
-init_db()
+    db.execute('DELETE FROM tweaks WHERE text = ?', (tweak,))
 
 def facts_tweaks_section():
     facts = get_facts()
@@ -151,29 +281,22 @@ def remove_tweak_ui(tweak):
     remove_tweak(tweak)
     return update_facts_tweaks_display()
 
-def extract_text_from_pdf(pdf_file):
-    # Check if pdf_file is a file-like object (has a seek method)
-    if not hasattr(pdf_file, "seek"):
-        # If it's a path-like string, open it as a binary file.
-        with open(pdf_file, "rb") as f:
-            pdf_reader = PyPDF2.PdfReader(f)
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            return text
-    else:
-        # Use the file-like object directly.
-        pdf_file.seek(0)  # Reset file pointer to the beginning
-        pdf_reader = PyPDF2.PdfReader(pdf_file)
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text() + "\n"
-        return text
+def extract_text_from_pdf(pdf_file, extractor=None):
+    # Accepts a path or a file-like object, PDF or DOCX; text is cached by content hash.
+    # extractor picks the PDF engine for this file (default PDF_EXTRACTOR, see extractors).
+    # Raises PartialExtraction (not cached) if some pages could not be read.
+    return extract_text(pdf_file, extractor)
 
-def estimate_token_count(*args):
-    # Simple token estimation: 1 token ≈ 4 chars (for English)
-    total_chars = sum(len(str(a)) for a in args)
-    return total_chars // 4
+def extract_text_with_warning(pdf_file, extractor=None):
+    try:
+        return extract_text_from_pdf(pdf_file, extractor), None
+    except PartialExtraction as e:
+        print(f"[WARN] {e.warning}")
+        return e.text, f"[Warning] {e.warning}"
+
+def estimate_token_count(*args, model=None):
+    # Exact per-model BPE count (memoized) when a tokenizer is available; see prompt_budget
+    return sum(count_tokens(str(a), model) for a in args)
 
 def split_outputs(llm_output):
     # Naive split: look for 'COVER LETTER' or similar divider
@@ -184,6 +307,25 @@ def split_outputs(llm_output):
         return resume, cover_letter
     return llm_output, ''
 
+STREAM_YIELD_INTERVAL = float(os.environ.get('STREAM_YIELD_INTERVAL', 0.05))
+
+def stream_throttled(chunks, interval=STREAM_YIELD_INTERVAL):
+    # Accumulate streamed deltas, yielding the text so far at most once per interval (and once at the end)
+    text = ''
+    last_yield = 0.0
+    pending = False
+    for chunk in chunks:
+        text += chunk
+        pending = True
+        now = time.monotonic()
+        if now - last_yield >= interval:
+            last_yield = now
+            pending = False
+            yield text
+    if pending or not text:
+        yield text
+
+
 def get_default_pdf_file(mode):
     # Return the default file path for the selected mode
     if mode == "CV" and os.path.exists("cv.pdf"):
@@ -192,67 +334,102 @@ def get_default_pdf_file(mode):
         return "resume.pdf"
     return None
 
-def store_submission(job_description, company_details, company_name, job_title, job_url, mode, tone, emphasis, facts, tweaks, resume_pdf_path, tailored_resume, cover_letter, notes=None, state='pending', reviewer_notes=None):
-    conn = sqlite3.connect('facts_tweaks.db')
-    c = conn.cursor()
-    c.execute('''INSERT INTO submissions (timestamp, job_description, company_details, company_name, job_title, job_url, mode, tone, emphasis, facts, tweaks, resume_pdf_path, tailored_resume, cover_letter, notes, state, reviewer_notes)
-                 VALUES (datetime('now'),?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)''',
-              (job_description, company_details, company_name, job_title, job_url, mode, tone, emphasis, json.dumps(facts), json.dumps(tweaks), resume_pdf_path, tailored_resume, cover_letter, notes, state, reviewer_notes))
-    conn.commit()
-    conn.close()
-
-def extract_company_and_title_from_llm(llm_output):
-    # Look for a JSON block in the LLM output
-    match = re.search(r'\{\s*"company_name"\s*:\s*"(.*?)"\s*,\s*"job_title"\s*:\s*"(.*?)"\s*\}', llm_output, re.DOTALL)
-    if match:
-        return match.group(1).strip(), match.group(2).strip()
-    return None, None
-
-def tailor_application_pdf(job_desc, company_details, pdf_file, tone, emphasis, mode, company_name, job_title, job_url):
-    import time
-    # If no file uploaded, use the default for the selected mode
-    if pdf_file is None:
-        default_path = get_default_pdf_file(mode)
-        if default_path:
-            pdf_file = default_path
-    resume_text = extract_text_from_pdf(pdf_file)
-    facts = get_facts()
-    tweaks = get_tweaks()
-    facts_tweaks_str = ''
-    if facts:
-        facts_tweaks_str += 'FACTS (persistent):\n' + '\n'.join(f'- {f}' for f in facts) + '\n'
-    if tweaks:
-        facts_tweaks_str += 'TWEAKS (situational):\n' + '\n'.join(f'- {t}' for t in tweaks) + '\n'
-    prompt_base = f"Job Description:\n{job_desc}\nCompany Details:\n{company_details}\nResume:\n{resume_text}\n{facts_tweaks_str}"
-    token_est = estimate_token_count(prompt_base)
-    if token_est > 6000:
-        yield (None, None, None, None, None, f"[Warning] Your input may exceed the model's context window. Please shorten your resume or job description.")
-        return
-    current_date = datetime.datetime.now().strftime("%B %d, %Y")
-    resume_prompt = f"""
+def store_submission(job_description, company_details, company_name, job_title, job_url, mode, tone, emphasis, facts, tweaks, resume_pdf_path, tailored_resume, cover_letter, notes=None, state='pending', reviewer_notes=None, job_id=None):
+    # Regenerating the submission reads its resume again, so a stashed upload must outlive the job
+    job_queue.keep_upload(resume_pdf_path)
+    with db.connection() as conn:
+        refs = [blobstore.put_text(conn, text) for text in (job_description, json.dumps(facts), json.dumps(tweaks), tailored_resume, cover_letter)]
+        existing = conn.execute('SELECT id FROM submissions WHERE job_id = ?', (job_id,)).fetchone() if job_id is not None else None
+        if existing:
+            # An earlier attempt of this job stored it before its worker died: keep the one row, with the new outputs
+            conn.execute('''UPDATE submissions SET tailored_resume = NULL, cover_letter = NULL, facts = NULL, tweaks = NULL,
+                            tailored_resume_ref = ?, cover_letter_ref = ?, facts_ref = ?, tweaks_ref = ? WHERE id = ?''',
+                         (refs[3], refs[4], refs[1], refs[2], existing[0]))
+            blobstore.maybe_collect_garbage(conn, SUBMISSION_BLOB_REFS)
+            return existing[0]
+        return conn.execute('''INSERT INTO submissions (timestamp, job_description_ref, company_details, company_name, job_title, job_url, mode, tone, emphasis, facts_ref, tweaks_ref, resume_pdf_path, tailored_resume_ref, cover_letter_ref, notes, state, reviewer_notes, job_id)
+                     VALUES (datetime('now'),?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)''',
+                  (refs[0], company_details, company_name, job_title, job_url, mode, tone, emphasis, refs[1], refs[2], resume_pdf_path, refs[3], refs[4], notes, state, reviewer_notes, job_id)).lastrowid
+
+def update_submission_outputs(sub_id, tailored_resume, cover_letter, facts=None, tweaks=None):
+    with db.connection() as conn:
+        conn.execute('UPDATE submissions SET tailored_resume = NULL, cover_letter = NULL, tailored_resume_ref = ?, cover_letter_ref = ? WHERE id = ?',
+                     (blobstore.put_text(conn, tailored_resume), blobstore.put_text(conn, cover_letter), sub_id))
+        if facts is not None and tweaks is not None:
+            # Record what the outputs now reflect, so the next regen diffs against it
+            conn.execute('UPDATE submissions SET facts = NULL, tweaks = NULL, facts_ref = ?, tweaks_ref = ? WHERE id = ?',
+                         (blobstore.put_text(conn, json.dumps(facts)), blobstore.put_text(conn, json.dumps(tweaks)), sub_id))
+        # The outputs replaced here may now be unreferenced
+        blobstore.maybe_collect_garbage(conn, SUBMISSION_BLOB_REFS)
+
+SUBMISSION_STATES = ["pending", "approved", "rejected", "applied"]
+SUBMISSION_SORT_COLUMNS = {
+    "Newest": ("timestamp", True),
+    "Oldest": ("timestamp", False),
+    "Company": ("company_name COLLATE NOCASE", False),
+    "Job Title": ("job_title COLLATE NOCASE", False),
+    "State": ("state", False),
+}
+SUBMISSIONS_PAGE_SIZE = 25
+
+def list_submissions_page(page=1, page_size=SUBMISSIONS_PAGE_SIZE, state=None, company=None, sort="Newest"):
+    # One page of the submissions list plus the total match count, filtered and sorted in SQL
+    where, params = [], []
+    if state:
+        where.append('state = ?')
+        params.append(state)
+    if company and company.strip():
+        escaped = company.strip().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        where.append("company_name LIKE ? ESCAPE '\\'")
+        params.append(escaped + '%')
+    where_sql = ('WHERE ' + ' AND '.join(where)) if where else ''
+    column, descending = SUBMISSION_SORT_COLUMNS.get(sort, SUBMISSION_SORT_COLUMNS["Newest"])
+    direction = 'DESC' if descending else 'ASC'
+    page_size = max(1, int(page_size))
+    page = max(1, int(page))
+    total = db.query_one(f'SELECT COUNT(*) FROM submissions {where_sql}', params)[0]
+    rows = db.query(f'''SELECT id, timestamp, job_title, company_name, job_url, state, reviewer_notes FROM submissions {where_sql}
+                     ORDER BY {column} {direction}, id {direction} LIMIT ? OFFSET ?''',
+                    params + [page_size, (page - 1) * page_size])
+    return rows, total
+
+RESUME_MAX_TOKENS = 1800
+COVER_MAX_TOKENS = 1200
+
+# Prompts are laid out static-first: instructions, then the candidate's resume and facts/tweaks, which are the
+# same for every job, then the per-job settings and job description. Consecutive generations against the same
+# resume share a long identical prefix, which OpenAI prompt caching and LMStudio/llama.cpp KV reuse skip re-reading.
+
+def resume_prompt_prefix(facts_tweaks_str, resume_text):
+    return f"""
 You are an expert career advisor with extensive experience in crafting resumes and CVs that are optimized for Applicant Tracking Systems (ATS), while sounding naturally human-written. The candidate has provided their full resume, and it is essential that every detail is preserved in the final tailored version. Do not omit or shorten any information; instead, reorganize and reformat it if necessary to meet ATS standards.
 
+Every tailored version you write:
+- Is in plain text with clear, capitalized section headings (e.g., PROFESSIONAL SUMMARY, EDUCATION, EXPERIENCE, SKILLS).
+- Uses hyphenated bullet points for lists.
+- Incorporates industry- and role-specific keywords from the job description.
+- Reads as if it were written by a human, with subtle personal touches.
+- **Preserves all the information from the candidate's original resume without omitting any details.**
+- In CV mode, includes all possible details and extended sections (e.g., publications, presentations, research, etc.)
+
+Candidate's Current Resume:
+{resume_text}
+
+{facts_tweaks_str}"""
+
+def build_resume_prompt(tone, emphasis, mode, facts_tweaks_str, job_desc, company_details, resume_text):
+    return resume_prompt_prefix(facts_tweaks_str, resume_text) + f"""
 Tone: {tone}
 Section Emphasis: {emphasis}
 Mode: {mode}
 
-{facts_tweaks_str}
 Sample Output Format:
 ====================
 {mode.upper()}
 [...]
 ====================
 
-Based on the details provided below, please generate a tailored {mode.lower()} that:
-- Is in plain text with clear, capitalized section headings (e.g., PROFESSIONAL SUMMARY, EDUCATION, EXPERIENCE, SKILLS).
-- Uses hyphenated bullet points for lists.
-- Incorporates industry- and role-specific keywords from the job description.
-- Reads as if it were written by a human, using a {tone} tone with subtle personal touches.
-- **Preserves all the information from the candidate's original resume without omitting any details.**
-- Emphasizes: {emphasis}
-- For CV mode, include all possible details and extended sections (e.g., publications, presentations, research, etc.)
-
-Here are the details:
+Based on the details provided below, please generate a tailored {mode.lower()} using a {tone} tone that emphasizes: {emphasis}
 
 Job Description:
 {job_desc}
@@ -260,42 +437,25 @@ Job Description:
 Company Details:
 {company_details}
 
-Candidate's Current Resume:
-{resume_text}
-
 Generate a tailored {mode.lower()} that meets all the above requirements.
 """
-    try:
-        model = "gpt-4o" if "gpt-4o" in openai.Model.list().data else "gpt-3.5-turbo"
-        print(f"[DEBUG] Using model: {model}")
-        print(f"[DEBUG] Resume prompt sent to LLM:\n{resume_prompt[:1000]}...\n[truncated]")
-        resume_response = openai.ChatCompletion.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": "You are an expert career advisor."},
-                {"role": "user", "content": resume_prompt}
-            ],
-            max_tokens=1800,
-            temperature=0.7
-        )
-        tailored_resume = resume_response.choices[0].message.content.strip()
-        print(f"[DEBUG] Tailored resume/CV (first 1000 chars):\n{tailored_resume[:1000]}...\n[truncated]")
-        resume_file = tempfile.NamedTemporaryFile(delete=False, suffix="_resume.txt", mode="w", encoding="utf-8")
-        resume_file.write(tailored_resume)
-        resume_file.close()
-        yield (tailored_resume, None, resume_file.name, None, None, None)
-        # --- Second API call: Generate Cover Letter ---
-        # Ask for structured output for company_name and job_title
-        cover_prompt = f"""
-You are an expert career advisor. Write a complete, ATS-friendly cover letter in plain text, tailored to the job description and company details below. Use the candidate's tailored {mode.lower()} as a reference for skills, experience, and achievements to highlight. The cover letter should:
+
+def cover_prompt_prefix(facts_tweaks_str):
+    return f"""
+You are an expert career advisor. Write a complete, ATS-friendly cover letter in plain text, tailored to the job description and company details below. Use the candidate's tailored resume or CV as a reference for skills, experience, and achievements to highlight. The cover letter should:
 - Start with the candidate's contact information.
-- Include today's date ({current_date}) in place of any placeholder.
-- Use a {tone}, engaging tone—avoid overly formal or mechanical language.
+- Include today's date (given below) in place of any placeholder.
+- Use the tone given below, keeping it engaging—avoid overly formal or mechanical language.
 - Be fully tailored to the job description and company details.
-- Reference and align with the tailored {mode.lower()} provided.
-- At the top of your response, output a JSON object with the following fields: company_name, job_title, extracted from the job description if possible. Example: {"company_name": "Acme Corp", "job_title": "Senior Data Scientist"}
+- Reference and align with the tailored resume or CV provided.
+
+{facts_tweaks_str}"""
+
+def build_cover_prompt(tone, mode, current_date, facts_tweaks_str, job_desc, company_details, tailored_resume):
+    return cover_prompt_prefix(facts_tweaks_str) + f"""
+Today's date: {current_date}
+Tone: {tone}
 
-{facts_tweaks_str}
 Job Description:
 {job_desc}
 
@@ -307,102 +467,403 @@ Tailored {mode}:
 
 Generate a complete cover letter that meets all the above requirements.
 """
-        print(f"[DEBUG] Cover letter prompt sent to LLM:\n{cover_prompt[:1000]}...\n[truncated]")
-        cover_response = openai.ChatCompletion.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": "You are an expert career advisor."},
-                {"role": "user", "content": cover_prompt}
-            ],
-            max_tokens=1200,
-            temperature=0.7
-        )
-        cover_letter_full = cover_response.choices[0].message.content.strip()
-        print(f"[DEBUG] Cover letter (first 1000 chars):\n{cover_letter_full[:1000]}...\n[truncated]")
-        # Try to extract company_name and job_title from the LLM output
-        extracted_company, extracted_title = extract_company_and_title_from_llm(cover_letter_full)
-        # If not found, use user input or prompt for it
-        final_company = extracted_company or company_name
-        final_title = extracted_title or job_title
-        if not final_company or not final_title:
-            # Prompt user to enter missing info (handled in UI)
-            yield (tailored_resume, None, resume_file.name, None, None, f"[Action Required] Please enter missing company name and/or job title.")
-            return
-        # Remove the JSON block from the cover letter before saving/displaying
-        cover_letter = re.sub(r'^\{.*?\}\s*', '', cover_letter_full, flags=re.DOTALL)
-        cover_file = tempfile.NamedTemporaryFile(delete=False, suffix="_cover_letter.txt", mode="w", encoding="utf-8")
-        cover_file.write(cover_letter)
-        cover_file.close()
+
+# Start the cover letter once this many characters of the resume have streamed in, so the two completions
+# overlap; the cover letter then sees that opening of the resume (contact details, summary, recent roles).
+# 0 waits for the full resume.
+COVER_PREFIX_CHARS = int(os.environ.get('COVER_PREFIX_CHARS', 2000))
+
+def resume_prefix(text, limit=COVER_PREFIX_CHARS):
+    # Cut at a line boundary so the cover prompt (and its cache key) does not depend on stream chunking
+    cut = text[:limit]
+    return cut[:cut.rfind('\n')].rstrip() if '\n' in cut else cut
+
+def prompt_overhead_tokens(template_prompt, model):
+    # Tokens of a prompt rendered with empty sections, plus chat framing and the system message
+    return count_message_tokens(chat_messages(template_prompt), model)
+
+def tailor_application_pdf(job_desc, company_details, pdf_file, tone, emphasis, mode, company_name, job_title, job_url, bypass_cache=False, reuse_resume=None, store=True, extractor=None, job_id=None):
+    # reuse_resume: keep this tailored resume and only write the cover letter (incremental regen).
+    # store=False skips inserting a submission row, for callers that update an existing one.
+    # job_id: the queued job this run belongs to; a retried job updates the submission it already stored.
+    # One "generate" span covers the run (including a cancel from the UI); every stage nests under it
+    root = start_span('generate', mode=mode, tone=tone, incremental=reuse_resume is not None)
+    with recording(root):
+        yield from _tailor_application_pdf(root, job_desc, company_details, pdf_file, tone, emphasis, mode, company_name, job_title, job_url,
+                                           bypass_cache, reuse_resume, store, extractor, job_id)
+
+def _tailor_application_pdf(root, job_desc, company_details, pdf_file, tone, emphasis, mode, company_name, job_title, job_url, bypass_cache, reuse_resume, store, extractor, job_id):
+    # If no file uploaded, use the default for the selected mode
+    if pdf_file is None:
+        default_path = get_default_pdf_file(mode)
+        if default_path:
+            pdf_file = default_path
+    with activate(root):
+        resume_text, extract_warning = extract_text_with_warning(pdf_file, extractor)
+    if not resume_text.strip():
+        root.set(outcome='no_text')
+        yield (None, None, None, None, None, extract_warning or "[Warning] No text could be extracted from the resume PDF.")
+        return
+    with span('db_read', parent=root, what='facts_tweaks'):
+        fact_items = get_fact_items()
+        tweak_items = get_tweak_items()
+    facts = snapshot_items(fact_items)
+    tweaks = snapshot_items(tweak_items)
+    # Each output only sees the facts/tweaks that apply to it
+    facts_tweaks_str = format_facts_tweaks([t for t, a in fact_items if a != 'cover'], [t for t, a in tweak_items if a != 'cover'])
+    cover_facts_tweaks_str = format_facts_tweaks([t for t, a in fact_items if a != 'resume'], [t for t, a in tweak_items if a != 'resume'])
+    current_date = datetime.datetime.now().strftime("%B %d, %Y")
+    model = resolve_model("openai")
+    root.set(model=model)
+    # Fit the prompt to the model's context window, trimming the least important sections first
+    resume_sections = None
+    with span('prompt_build', parent=root, output='resume') as s:
+        try:
+            resume_sections, trimmed = fit_sections([
+                PromptSection("resume_text", resume_text, priority=3),
+                PromptSection("facts_tweaks", facts_tweaks_str, priority=2),
+                PromptSection("job_desc", job_desc, priority=1, min_tokens=500),
+                PromptSection("company_details", company_details, priority=0),
+            ], model, RESUME_MAX_TOKENS, fixed_tokens=prompt_overhead_tokens(build_resume_prompt(tone, emphasis, mode, "", "", "", ""), model))
+        except ValueError as e:
+            budget_error = e
+            s.set(outcome='over_budget')
+        else:
+            resume_prompt = build_resume_prompt(tone, emphasis, mode, resume_sections["facts_tweaks"], resume_sections["job_desc"], resume_sections["company_details"], resume_sections["resume_text"])
+            s.set(chars=len(resume_prompt), prefix_chars=len(resume_prompt_prefix(resume_sections["facts_tweaks"], resume_sections["resume_text"])), trimmed=trimmed)
+    if resume_sections is None:
+        root.set(outcome='over_budget')
+        yield (None, None, None, None, None, f"[Warning] {budget_error} Please shorten your resume or job description.")
+        return
+
+    # Metadata, resume and cover letter run as one pipeline. The company and job title are settled first
+    # (explicit fields, regexes, then a small model) so a posting with neither is turned away before the
+    # expensive completions start; the cover letter then overlaps the resume (see COVER_PREFIX_CHARS)
+    def metadata_stage(ctx):
+        def ask_model(prompt):
+            with backend_limits.slot("openai"):
+                return llm.chat(chat_messages(prompt), resolve_small_model("openai"), 100, 0, api_key=openai_api_key)
+        return extract_metadata(job_desc, company_name, job_title, ask_model=ask_model)
+
+    def resume_stage(ctx):
+        if not all(ctx['metadata']):
+            return None
+        if reuse_resume is not None:
+            ctx.publish('resume_prefix', (reuse_resume, True))
+            return reuse_resume
+        text = ''
+        with backend_limits.slot("openai"):
+            for partial in stream_throttled(llm.stream_chat(chat_messages(resume_prompt), model, max_tokens=RESUME_MAX_TOKENS, temperature=0.7, api_key=openai_api_key, bypass_cache=bypass_cache)):
+                if ctx.cancelled:
+                    return text
+                text = partial
+                ctx.emit(text)
+                if 0 < COVER_PREFIX_CHARS <= len(text) and ctx.get('resume_prefix') is None:
+                    ctx.publish('resume_prefix', (resume_prefix(text, COVER_PREFIX_CHARS), False))
+        text = text.strip()
+        if ctx.get('resume_prefix') is None:
+            ctx.publish('resume_prefix', (text, True))
+        return text
+
+    def cover_stage(ctx):
+        prefix, complete = ctx['resume_prefix']
+        with span('prompt_build', output='cover', resume_complete=complete) as s:
+            cover_sections, cover_trimmed = fit_sections([
+                PromptSection("tailored_resume", prefix if complete else prefix + "\n[...]", priority=3),
+                PromptSection("facts_tweaks", cover_facts_tweaks_str, priority=2),
+                PromptSection("job_desc", job_desc, priority=1, min_tokens=500),
+                PromptSection("company_details", company_details, priority=0),
+            ], model, COVER_MAX_TOKENS, fixed_tokens=prompt_overhead_tokens(build_cover_prompt(tone, mode, current_date, "", "", "", ""), model))
+            cover_prompt = build_cover_prompt(tone, mode, current_date, cover_sections["facts_tweaks"], cover_sections["job_desc"], cover_sections["company_details"], cover_sections["tailored_resume"])
+            s.set(chars=len(cover_prompt), prefix_chars=len(cover_prompt_prefix(cover_sections["facts_tweaks"])), trimmed=cover_trimmed)
+        text = ''
+        with backend_limits.slot("openai"):
+            for partial in stream_throttled(llm.stream_chat(chat_messages(cover_prompt), model, max_tokens=COVER_MAX_TOKENS, temperature=0.7, api_key=openai_api_key, bypass_cache=bypass_cache)):
+                if ctx.cancelled:
+                    break
+                text = partial
+                ctx.emit(text)
+        return text.strip(), cover_trimmed
+
+    with activate(root):
+        pipeline = Pipeline()
+    pipeline.stage('metadata', metadata_stage)
+    pipeline.stage('resume', resume_stage, deps=('metadata',))
+    pipeline.stage('cover', cover_stage, deps=('resume_prefix',))
+    tailored_resume, cover_letter, resume_path = '', '', None
+    cover_trimmed = []
+    events = pipeline.run()
+    try:
+        for stage, kind, value in events:
+            if stage == 'metadata' and kind == 'done':
+                final_company, final_title = value
+                if not final_company or not final_title:
+                    # Nothing to file the submission under
+                    root.set(outcome='missing_metadata')
+                    yield (None, None, None, None, None, "[Action Required] Please enter missing company name and/or job title.")
+                    return
+            elif stage == 'resume' and kind in ('progress', 'done'):
+                tailored_resume = value
+                if kind == 'done':
+                    resume_path = artifacts.render(tailored_resume, f"tailored_{mode.lower()}")
+                yield (tailored_resume, cover_letter or None, resume_path, None, None, None)
+            elif stage == 'cover' and kind == 'progress':
+                cover_letter = value
+                yield (tailored_resume, cover_letter, resume_path, None, None, None)
+            elif stage == 'cover' and kind == 'done':
+                cover_letter, cover_trimmed = value
+        root.set(resume_chars=len(tailored_resume), cover_chars=len(cover_letter))
+        trimmed_parts = [f"{label}: {', '.join(names)}" for label, names in ((mode.lower(), trimmed), ("cover letter", cover_trimmed)) if names]
+        budget_note = f"[Note] Trimmed to fit the {model} context window ({'; '.join(trimmed_parts)})." if trimmed_parts else None
+        # A partially extracted resume is still used, but the user is told what is missing
+        budget_note = "\n".join(filter(None, [extract_warning, budget_note])) or None
+        cover_path = artifacts.render(cover_letter, "cover_letter")
         # Store submission
-        store_submission(job_desc, company_details, final_company, final_title, job_url, mode, tone, emphasis, facts, tweaks, str(pdf_file), tailored_resume, cover_letter)
-        yield (tailored_resume, cover_letter, resume_file.name, cover_file.name, None, None)
+        if store:
+            with span('db_write', parent=root, what='submission'):
+                store_submission(job_desc, company_details, final_company, final_title, job_url, mode, tone, emphasis, facts, tweaks, str(pdf_file), tailored_resume, cover_letter, job_id=job_id)
+        yield (tailored_resume, cover_letter, resume_path, cover_path, budget_note, None)
     except Exception as e:
         import traceback
         print(f"[ERROR] Exception in tailor_application_pdf: {e}")
         traceback.print_exc()
+        root.fail(e)
         yield (None, None, None, None, None, f"[Error] {str(e)}")
+    finally:
+        events.close()
+
+def run_batch_job(job, report, out_dir=None):
+    # Drive one posting through tailor_application_pdf, reporting progress for the batch table
+    last = None
+    resume_ready = False
+    for result in tailor_application_pdf(job['job_description'], job['company_details'], job['pdf_file'], job['tone'], job['emphasis'], job['mode'], job['company_name'], job['job_title'], job['job_url'], extractor=job.get('extractor')):
+        last = result
+        if result[2] and not resume_ready:
+            resume_ready = True
+            report('resume ready')
+    warn = last[5] if last else "[Error] Generation produced no output."
+    if warn:
+        return ('error' if warn.startswith('[Error]') else 'needs input'), warn
+    if out_dir:
+        write_outputs(out_dir, job['id'], last[0], last[1])
+    return 'done', ''
+
+def batch_rows(statuses):
+    return [[s['id'], s['job_title'], s['company_name'], s['status'], round(s['elapsed'], 1), s['message']] for s in statuses]
+
+def run_batch_ui(jsonl_text, jsonl_file, mode, tone, emphasis, workers):
+    lines = (jsonl_text or '').splitlines()
+    if jsonl_file is not None:
+        with open(getattr(jsonl_file, 'name', jsonl_file), encoding='utf-8') as f:
+            lines += f.read().splitlines()
+    try:
+        jobs = load_jobs_jsonl(lines, defaults={'mode': mode, 'tone': tone, 'emphasis': emphasis})
+    except ValueError as e:
+        yield [["-", "", "", "error", 0, f"[Error] Invalid JSONL: {e}"]]
+        return
+    for statuses in run_batch(jobs, run_batch_job, max_workers=int(workers)):
+        yield batch_rows(statuses)
+
+# --- Library API: the same generation core as the UI, without gradio ---
+
+def generate(job_description, company_details="Direct to company", pdf_file=None, tone="Formal", emphasis="", mode="Resume",
+             company_name="", job_title="", job_url="", bypass_cache=False, on_progress=None, extractor=None):
+    """
+    Generate a tailored resume/CV and cover letter and store the submission.
+    on_progress(resume_so_far, cover_letter_so_far) is called as the outputs stream.
+    pdf_file may also be a .docx; extractor overrides PDF_EXTRACTOR for this file.
+    Returns a dict with resume, cover_letter, resume_path, cover_letter_path, note and message
+    (message is set when generation did not complete, e.g. "[Action Required] ...").
+    """
+    last = (None,) * 6
+    for last in tailor_application_pdf(job_description, company_details, pdf_file, tone, emphasis, mode, company_name, job_title, job_url, bypass_cache=bypass_cache, extractor=extractor):
+        if on_progress:
+            on_progress(last[0] or '', last[1] or '')
+    resume, cover_letter, resume_path, cover_path, note, message = last
+    return {"resume": resume, "cover_letter": cover_letter, "resume_path": resume_path, "cover_letter_path": cover_path, "note": note, "message": message}
+
+def regenerate(sub_id, bypass_cache=False, force=False):
+    """Regenerate a stored submission with the current facts/tweaks; returns resume, cover_letter, message and status (done/skipped/failed)."""
+    resume, cover_letter, message, status = regen_submission(sub_id, bypass_cache, force)
+    return {"resume": resume, "cover_letter": cover_letter, "message": message, "status": status}
+
+def generate_batch(jobs, max_workers=BATCH_WORKERS, out_dir=None):
+    """Run parsed batch jobs (see batch.parse_job) on a worker pool; yields status snapshots."""
+    return run_batch(jobs, lambda job, report: run_batch_job(job, report, out_dir), max_workers=max_workers)
+
+def write_outputs(out_dir, name, resume, cover_letter):
+    os.makedirs(out_dir, exist_ok=True)
+    prefix = re.sub(r'[^\w.-]+', '_', str(name))
+    paths = []
+    for suffix, text in (("resume", resume), ("cover_letter", cover_letter)):
+        if text:
+            path = os.path.join(out_dir, f"{prefix}_{suffix}.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+            paths.append(path)
+    return paths
+
+def regen_submission(sub_id, bypass_cache=False, force=False):
+    # Returns (resume, cover_letter, message, status); status is 'done', 'skipped' (nothing changed) or 'failed'
+    row = db.query_one('SELECT company_details, job_url, company_name, job_title, mode, tone, emphasis, resume_pdf_path FROM submissions WHERE id = ?', (int(sub_id),))
+    if not row:
+        return ("", "", "[Error] Submission not found.", 'failed')
+    company_details, job_url, company_name, job_title, mode, tone, emphasis, resume_pdf_path = row
+    stored = load_submission_texts(int(sub_id), ("job_description", "tailored_resume", "cover_letter", "facts", "tweaks"))
+    if stored is None:
+        # Deleted since the lookup above
+        return ("", "", "[Error] Submission not found.", 'failed')
+    # Only regenerate the outputs that depend on facts/tweaks changed since this submission was generated
+    fact_items, tweak_items = get_fact_items(), get_tweak_items()
+    outputs, changed = outputs_affected(stored["facts"], stored["tweaks"], fact_items, tweak_items)
+    if force or not stored["tailored_resume"]:
+        outputs = {'resume', 'cover'}
+    if not outputs:
+        return (stored["tailored_resume"], stored["cover_letter"], "[Info] Facts and tweaks are unchanged since this submission was generated; nothing to regenerate. Tick 'Force full regen' to regenerate anyway.", 'skipped')
+    reuse_resume = None if 'resume' in outputs else stored["tailored_resume"]
+    # Regenerate using the same function as main UI
+    gen = tailor_application_pdf(stored["job_description"], company_details, resume_pdf_path, tone, emphasis, mode, company_name, job_title, job_url,
+                                 bypass_cache=bypass_cache, reuse_resume=reuse_resume, store=False)
+    # Get final result (streaming not needed here)
+    last = None
+    for result in gen:
+        last = result
+    if last:
+        resume, cover, _, _, warn, error = last + (None,) * (6 - len(last))
+        if error or resume is None or cover is None:
+            return (stored["tailored_resume"], stored["cover_letter"], error or "[Error] Regeneration failed.", 'failed')
+        update_submission_outputs(int(sub_id), resume, cover, snapshot_items(fact_items), snapshot_items(tweak_items))
+        scope = "resume/CV and cover letter" if reuse_resume is None else "cover letter only"
+        reason = "forced" if force else f"{changed} fact/tweak change(s)"
+        return (resume, cover, "\n".join(filter(None, [f"[Info] Regenerated {scope} ({reason}).", warn])), 'done')
+    return ("", "", "[Error] Regeneration failed.", 'failed')
+
+def bulk_regen_item(sub_id, bypass_cache=False, force=False):
+    # One bulk job item: (status, message) for the job's progress table
+    _, _, message, status = regen_submission(sub_id, bypass_cache, force)
+    return status, message
+
+bulk_regen = BulkRegenManager(bulk_regen_item)
+
+def format_bulk_progress(progress):
+    if progress is None:
+        return "[Error] Bulk job not found."
+    eta = f", about {progress['eta'] / 60:.0f} min left" if progress['eta'] else ""
+    lines = [f"Job {progress['id']} ({progress['state_filter'] or 'all'} submissions): {progress['status']}. "
+             f"{progress['completed']}/{progress['total']} processed; {progress['done']} regenerated, {progress['skipped']} unchanged, "
+             f"{progress['failed']} failed; {progress['per_minute']:.1f}/min{eta}."]
+    lines += [f"- #{sub_id} (attempt {attempts}): {message}" for sub_id, attempts, message in bulk_regen.failures(progress['id'], limit=10)]
+    return "\n".join(lines)
+
+def watch_bulk_regen(job_id, interval=1.0):
+    # Stream progress until the job finishes, whichever worker runs it
+    job_id = int(job_id)
+    while True:
+        progress = bulk_regen.progress(job_id)
+        yield job_id, format_bulk_progress(progress)
+        if progress is None or progress['status'] != 'running':
+            return
+        time.sleep(interval)
+
+def start_bulk_regen(state, force, bypass_cache):
+    job_id = bulk_regen.start(None if state == "all" else state, force=force, bypass_cache=bypass_cache)
+    yield from watch_bulk_regen(job_id)
+
+def cancel_bulk_regen(job_id):
+    if job_id:
+        bulk_regen.cancel(int(job_id))
+        return format_bulk_progress(bulk_regen.progress(int(job_id)))
+    return ""
+
+# --- Job queue: the UI's generate/regen requests run as durable jobs on leased workers (see job_queue) ---
+
+TAILOR_ARGS = ("job_desc", "company_details", "pdf_file", "tone", "emphasis", "mode", "company_name", "job_title", "job_url", "bypass_cache")
+
+def generate_job(payload, report, job_id):
+    last = (None,) * 6
+    for last in tailor_application_pdf(**payload, job_id=job_id):
+        report(list(last))
+    return list(last)
+
+def regen_job(payload, report, job_id):
+    return list(regen_submission(payload["sub_id"], payload["bypass_cache"], payload["force"]))
+
+JOB_HANDLERS = {"generate": generate_job, "regen": regen_job, "bulk_regen": bulk_regen.run}
+
+def job_status_line(job):
+    if job["status"] == "queued":
+        ahead = job_queue.queue_position(job["id"])
+        return f"[Info] Job {job['id']} is queued" + (f" behind {ahead} other job(s)." if ahead else ".")
+    if job["status"] == "running" and job["attempts"] > 1:
+        return f"[Info] Job {job['id']} is being retried (attempt {job['attempts']}/{job['max_attempts']})."
+    if job["status"] == "failed":
+        return f"[Error] Job {job['id']} failed: {job['error']}"
+    if job["status"] == "cancelled":
+        return f"[Info] Job {job['id']} was cancelled."
+    return None
+
+def watch_generate_job(job_id):
+    # Job id, the four outputs, and note/message/queue status in one warnings box
+    if not job_id:
+        return
+    for job in job_queue.watch(int(job_id)):
+        resume, cover, resume_path, cover_path, note, message = job["result"] or job["progress"] or (None,) * 6
+        yield int(job_id), resume, cover, resume_path, cover_path, "\n".join(filter(None, [job_status_line(job), note, message]))
+
+def queued_generate(job_desc, company_details, pdf_file, tone, emphasis, mode, company_name, job_title, job_url, bypass_cache=False):
+    # The job keeps running if the browser goes away; reopen it from its id
+    values = (job_desc, company_details, job_queue.stash_upload(getattr(pdf_file, "name", pdf_file)), tone, emphasis, mode, company_name, job_title, job_url, bool(bypass_cache))
+    yield from watch_generate_job(job_queue.enqueue("generate", dict(zip(TAILOR_ARGS, values))))
+
+def render_downloads(resume, cover_letter, fmt, mode):
+    # Rendered from the texts on screen; the artifact store only writes a format the first time it is asked for
+    return (artifacts.render(resume, f"tailored_{mode.lower()}", fmt) if resume else None,
+            artifacts.render(cover_letter, "cover_letter", fmt) if cover_letter else None)
+
+def queued_regen(sub_id, bypass_cache=False, force=False):
+    job = job_queue.run_job("regen", {"sub_id": int(sub_id), "bypass_cache": bool(bypass_cache), "force": bool(force)})
+    if job["status"] == "done":
+        return tuple(job["result"][:3])
+    stored = load_submission_texts(int(sub_id), ("tailored_resume", "cover_letter"))
+    if stored is None:
+        return ("", "", "[Error] Submission not found.")
+    return (stored["tailored_resume"], stored["cover_letter"], job_status_line(job))
 
 def get_facts_with_ids():
-    conn = sqlite3.connect('facts_tweaks.db')
-    c = conn.cursor()
-    c.execute('SELECT id, text FROM facts')
-    facts = c.fetchall()
-    conn.close()
-    return facts
+    return db.query('SELECT id, text, applies_to FROM facts')
 
 def get_tweaks_with_ids():
-    conn = sqlite3.connect('facts_tweaks.db')
-    c = conn.cursor()
-    c.execute('SELECT id, text FROM tweaks')
-    tweaks = c.fetchall()
-    conn.close()
-    return tweaks
+    return db.query('SELECT id, text, applies_to FROM tweaks')
 
 def edit_fact(fact_id, new_text):
-    conn = sqlite3.connect('facts_tweaks.db')
-    c = conn.cursor()
-    c.execute('UPDATE facts SET text = ? WHERE id = ?', (new_text, fact_id))
-    conn.commit()
-    conn.close()
+    db.execute('UPDATE facts SET text = ? WHERE id = ?', (new_text, fact_id))
 
 def edit_tweak(tweak_id, new_text):
-    conn = sqlite3.connect('facts_tweaks.db')
-    c = conn.cursor()
-    c.execute('UPDATE tweaks SET text = ? WHERE id = ?', (new_text, tweak_id))
-    conn.commit()
-    conn.close()
+    db.execute('UPDATE tweaks SET text = ? WHERE id = ?', (new_text, tweak_id))
 
 def facts_tweaks_advanced_ui():
     facts = get_facts_with_ids()
     tweaks = get_tweaks_with_ids()
-    facts_display = [f"{fid}: {text}" for fid, text in facts]
-    tweaks_display = [f"{tid}: {text}" for tid, text in tweaks]
+    facts_display = [f"{fid}: {text}" + (f" ({applies_to} only)" if applies_to != 'both' else '') for fid, text, applies_to in facts]
+    tweaks_display = [f"{tid}: {text}" + (f" ({applies_to} only)" if applies_to != 'both' else '') for tid, text, applies_to in tweaks]
     return facts_display, tweaks_display
 
-def add_fact_advanced(fact):
+def add_fact_advanced(fact, applies_to="Both"):
     if fact.strip():
-        add_fact(fact.strip())
+        add_fact(fact.strip(), FACT_SCOPES.get(applies_to, 'both'))
     return facts_tweaks_advanced_ui()
 
-def add_tweak_advanced(tweak):
+def add_tweak_advanced(tweak, applies_to="Both"):
     if tweak.strip():
-        add_tweak(tweak.strip())
+        add_tweak(tweak.strip(), FACT_SCOPES.get(applies_to, 'both'))
     return facts_tweaks_advanced_ui()
 
 def delete_fact_advanced(fact_id):
-    conn = sqlite3.connect('facts_tweaks.db')
-    c = conn.cursor()
-    c.execute('DELETE FROM facts WHERE id = ?', (fact_id,))
-    conn.commit()
-    conn.close()
+    db.execute('DELETE FROM facts WHERE id = ?', (fact_id,))
     return facts_tweaks_advanced_ui()
 
 def delete_tweak_advanced(tweak_id):
-    conn = sqlite3.connect('facts_tweaks.db')
-    c = conn.cursor()
-    c.execute('DELETE FROM tweaks WHERE id = ?', (tweak_id,))
-    conn.commit()
-    conn.close()
+    db.execute('DELETE FROM tweaks WHERE id = ?', (tweak_id,))
     return facts_tweaks_advanced_ui()
 
 def edit_fact_advanced(fact_id, new_text):
@@ -413,167 +874,343 @@ def edit_tweak_advanced(tweak_id, new_text):
     edit_tweak(tweak_id, new_text)
     return facts_tweaks_advanced_ui()
 
-# --- Gradio UI for facts/tweaks management ---
-facts_input = gr.Textbox(label="Add Fact (persistent)")
-tweaks_input = gr.Textbox(label="Add Tweak (situational)")
-facts_list = gr.Dataframe(headers=["ID", "Fact"], datatype=["number", "str"], label="Facts List", interactive=True)
-tweaks_list = gr.Dataframe(headers=["ID", "Tweak"], datatype=["number", "str"], label="Tweaks List", interactive=True)
-
-with gr.Blocks() as demo:
-    gr.Markdown("## ATS-Optimized Resume & CV Tailoring Bot with Facts & Tweaks")
-    with gr.Tab("Resume/CV & Cover Letter"):
-        job_desc = gr.Textbox(lines=10, placeholder="Paste the job description here...", label="Job Description")
-        company_details_mode = gr.Radio(["Direct to Company", "Via Recruiter/Agency"], value="Direct to Company", label="Application Method")
-        recruiter_name = gr.Textbox(lines=1, placeholder="Recruiter/Agency Name (if applicable)", label="Recruiter/Agency Name", visible=False)
-        def toggle_recruiter_field(method):
-            return gr.update(visible=(method == "Via Recruiter/Agency"))
-        company_details_mode.change(toggle_recruiter_field, inputs=company_details_mode, outputs=recruiter_name)
-        # Hidden textbox to hold computed company_details
-        company_details = gr.Textbox(visible=False)
-        def company_details_value(method, recruiter):
-            if method == "Via Recruiter/Agency" and recruiter.strip():
-                return f"Via recruiter/agency: {recruiter.strip()}"
-            return "Direct to company"
-        # Update company_details whenever mode or recruiter changes
-        company_details_mode.change(company_details_value, inputs=[company_details_mode, recruiter_name], outputs=company_details)
-        recruiter_name.change(company_details_value, inputs=[company_details_mode, recruiter_name], outputs=company_details)
-        pdf_file = gr.File(label="Upload Resume PDF")
-        tone = gr.Radio(["Formal", "Friendly", "Conversational"], value="Formal", label="Tone")
-        emphasis = gr.Textbox(lines=2, placeholder="e.g. Skills, Experience", label="Section Emphasis (comma-separated)")
-        mode = gr.Radio(["Resume", "CV"], value="Resume", label="Mode (Resume or CV)")
-        job_url = gr.Textbox(lines=1, placeholder="Enter job URL...", label="Job URL")
-        company_name = gr.Textbox(lines=1, placeholder="Company name (auto-extracted if possible)", label="Company Name (optional)")
-        job_title = gr.Textbox(lines=1, placeholder="Job title (auto-extracted if possible)", label="Job Title (optional)")
-        run_btn = gr.Button("Generate Resume/CV & Cover Letter")
-        resume_out = gr.Textbox(label="Tailored Resume/CV (view)")
-        cover_out = gr.Textbox(label="Cover Letter (view)")
-        resume_file_out = gr.File(label="Download Tailored Resume (.txt)")
-        cover_file_out = gr.File(label="Download Cover Letter (.txt)")
-        warn_out = gr.Textbox(label="Warnings or Errors")
-        run_btn.click(
-            tailor_application_pdf,
-            inputs=[job_desc, company_details, pdf_file, tone, emphasis, mode, company_name, job_title, job_url],
-            outputs=[resume_out, cover_out, resume_file_out, cover_file_out, warn_out],
-            api_name="generate"
-        )
-    with gr.Tab("Facts & Tweaks Management"):
-        gr.Markdown("### Manage your persistent facts and situational tweaks.")
-        with gr.Row():
-            facts_input.render()
-            add_fact_btn = gr.Button("Add Fact")
-        with gr.Row():
-            tweaks_input.render()
-            add_tweak_btn = gr.Button("Add Tweak")
-        facts_list.render()
-        tweaks_list.render()
-        # Buttons for delete/edit
-        del_fact_id = gr.Number(label="Delete Fact by ID")
-        del_fact_btn = gr.Button("Delete Fact")
-        edit_fact_id = gr.Number(label="Edit Fact ID")
-        edit_fact_text = gr.Textbox(label="New Fact Text")
-        edit_fact_btn = gr.Button("Edit Fact")
-        del_tweak_id = gr.Number(label="Delete Tweak by ID")
-        del_tweak_btn = gr.Button("Delete Tweak")
-        edit_tweak_id = gr.Number(label="Edit Tweak ID")
-        edit_tweak_text = gr.Textbox(label="New Tweak Text")
-        edit_tweak_btn = gr.Button("Edit Tweak")
-        # Bindings
-        add_fact_btn.click(add_fact_advanced, inputs=facts_input, outputs=[facts_list, tweaks_list])
-        add_tweak_btn.click(add_tweak_advanced, inputs=tweaks_input, outputs=[facts_list, tweaks_list])
-        del_fact_btn.click(delete_fact_advanced, inputs=del_fact_id, outputs=[facts_list, tweaks_list])
-        del_tweak_btn.click(delete_tweak_advanced, inputs=del_tweak_id, outputs=[facts_list, tweaks_list])
-        edit_fact_btn.click(edit_fact_advanced, inputs=[edit_fact_id, edit_fact_text], outputs=[facts_list, tweaks_list])
-        edit_tweak_btn.click(edit_tweak_advanced, inputs=[edit_tweak_id, edit_tweak_text], outputs=[facts_list, tweaks_list])
-        # Initial display
-        facts_list.value, tweaks_list.value = facts_tweaks_advanced_ui()
-    # Submissions management tab
-    with gr.Tab("Submissions Management"):
-        gr.Markdown("### Review and manage all job submissions.")
-        submissions_table = gr.Dataframe(headers=["ID", "Timestamp", "Job Title", "Company Name", "Job URL", "State", "Reviewer Notes"], datatype=["number", "str", "str", "str", "str", "str", "str"], label="Submissions", interactive=False)
-        refresh_btn = gr.Button("Refresh Submissions List")
-        # State and notes editing controls
-        edit_id = gr.Number(label="Submission ID to Edit")
-        new_state = gr.Dropdown(choices=["pending", "approved", "rejected", "applied"], label="Set State")
-        reviewer_notes = gr.Textbox(lines=2, label="Reviewer Notes")
-        update_btn = gr.Button("Update State/Notes")
-        # Submission detail/review section
-        detail_id = gr.Number(label="Submission ID to Review")
-        load_detail_btn = gr.Button("Load Submission Details")
-        detail_job_desc = gr.Textbox(label="Job Description", interactive=False)
-        detail_company_details = gr.Textbox(label="Company Details", interactive=False)
-        detail_job_url = gr.Textbox(label="Job URL", interactive=False)
-        detail_company_name = gr.Textbox(label="Company Name", interactive=False)
-        detail_job_title = gr.Textbox(label="Job Title", interactive=False)
-        detail_mode = gr.Textbox(label="Mode", interactive=False)
-        detail_tone = gr.Textbox(label="Tone", interactive=False)
-        detail_emphasis = gr.Textbox(label="Emphasis", interactive=False)
-        detail_resume = gr.Textbox(label="Tailored Resume/CV (view)", interactive=False)
-        detail_cover = gr.Textbox(label="Cover Letter (view)", interactive=False)
-        # Facts/tweaks display and edit
-        gr.Markdown("#### Current Facts & Tweaks (edit in Facts & Tweaks tab)")
-        facts_display = gr.Textbox(label="Facts", value="", interactive=False)
-        tweaks_display = gr.Textbox(label="Tweaks", value="", interactive=False)
-        # Regenerate button
-        regen_btn = gr.Button("Regenerate Resume/CV & Cover Letter with Current Facts/Tweaks")
-        regen_warn = gr.Textbox(label="Warnings or Errors (regen)")
-        # Helper functions
-        def fetch_submissions():
-            conn = sqlite3.connect('facts_tweaks.db')
-            c = conn.cursor()
-            c.execute('SELECT id, timestamp, job_title, company_name, job_url, state, reviewer_notes FROM submissions ORDER BY timestamp DESC')
-            rows = c.fetchall()
-            conn.close()
-            return rows
-        def update_submission_state_and_notes(sub_id, state, notes):
-            conn = sqlite3.connect('facts_tweaks.db')
-            c = conn.cursor()
-            c.execute('UPDATE submissions SET state = ?, reviewer_notes = ? WHERE id = ?', (state, notes, int(sub_id)))
-            conn.commit()
-            conn.close()
-            return fetch_submissions()
-        def load_submission_detail(sub_id):
-            conn = sqlite3.connect('facts_tweaks.db')
-            c = conn.cursor()
-            c.execute('SELECT job_description, company_details, job_url, company_name, job_title, mode, tone, emphasis, tailored_resume, cover_letter FROM submissions WHERE id = ?', (int(sub_id),))
-            row = c.fetchone()
-            conn.close()
-            if row:
-                return row + (get_facts(), get_tweaks(), "")
-            return ("", "", "", "", "", "", "", "", "", "", [], [], "[Error] Submission not found.")
-        def regen_submission(sub_id):
-            # Load original fields
-            conn = sqlite3.connect('facts_tweaks.db')
-            c = conn.cursor()
-            c.execute('SELECT job_description, company_details, job_url, company_name, job_title, mode, tone, emphasis, resume_pdf_path FROM submissions WHERE id = ?', (int(sub_id),))
-            row = c.fetchone()
-            conn.close()
-            if not row:
-                return ("", "", "[Error] Submission not found.")
-            job_desc, company_details, job_url, company_name, job_title, mode, tone, emphasis, resume_pdf_path = row
-            # Use current facts/tweaks
-            facts = get_facts()
-            tweaks = get_tweaks()
-            # Regenerate using the same function as main UI
-            gen = tailor_application_pdf(job_desc, company_details, resume_pdf_path, tone, emphasis, mode, company_name, job_title, job_url)
-            # Get final result (streaming not needed here)
-            last = None
-            for result in gen:
-                last = result
-            if last:
-                resume, cover, _, _, warn, *_ = last + (None,) * (6 - len(last))
-                # Optionally, update the DB with new outputs
-                conn = sqlite3.connect('facts_tweaks.db')
-                c = conn.cursor()
-                c.execute('UPDATE submissions SET tailored_resume = ?, cover_letter = ? WHERE id = ?', (resume, cover, int(sub_id)))
-                conn.commit()
-                conn.close()
-                return (resume, cover, warn)
-            return ("", "", "[Error] Regeneration failed.")
-        refresh_btn.click(lambda: fetch_submissions(), outputs=submissions_table)
-        update_btn.click(update_submission_state_and_notes, inputs=[edit_id, new_state, reviewer_notes], outputs=submissions_table)
-        load_detail_btn.click(load_submission_detail, inputs=detail_id, outputs=[detail_job_desc, detail_company_details, detail_job_url, detail_company_name, detail_job_title, detail_mode, detail_tone, detail_emphasis, detail_resume, detail_cover, facts_display, tweaks_display, regen_warn])
-        regen_btn.click(regen_submission, inputs=detail_id, outputs=[detail_resume, detail_cover, regen_warn])
-        # Initial display
-        submissions_table.value = fetch_submissions()
-
-demo.launch(share=True, debug=True, server_name='0.0.0.0')
\ No newline at end of file
+def fetch_submissions(page=1, size=SUBMISSIONS_PAGE_SIZE, state="all", company="", sort="Newest"):
+    size = int(size or SUBMISSIONS_PAGE_SIZE)
+    rows, total = list_submissions_page(page or 1, size, None if state == "all" else state, company, sort)
+    pages = max(1, -(-total // size))
+    if rows == [] and total and (page or 1) > pages:
+        # Filters shrank the result set; fall back to the last page
+        return fetch_submissions(pages, size, state, company, sort)
+    page = max(1, int(page or 1))
+    return rows, page, f"Page {page} of {pages} ({total} submissions)"
+
+def update_submission_state_and_notes(sub_id, state, notes, page, size, filter_state, company, sort):
+    db.execute('UPDATE submissions SET state = ?, reviewer_notes = ? WHERE id = ?', (state, notes, int(sub_id)))
+    return fetch_submissions(page, size, filter_state, company, sort)
+
+def load_submission_detail(sub_id):
+    row = db.query_one('SELECT company_details, job_url, company_name, job_title, mode, tone, emphasis FROM submissions WHERE id = ?', (int(sub_id),))
+    if row:
+        # Large texts live in the blob store and are only loaded for the detail view
+        texts = load_submission_texts(int(sub_id), ("job_description", "tailored_resume", "cover_letter"))
+        return (texts["job_description"],) + row + (texts["tailored_resume"], texts["cover_letter"], get_facts(), get_tweaks(), "")
+    return ("", "", "", "", "", "", "", "", "", "", [], [], "[Error] Submission not found.")
+
+def build_ui():
+    # gradio is only imported when a UI is actually wanted
+    import gradio as gr
+    facts_input = gr.Textbox(label="Add Fact (persistent)")
+    tweaks_input = gr.Textbox(label="Add Tweak (situational)")
+    facts_list = gr.Dataframe(headers=["ID", "Fact"], datatype=["number", "str"], label="Facts List", interactive=True)
+    tweaks_list = gr.Dataframe(headers=["ID", "Tweak"], datatype=["number", "str"], label="Tweaks List", interactive=True)
+
+    with gr.Blocks() as demo:
+        gr.Markdown("## ATS-Optimized Resume & CV Tailoring Bot with Facts & Tweaks")
+        with gr.Tab("Resume/CV & Cover Letter"):
+            job_desc = gr.Textbox(lines=10, placeholder="Paste the job description here...", label="Job Description")
+            company_details_mode = gr.Radio(["Direct to Company", "Via Recruiter/Agency"], value="Direct to Company", label="Application Method")
+            recruiter_name = gr.Textbox(lines=1, placeholder="Recruiter/Agency Name (if applicable)", label="Recruiter/Agency Name", visible=False)
+            def toggle_recruiter_field(method):
+                return gr.update(visible=(method == "Via Recruiter/Agency"))
+            company_details_mode.change(toggle_recruiter_field, inputs=company_details_mode, outputs=recruiter_name)
+            # Hidden textbox to hold computed company_details
+            company_details = gr.Textbox(visible=False)
+            def company_details_value(method, recruiter):
+                if method == "Via Recruiter/Agency" and recruiter.strip():
+                    return f"Via recruiter/agency: {recruiter.strip()}"
+                return "Direct to company"
+            # Update company_details whenever mode or recruiter changes
+            company_details_mode.change(company_details_value, inputs=[company_details_mode, recruiter_name], outputs=company_details)
+            recruiter_name.change(company_details_value, inputs=[company_details_mode, recruiter_name], outputs=company_details)
+            pdf_file = gr.File(label="Upload Resume (PDF or DOCX)")
+            tone = gr.Radio(["Formal", "Friendly", "Conversational"], value="Formal", label="Tone")
+            emphasis = gr.Textbox(lines=2, placeholder="e.g. Skills, Experience", label="Section Emphasis (comma-separated)")
+            mode = gr.Radio(["Resume", "CV"], value="Resume", label="Mode (Resume or CV)")
+            job_url = gr.Textbox(lines=1, placeholder="Enter job URL...", label="Job URL")
+            company_name = gr.Textbox(lines=1, placeholder="Company name (auto-extracted if possible)", label="Company Name (optional)")
+            job_title = gr.Textbox(lines=1, placeholder="Job title (auto-extracted if possible)", label="Job Title (optional)")
+            fresh_sample = gr.Checkbox(value=False, label="Fresh sample (bypass response cache)")
+            run_btn = gr.Button("Generate Resume/CV & Cover Letter")
+            resume_out = gr.Textbox(label="Tailored Resume/CV (view)")
+            cover_out = gr.Textbox(label="Cover Letter (view)")
+            download_format = gr.Radio(artifacts.available_formats(), value="txt", label="Download Format")
+            resume_file_out = gr.File(label="Download Tailored Resume/CV")
+            cover_file_out = gr.File(label="Download Cover Letter")
+            warn_out = gr.Textbox(label="Warnings or Errors")
+            with gr.Row():
+                gen_job_id = gr.Number(label="Job ID", precision=0)
+                gen_watch_btn = gr.Button("Reopen Job")
+            gen_outputs = [gen_job_id, resume_out, cover_out, resume_file_out, cover_file_out, warn_out]
+            download_inputs = [resume_out, cover_out, download_format, mode]
+            download_outputs = [resume_file_out, cover_file_out]
+            run_btn.click(
+                queued_generate,
+                inputs=[job_desc, company_details, pdf_file, tone, emphasis, mode, company_name, job_title, job_url, fresh_sample],
+                outputs=gen_outputs,
+                api_name="generate"
+            ).then(render_downloads, inputs=download_inputs, outputs=download_outputs)
+            gen_watch_btn.click(watch_generate_job, inputs=gen_job_id, outputs=gen_outputs).then(render_downloads, inputs=download_inputs, outputs=download_outputs)
+            download_format.change(render_downloads, inputs=download_inputs, outputs=download_outputs)
+        with gr.Tab("Facts & Tweaks Management"):
+            gr.Markdown("### Manage your persistent facts and situational tweaks.")
+            with gr.Row():
+                facts_input.render()
+                fact_scope = gr.Radio(list(FACT_SCOPES), value="Both", label="Applies to")
+                add_fact_btn = gr.Button("Add Fact")
+            with gr.Row():
+                tweaks_input.render()
+                tweak_scope = gr.Radio(list(FACT_SCOPES), value="Both", label="Applies to")
+                add_tweak_btn = gr.Button("Add Tweak")
+            facts_list.render()
+            tweaks_list.render()
+            # Buttons for delete/edit
+            del_fact_id = gr.Number(label="Delete Fact by ID")
+            del_fact_btn = gr.Button("Delete Fact")
+            edit_fact_id = gr.Number(label="Edit Fact ID")
+            edit_fact_text = gr.Textbox(label="New Fact Text")
+            edit_fact_btn = gr.Button("Edit Fact")
+            del_tweak_id = gr.Number(label="Delete Tweak by ID")
+            del_tweak_btn = gr.Button("Delete Tweak")
+            edit_tweak_id = gr.Number(label="Edit Tweak ID")
+            edit_tweak_text = gr.Textbox(label="New Tweak Text")
+            edit_tweak_btn = gr.Button("Edit Tweak")
+            # Bindings
+            add_fact_btn.click(add_fact_advanced, inputs=[facts_input, fact_scope], outputs=[facts_list, tweaks_list])
+            add_tweak_btn.click(add_tweak_advanced, inputs=[tweaks_input, tweak_scope], outputs=[facts_list, tweaks_list])
+            del_fact_btn.click(delete_fact_advanced, inputs=del_fact_id, outputs=[facts_list, tweaks_list])
+            del_tweak_btn.click(delete_tweak_advanced, inputs=del_tweak_id, outputs=[facts_list, tweaks_list])
+            edit_fact_btn.click(edit_fact_advanced, inputs=[edit_fact_id, edit_fact_text], outputs=[facts_list, tweaks_list])
+            edit_tweak_btn.click(edit_tweak_advanced, inputs=[edit_tweak_id, edit_tweak_text], outputs=[facts_list, tweaks_list])
+        with gr.Tab("Batch Submissions"):
+            gr.Markdown("### Generate applications for many job postings at once (one JSON object per line).")
+            batch_jsonl = gr.Textbox(lines=10, placeholder='{"title": "Data Engineer", "body": "<job description>", "job_url": "https://..."}', label="Job Postings (JSONL)")
+            batch_file = gr.File(label="Or upload a .jsonl file")
+            with gr.Row():
+                batch_mode = gr.Radio(["Resume", "CV"], value="Resume", label="Mode (Resume or CV)")
+                batch_tone = gr.Radio(["Formal", "Friendly", "Conversational"], value="Formal", label="Tone")
+                batch_workers = gr.Slider(1, 32, value=BATCH_WORKERS, step=1, label="Workers")
+            batch_emphasis = gr.Textbox(lines=1, placeholder="e.g. Skills, Experience", label="Section Emphasis (comma-separated)")
+            batch_btn = gr.Button("Run Batch")
+            batch_table = gr.Dataframe(headers=["Job", "Job Title", "Company Name", "Status", "Elapsed (s)", "Message"], datatype=["str", "str", "str", "str", "number", "str"], label="Batch Progress", interactive=False)
+            batch_btn.click(run_batch_ui, inputs=[batch_jsonl, batch_file, batch_mode, batch_tone, batch_emphasis, batch_workers], outputs=batch_table)
+        # Submissions management tab
+        with gr.Tab("Submissions Management"):
+            gr.Markdown("### Review and manage all job submissions.")
+            with gr.Row():
+                search_box = gr.Textbox(lines=1, placeholder="e.g. datadog platform engineer", label="Search Submissions (job description, company, title, resume, cover letter)")
+                search_btn = gr.Button("Search")
+            search_results = gr.Dataframe(headers=["ID", "Timestamp", "Job Title", "Company Name", "State", "Match"], datatype=["number", "str", "str", "str", "str", "markdown"], label="Search Results", interactive=False)
+            with gr.Row():
+                filter_state = gr.Dropdown(choices=["all"] + SUBMISSION_STATES, value="all", label="Filter by State")
+                filter_company = gr.Textbox(lines=1, placeholder="Company name starts with...", label="Filter by Company")
+                sort_by = gr.Dropdown(choices=list(SUBMISSION_SORT_COLUMNS), value="Newest", label="Sort")
+                page_size = gr.Dropdown(choices=[10, 25, 50, 100], value=SUBMISSIONS_PAGE_SIZE, label="Page Size")
+            submissions_table = gr.Dataframe(headers=["ID", "Timestamp", "Job Title", "Company Name", "Job URL", "State", "Reviewer Notes"], datatype=["number", "str", "str", "str", "str", "str", "str"], label="Submissions", interactive=False)
+            with gr.Row():
+                prev_page_btn = gr.Button("< Previous Page")
+                page_number = gr.Number(value=1, precision=0, label="Page")
+                next_page_btn = gr.Button("Next Page >")
+            page_info = gr.Markdown("")
+            refresh_btn = gr.Button("Refresh Submissions List")
+            # State and notes editing controls
+            edit_id = gr.Number(label="Submission ID to Edit")
+            new_state = gr.Dropdown(choices=SUBMISSION_STATES, label="Set State")
+            reviewer_notes = gr.Textbox(lines=2, label="Reviewer Notes")
+            update_btn = gr.Button("Update State/Notes")
+            # Submission detail/review section
+            detail_id = gr.Number(label="Submission ID to Review")
+            load_detail_btn = gr.Button("Load Submission Details")
+            detail_job_desc = gr.Textbox(label="Job Description", interactive=False)
+            detail_company_details = gr.Textbox(label="Company Details", interactive=False)
+            detail_job_url = gr.Textbox(label="Job URL", interactive=False)
+            detail_company_name = gr.Textbox(label="Company Name", interactive=False)
+            detail_job_title = gr.Textbox(label="Job Title", interactive=False)
+            detail_mode = gr.Textbox(label="Mode", interactive=False)
+            detail_tone = gr.Textbox(label="Tone", interactive=False)
+            detail_emphasis = gr.Textbox(label="Emphasis", interactive=False)
+            detail_resume = gr.Textbox(label="Tailored Resume/CV (view)", interactive=False)
+            detail_cover = gr.Textbox(label="Cover Letter (view)", interactive=False)
+            # Facts/tweaks display and edit
+            gr.Markdown("#### Current Facts & Tweaks (edit in Facts & Tweaks tab)")
+            facts_display = gr.Textbox(label="Facts", value="", interactive=False)
+            tweaks_display = gr.Textbox(label="Tweaks", value="", interactive=False)
+            # Regenerate button
+            regen_fresh = gr.Checkbox(value=False, label="Fresh sample (bypass response cache)")
+            regen_force = gr.Checkbox(value=False, label="Force full regen (ignore which facts/tweaks changed)")
+            regen_btn = gr.Button("Regenerate Resume/CV & Cover Letter with Current Facts/Tweaks")
+            regen_warn = gr.Textbox(label="Warnings or Errors (regen)")
+            # Bulk regeneration (background job; survives restarts)
+            gr.Markdown("#### Regenerate Many Submissions")
+            with gr.Row():
+                bulk_state = gr.Dropdown(choices=["all"] + SUBMISSION_STATES, value="pending", label="Submissions in State")
+                bulk_force = gr.Checkbox(value=False, label="Force full regen")
+                bulk_fresh = gr.Checkbox(value=False, label="Fresh sample (bypass response cache)")
+            with gr.Row():
+                bulk_btn = gr.Button("Regenerate All Matching Submissions")
+                bulk_job_id = gr.Number(value=None, precision=0, label="Bulk Job ID")
+                bulk_watch_btn = gr.Button("Show Progress")
+                bulk_cancel_btn = gr.Button("Cancel Bulk Job")
+            bulk_progress = gr.Textbox(lines=4, label="Bulk Regeneration Progress", interactive=False)
+            search_btn.click(search_submissions, inputs=search_box, outputs=search_results)
+            search_box.submit(search_submissions, inputs=search_box, outputs=search_results)
+            list_inputs = [page_number, page_size, filter_state, filter_company, sort_by]
+            list_outputs = [submissions_table, page_number, page_info]
+            refresh_btn.click(fetch_submissions, inputs=list_inputs, outputs=list_outputs)
+            prev_page_btn.click(lambda page, *rest: fetch_submissions(max(1, (page or 1) - 1), *rest), inputs=list_inputs, outputs=list_outputs)
+            next_page_btn.click(lambda page, *rest: fetch_submissions((page or 1) + 1, *rest), inputs=list_inputs, outputs=list_outputs)
+            for control in (filter_state, page_size, sort_by):
+                control.change(lambda _page, *rest: fetch_submissions(1, *rest), inputs=list_inputs, outputs=list_outputs)
+            filter_company.submit(lambda _page, *rest: fetch_submissions(1, *rest), inputs=list_inputs, outputs=list_outputs)
+            update_btn.click(update_submission_state_and_notes, inputs=[edit_id, new_state, reviewer_notes] + list_inputs, outputs=list_outputs)
+            load_detail_btn.click(load_submission_detail, inputs=detail_id, outputs=[detail_job_desc, detail_company_details, detail_job_url, detail_company_name, detail_job_title, detail_mode, detail_tone, detail_emphasis, detail_resume, detail_cover, facts_display, tweaks_display, regen_warn])
+            regen_btn.click(queued_regen, inputs=[detail_id, regen_fresh, regen_force], outputs=[detail_resume, detail_cover, regen_warn])
+            bulk_btn.click(start_bulk_regen, inputs=[bulk_state, bulk_force, bulk_fresh], outputs=[bulk_job_id, bulk_progress])
+            bulk_watch_btn.click(watch_bulk_regen, inputs=bulk_job_id, outputs=[bulk_job_id, bulk_progress])
+            bulk_cancel_btn.click(cancel_bulk_regen, inputs=bulk_job_id, outputs=bulk_progress)
+        # Tables are filled on page load rather than while the UI is built
+        demo.load(facts_tweaks_advanced_ui, outputs=[facts_list, tweaks_list])
+        demo.load(fetch_submissions, outputs=list_outputs)
+    return demo
+
+_demo = None
+
+def get_demo():
+    global _demo
+    if _demo is None:
+        _demo = build_ui()
+        # The UI only enqueues; these threads (plus any `worker` processes) run the jobs
+        job_queue.start_workers(JOB_HANDLERS, job_queue.JOB_INLINE_WORKERS)
+    return _demo
+
+def __getattr__(name):
+    # `tailored_resume_bot.demo` (gradio reload mode, notebooks) builds the UI on first access
+    if name == "demo":
+        return get_demo()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def read_input(path):
+    if path == '-':
+        return sys.stdin.read()
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+def batch_cli(args):
+    jobs = load_jobs_jsonl(read_input(args.jsonl).splitlines(), defaults={'mode': args.mode, 'tone': args.tone, 'emphasis': args.emphasis, 'pdf_file': args.pdf, 'extractor': args.extractor})
+    seen = {}
+    statuses = []
+    for statuses in generate_batch(jobs, max_workers=args.workers, out_dir=args.out):
+        for s in statuses:
+            if seen.get(s['id']) != s['status']:
+                seen[s['id']] = s['status']
+                print(f"[BATCH] {s['id']}: {s['status']} ({s['elapsed']:.1f}s) {s['message']}".rstrip(), file=sys.stderr)
+    failed = [s for s in statuses if s['status'] != 'done']
+    print(f"[BATCH] {len(statuses) - len(failed)}/{len(statuses)} jobs completed.", file=sys.stderr)
+    return 1 if failed else 0
+
+def generate_cli(args):
+    out = sys.stdout
+    printed = {"resume": "", "cover": ""}
+
+    def stream(resume, cover):
+        # Write only what is new since the last update; the cover letter follows the resume
+        for key, text, header in (("resume", resume, None), ("cover", cover, "\n\n===== COVER LETTER =====\n\n")):
+            if text.startswith(printed[key]) and len(text) > len(printed[key]):
+                if header and not printed[key]:
+                    out.write(header)
+                out.write(text[len(printed[key]):])
+                printed[key] = text
+        out.flush()
+
+    # stdout carries only the generated text; diagnostics go to stderr
+    with contextlib.redirect_stdout(sys.stderr):
+        result = generate(read_input(args.job), company_details=args.company_details, pdf_file=args.pdf, tone=args.tone, emphasis=args.emphasis,
+                          mode=args.mode, company_name=args.company_name, job_title=args.job_title, job_url=args.job_url,
+                          bypass_cache=args.fresh, on_progress=None if args.json or args.quiet else stream, extractor=args.extractor)
+    if args.out and result["resume"]:
+        for path in write_outputs(args.out, args.name, result["resume"], result["cover_letter"]):
+            print(f"[INFO] Wrote {path}", file=sys.stderr)
+    if args.json:
+        print(json.dumps(result), file=out)
+    elif not args.quiet:
+        print(file=out)
+    for line in (result["note"], result["message"]):
+        if line:
+            print(line, file=sys.stderr)
+    return 1 if result["message"] else 0
+
+def regen_cli(args):
+    if args.state:
+        bulk_regen.workers = args.workers
+        # Work the bulk job queue from this process too (a running UI or `worker` may take the job instead)
+        worker, = job_queue.start_workers({"bulk_regen": bulk_regen.run}, 1)
+        last = None
+        try:
+            for job_id, text in start_bulk_regen(args.state, args.force, args.fresh):
+                if text != last:
+                    print(text, file=sys.stderr)
+                    last = text
+        finally:
+            worker.stop()
+        return 1 if bulk_regen.progress(job_id)["failed"] else 0
+    failed = 0
+    for sub_id in args.ids:
+        result = regenerate(sub_id, bypass_cache=args.fresh, force=args.force)
+        print(f"[REGEN] {sub_id}: {result['message']}", file=sys.stderr)
+        failed += result["status"] == "failed"
+        if args.out and result["resume"]:
+            write_outputs(args.out, sub_id, result["resume"], result["cover_letter"])
+    return 1 if failed else 0
+
+def worker_cli(args):
+    start_metrics_server(args.metrics_port)
+    return job_queue.serve({kind: JOB_HANDLERS[kind] for kind in args.kinds}, args.threads)
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    # Resolve available models once at startup; the registry refreshes itself in the background
+    get_registry("openai")
+    if IN_COLAB or not argv:
+        start_metrics_server()
+        get_demo().launch(share=True, debug=True, server_name='0.0.0.0', allowed_paths=[artifacts.ARTIFACT_DIR])
+        return 0
+    parser = argparse.ArgumentParser(description="ATS-optimized resume & cover letter tailoring bot")
+    sub = parser.add_subparsers(dest='command', required=True)
+    style = argparse.ArgumentParser(add_help=False)
+    style.add_argument('--mode', choices=['Resume', 'CV'], default='Resume')
+    style.add_argument('--tone', choices=['Formal', 'Friendly', 'Conversational'], default='Formal')
+    style.add_argument('--emphasis', default='')
+    style.add_argument('--pdf', default=None, help='Resume/CV PDF or DOCX (defaults to resume.pdf/cv.pdf)')
+    style.add_argument('--extractor', choices=PDF_EXTRACTORS, help='PDF text extraction engine (default PDF_EXTRACTOR or pypdf2)')
+    gen_parser = sub.add_parser('generate', parents=[style], help='Generate one application, streaming it to stdout')
+    gen_parser.add_argument('job', nargs='?', default='-', help="File with the job description ('-' or omitted for stdin)")
+    gen_parser.add_argument('--company-name', default='')
+    gen_parser.add_argument('--job-title', default='')
+    gen_parser.add_argument('--job-url', default='')
+    gen_parser.add_argument('--company-details', default='Direct to company')
+    gen_parser.add_argument('--out', help='Directory to write <name>_resume.txt and <name>_cover_letter.txt into')
+    gen_parser.add_argument('--name', default='application', help='File name prefix for --out')
+    gen_parser.add_argument('--json', action='store_true', help='Print the final result as one JSON object instead of streaming text')
+    gen_parser.add_argument('--quiet', action='store_true', help="Don't stream the outputs to stdout")
+    gen_parser.add_argument('--fresh', action='store_true', help='Bypass the LLM response cache')
+    regen_parser = sub.add_parser('regen', help='Regenerate stored submissions with the current facts/tweaks')
+    regen_parser.add_argument('ids', nargs='*', type=int, help='Submission ids')
+    regen_parser.add_argument('--state', choices=SUBMISSION_STATES, help='Regenerate every submission in this state as a bulk job')
+    regen_parser.add_argument('--workers', type=int, default=BULK_REGEN_WORKERS)
+    regen_parser.add_argument('--force', action='store_true', help='Regenerate both outputs even if no facts/tweaks changed')
+    regen_parser.add_argument('--fresh', action='store_true', help='Bypass the LLM response cache')
+    regen_parser.add_argument('--out', help='Directory to write regenerated outputs into')
+    batch_parser = sub.add_parser('batch', parents=[style], help='Generate applications for every job posting in a JSONL file')
+    batch_parser.add_argument('jsonl', help="JSONL file with one job posting per line ('-' for stdin)")
+    batch_parser.add_argument('--workers', type=int, default=BATCH_WORKERS, help='Number of concurrent jobs')
+    batch_parser.add_argument('--out', help='Directory to write each job\'s resume and cover letter into')
+    worker_parser = sub.add_parser('worker', help='Run queued generation jobs for the web UI (any number of these can run)')
+    worker_parser.add_argument('--threads', type=int, default=2, help='Jobs this process runs at once')
+    worker_parser.add_argument('--kinds', nargs='+', choices=list(JOB_HANDLERS), default=list(JOB_HANDLERS), help='Job kinds to take')
+    worker_parser.add_argument('--metrics-port', type=int, default=METRICS_PORT, help='Port for /metrics; give each worker on a box its own (0 disables)')
+    args = parser.parse_args(argv)
+    if args.command == 'regen' and not (args.ids or args.state):
+        parser.error('regen needs submission ids or --state')
+    return {'generate': generate_cli, 'regen': regen_cli, 'batch': batch_cli, 'worker': worker_cli}[args.command](args)
+
+if __name__ == '__main__':
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,261 @@
+"""
+Structured spans, Prometheus metrics and JSON logs for the generation path.
+
+    with span('pdf_extract', engine='pypdf2') as s:
+        ...
+        s.set(pages=3)
+
+Every finished span is written as one JSON line (TELEMETRY_LOG: unset for
+stderr, a file path, or "off") and recorded in the resume_bot_span_seconds
+histogram by name and status. LLM calls use llm_span(), which also records
+time to first token and prompt/completion tokens per backend and model,
+including how many prompt tokens the backend served from its prefix cache.
+Spans nest through contextvars: a span opened while another is active
+becomes its child and shares its trace id, so all the lines of one
+generation can be grouped. Pipeline stages inherit the span that was
+active when the pipeline was created.
+
+start_metrics_server() serves the metrics in the Prometheus text format on
+http://METRICS_HOST:METRICS_PORT/metrics (127.0.0.1:9464 by default).
+"""
+
+import contextlib
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TELEMETRY_LOG = os.environ.get('TELEMETRY_LOG', '')
+# Include full prompt text in LLM span logs (off by default: prompts hold the whole resume)
+LOG_PROMPTS = os.environ.get('LOG_PROMPTS', '0') == '1'
+METRICS_HOST = os.environ.get('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.environ.get('METRICS_PORT', 9464))
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_current = contextvars.ContextVar('telemetry_span', default=None)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for v in labels.values())
+    return '{' + ','.join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + '}'
+
+
+class Counter:
+    def __init__(self, name, help_text, label_names):
+        self.name, self.help, self.label_names = name, help_text, label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(n, '')) for n in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(dict(zip(self.label_names, key)))} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, label_names, buckets=DURATION_BUCKETS):
+        self.name, self.help, self.label_names, self.buckets = name, help_text, label_names, buckets
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(n, '')) for n in self.label_names)
+        with self._lock:
+            # [per-bucket counts (cumulative), sum, count]
+            entry = self._values.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._values.items()):
+                labels = dict(zip(self.label_names, key))
+                for bound, bucket_count in zip(self.buckets, counts):
+                    lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': bound})} {bucket_count}")
+                lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(labels)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+SPAN_SECONDS = Histogram('resume_bot_span_seconds', 'Duration of instrumented stages.', ('span', 'status'))
+LLM_TTFT_SECONDS = Histogram('resume_bot_llm_time_to_first_token_seconds', 'Time from sending an LLM request to its first content chunk.', ('backend', 'model'))
+LLM_REQUESTS = Counter('resume_bot_llm_requests_total', 'LLM requests by outcome; cached ones were answered by llm_cache.', ('backend', 'model', 'status', 'cached'))
+LLM_TOKENS = Counter('resume_bot_llm_tokens_total', 'Prompt and completion tokens sent to and received from LLM backends (cache hits excluded); cached_prompt counts prompt tokens the backend reused from its prefix cache.', ('backend', 'model', 'kind'))
+METRICS = [SPAN_SECONDS, LLM_TTFT_SECONDS, LLM_REQUESTS, LLM_TOKENS]
+
+
+def render_metrics():
+    return '\n'.join(line for metric in METRICS for line in metric.render()) + '\n'
+
+
+_log_lock = threading.Lock()
+_log_file = None
+
+
+def log_event(event, **fields):
+    """Write one JSON log line."""
+    global _log_file
+    if TELEMETRY_LOG == 'off':
+        return
+    record = {"ts": round(time.time(), 3), "event": event, **fields}
+    line = json.dumps(record, default=str)
+    with _log_lock:
+        if TELEMETRY_LOG:
+            if _log_file is None:
+                _log_file = open(TELEMETRY_LOG, 'a', encoding='utf-8')
+            _log_file.write(line + '\n')
+            _log_file.flush()
+        else:
+            print(line, file=sys.stderr, flush=True)
+
+
+class Span:
+    def __init__(self, name, parent=None, **attrs):
+        parent = parent if parent is not None else _current.get()
+        self.name = name
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex[:16]
+        self.span_id = uuid.uuid4().hex[:8]
+        self.parent_id = parent.span_id if parent else None
+        self.attrs = attrs
+        self.status = 'ok'
+        self.start = time.perf_counter()
+        self.duration = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+        return self
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def fail(self, error):
+        self.status = 'error'
+        self.attrs['error'] = f"{type(error).__name__}: {error}"
+
+    def end(self, status=None):
+        if self.duration is not None:
+            return
+        self.duration = self.elapsed()
+        if status:
+            self.status = status
+        SPAN_SECONDS.observe(self.duration, span=self.name, status=self.status)
+        log_event('span', name=self.name, trace_id=self.trace_id, span_id=self.span_id, parent_id=self.parent_id,
+                  duration_ms=round(self.duration * 1000, 2), status=self.status, **self.attrs)
+
+
+class LLMSpan(Span):
+    def first_token(self):
+        if 'ttft_ms' not in self.attrs:
+            self.attrs['ttft_ms'] = round(self.elapsed() * 1000, 2)
+
+    def end(self, status=None):
+        if self.duration is not None:
+            return
+        super().end(status)
+        backend, model, cached = self.attrs.get('backend'), self.attrs.get('model'), bool(self.attrs.get('cached'))
+        LLM_REQUESTS.inc(backend=backend, model=model, status=self.status, cached=str(cached).lower())
+        if cached:
+            return
+        if 'ttft_ms' in self.attrs:
+            LLM_TTFT_SECONDS.observe(self.attrs['ttft_ms'] / 1000, backend=backend, model=model)
+        for kind in ('prompt', 'completion', 'cached_prompt'):
+            if self.attrs.get(f'{kind}_tokens'):
+                LLM_TOKENS.inc(self.attrs[f'{kind}_tokens'], backend=backend, model=model, kind=kind)
+
+
+@contextlib.contextmanager
+def activate(s):
+    """Make `s` the parent of spans opened in this block (and of pipelines created in it)."""
+    token = _current.set(s)
+    try:
+        yield s
+    finally:
+        _current.reset(token)
+
+
+@contextlib.contextmanager
+def recording(s):
+    """End `s` when the block exits, marking errors and cancellation, without making it current.
+    Safe around yields, unlike span()."""
+    try:
+        yield s
+    except GeneratorExit:
+        s.end('cancelled')
+        raise
+    except BaseException as e:
+        s.fail(e)
+        raise
+    finally:
+        s.end()
+
+
+@contextlib.contextmanager
+def span(name, parent=None, **attrs):
+    s = Span(name, parent, **attrs)
+    with recording(s), activate(s):
+        yield s
+
+
+def start_span(name, parent=None, **attrs):
+    # For spans that outlive a block (e.g. around a generator's lifetime); end with recording() or .end()
+    return Span(name, parent, **attrs)
+
+
+def llm_span(backend, model, messages, prompt_tokens, **attrs):
+    if LOG_PROMPTS:
+        attrs['prompt'] = messages[-1]['content'] if messages else ''
+    return LLMSpan('llm', backend=backend, model=model, prompt_tokens=prompt_tokens, **attrs)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = render_metrics().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port=METRICS_PORT, host=METRICS_HOST):
+    """Serve /metrics from a daemon thread; returns the server, or None if disabled (port 0) or the port is taken."""
+    global _server
+    with _server_lock:
+        if _server is None and port:
+            try:
+                _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError as e:
+                print(f"[WARN] Metrics endpoint not started on {host}:{port}: {e}")
+                return None
+            threading.Thread(target=_server.serve_forever, name='metrics', daemon=True).start()
+            print(f"[INFO] Metrics at http://{host}:{port}/metrics")
+        return _server
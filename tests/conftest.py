@@ -0,0 +1,15 @@
+import os
+import tempfile
+
+# Modules read their database paths at import time, so point every one of them at a scratch
+# directory before any test imports them
+_scratch = tempfile.mkdtemp(prefix='tailored-resume-bot-tests-')
+os.environ.update({
+    'FACTS_DB_PATH': os.path.join(_scratch, 'facts_tweaks.db'),
+    'PDF_CACHE_PATH': os.path.join(_scratch, 'pdf_cache.db'),
+    'LLM_CACHE_PATH': os.path.join(_scratch, 'llm_cache.db'),
+    'MODEL_REGISTRY_CACHE': os.path.join(_scratch, 'model_registry.json'),
+    'ARTIFACT_DIR': os.path.join(_scratch, 'artifacts'),
+    'JOB_UPLOAD_DIR': os.path.join(_scratch, 'job_uploads'),
+    'TELEMETRY_LOG': 'off',
+})
@@ -0,0 +1,56 @@
+import os
+import time
+
+import pytest
+
+import artifacts
+
+RESUME = "JANE DOE\n\nEXPERIENCE\n- Built (fast) pipelines\nWrote Python every day.\n"
+
+
+def test_same_text_is_stored_once_per_format(tmp_path):
+    path = artifacts.render(RESUME, 'tailored_resume', 'txt', root=str(tmp_path))
+    assert artifacts.render(RESUME, 'tailored_resume', 'txt', root=str(tmp_path)) == path
+    assert open(path, encoding='utf-8').read() == RESUME
+    other = artifacts.render(RESUME + "More.", 'tailored_resume', 'txt', root=str(tmp_path))
+    assert os.path.dirname(other) != os.path.dirname(path)
+    assert os.path.dirname(artifacts.render(RESUME, 'tailored_resume', 'md', root=str(tmp_path))) == os.path.dirname(path)
+
+
+def test_markdown_marks_headings_and_bullets():
+    assert artifacts.render_md(RESUME).decode() == "## Jane Doe\n\n## Experience\n- Built (fast) pipelines\nWrote Python every day."
+
+
+def test_pdf_is_well_formed():
+    pdf = artifacts.render_pdf(RESUME * 40)
+    assert pdf.startswith(b'%PDF-1.4') and pdf.rstrip().endswith(b'%%EOF')
+    assert b'/Count 5' in pdf  # 7 lines per copy, 57 lines per page
+    assert b'Built \\(fast\\) pipelines' in pdf
+    xref = int(pdf.rsplit(b'startxref\n', 1)[1].split()[0])
+    assert pdf[xref:xref + 4] == b'xref'
+
+
+def test_docx_round_trips_when_available():
+    docx = pytest.importorskip('docx')
+    import io
+    document = docx.Document(io.BytesIO(artifacts.render_docx(RESUME)))
+    assert [(p.style.name, p.text) for p in document.paragraphs][:2] == [('Heading 2', 'Jane Doe'), ('Heading 2', 'Experience')]
+
+
+def test_unknown_format_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match='Unknown artifact format'):
+        artifacts.render(RESUME, 'tailored_resume', 'rtf', root=str(tmp_path))
+
+
+def test_garbage_collection_by_age_then_size(tmp_path):
+    root = str(tmp_path)
+    old = artifacts.render('old', 'a', root=root)
+    middle = artifacts.render('middle' * 100, 'a', root=root)
+    new = artifacts.render('new' * 100, 'a', root=root)
+    now = time.time()
+    os.utime(old, (now - 10 * 86400, now - 10 * 86400))
+    os.utime(middle, (now - 60, now - 60))
+    assert artifacts.collect_garbage(root, max_bytes=10_000, max_age_days=7) == 1
+    assert not os.path.exists(old) and not os.path.exists(os.path.dirname(old))
+    assert artifacts.collect_garbage(root, max_bytes=400, max_age_days=7) == 1
+    assert not os.path.exists(middle) and os.path.exists(new)
@@ -0,0 +1,73 @@
+import threading
+import time
+
+from batch import BackendLimiter, load_jobs_jsonl, run_batch
+
+
+def peak_concurrency(limiter, backend, callers=8):
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def call():
+        with limiter.slot(backend):
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.05)
+            with lock:
+                active[0] -= 1
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return peak[0]
+
+
+def test_in_flight_calls_are_bounded_per_backend(monkeypatch):
+    monkeypatch.delenv('LLM_CONCURRENCY_OPENAI', raising=False)
+    monkeypatch.delenv('LLM_CONCURRENCY_LMSTUDIO', raising=False)
+    limiter = BackendLimiter(limits={'openai': 3})
+    assert peak_concurrency(limiter, 'openai') == 3
+    assert peak_concurrency(limiter, 'lmstudio') == 1
+    assert peak_concurrency(limiter, 'some-other-backend') == 4
+
+
+def test_environment_sets_limits_and_explicit_limits_win(monkeypatch):
+    monkeypatch.setenv('LLM_CONCURRENCY_OPENAI', '2')
+    monkeypatch.setenv('LLM_CONCURRENCY_LMSTUDIO', '2')
+    limiter = BackendLimiter(limits={'lmstudio': 5})
+    assert peak_concurrency(limiter, 'openai') == 2
+    assert peak_concurrency(limiter, 'lmstudio') == 5
+
+
+def test_slot_is_released_when_the_call_fails():
+    limiter = BackendLimiter(limits={'openai': 1})
+    for _ in range(2):
+        try:
+            with limiter.slot('openai'):
+                raise RuntimeError('HTTP 500')
+        except RuntimeError:
+            pass
+    assert peak_concurrency(limiter, 'openai', callers=2) == 1
+
+
+def test_jsonl_accepts_full_and_short_job_shapes():
+    jobs = load_jobs_jsonl(['{"job_description": "Build APIs", "company_name": "Acme", "job_title": "Engineer"}', '',
+                            '{"request_id": "r-7", "title": "Analyst", "body": "Crunch numbers"}'], defaults={'tone': 'Casual'})
+    assert [(job['id'], job['job_title'], job['job_description'], job['tone']) for job in jobs] == [
+        ('1', 'Engineer', 'Build APIs', 'Casual'), ('r-7', 'Analyst', 'Crunch numbers', 'Casual')]
+    assert jobs[0]['company_name'] == 'Acme' and jobs[1]['mode'] == 'Resume'
+
+
+def test_run_batch_reports_every_job_to_completion():
+    def run_job(job, report):
+        report('running', 'halfway')
+        if job['job_title'] == 'bad':
+            raise ValueError('no description')
+        return 'done', f"tailored for {job['job_title']}"
+
+    jobs = load_jobs_jsonl(['{"title": "good", "body": "x"}', '{"title": "bad", "body": "y"}'])
+    snapshots = list(run_batch(jobs, run_job, max_workers=2))
+    assert [s['status'] for s in snapshots[0]] == ['queued', 'queued']
+    assert [(s['status'], s['message']) for s in snapshots[-1]] == [('done', 'tailored for good'), ('error', 'no description')]
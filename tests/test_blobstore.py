@@ -0,0 +1,75 @@
+import hashlib
+import uuid
+
+import pytest
+
+import blobstore
+import datastore as db
+
+
+def unique_text():
+    return f"Tailored resume {uuid.uuid4().hex}\n" * 20
+
+
+@pytest.fixture(scope='module', autouse=True)
+def blobs_table():
+    with db.connection() as conn:
+        blobstore.init_blobs(conn)
+
+
+def test_identical_texts_are_stored_once():
+    text = unique_text()
+    with db.connection() as conn:
+        digest = blobstore.put_text(conn, text)
+        assert blobstore.put_text(conn, text) == digest
+        assert blobstore.put_text(conn, None) is None
+    assert db.query_one('SELECT COUNT(*) FROM blobs WHERE hash = ?', (digest,))[0] == 1
+    size, stored = db.query_one('SELECT size, length(data) FROM blobs WHERE hash = ?', (digest,))
+    assert size == len(text.encode('utf-8')) and stored < size
+
+
+@pytest.mark.parametrize('codec', ['zlib', pytest.param('zstd', marks=pytest.mark.skipif(
+    blobstore.zstandard is None, reason='zstandard is not installed'))])
+def test_round_trip(codec):
+    text = unique_text() + 'café ✓'
+    with db.connection() as conn:
+        digest = blobstore.put_text(conn, text, codec=codec)
+    assert blobstore.get_text(digest) == text
+    assert blobstore.get_text(None) is None
+
+
+def test_unknown_digest_reads_as_none():
+    assert blobstore.get_text('0' * 64) is None
+
+
+def test_garbage_collection_keeps_referenced_blobs(tmp_path):
+    path = str(tmp_path / 'gc.db')
+    with db.connection(path) as conn:
+        blobstore.init_blobs(conn)
+        conn.execute('CREATE TABLE docs (body_hash TEXT)')
+        kept = blobstore.put_text(conn, 'kept')
+        blobstore.put_text(conn, 'orphan')
+        conn.execute('INSERT INTO docs (body_hash) VALUES (?), (NULL)', (kept,))
+        assert blobstore.collect_garbage(conn, [('docs', 'body_hash')]) == 1
+        assert conn.execute('SELECT hash FROM blobs').fetchall() == [(kept,)]
+
+
+def test_a_miss_is_not_cached():
+    text = unique_text()
+    digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    assert blobstore.get_text(digest) is None
+    with db.connection() as conn:
+        blobstore.put_text(conn, text)
+    assert blobstore.get_text(digest) == text
+
+
+def test_garbage_collection_runs_at_most_once_per_interval(tmp_path):
+    path = str(tmp_path / 'gc.db')
+    with db.connection(path) as conn:
+        blobstore.init_blobs(conn)
+        conn.execute('CREATE TABLE docs (body_hash TEXT)')
+        blobstore.put_text(conn, 'orphan')
+        assert blobstore.maybe_collect_garbage(conn, [('docs', 'body_hash')], interval=3600) == 1
+        blobstore.put_text(conn, 'another orphan')
+        assert blobstore.maybe_collect_garbage(conn, [('docs', 'body_hash')], interval=3600) is None
+        assert blobstore.maybe_collect_garbage(conn, [('docs', 'body_hash')], interval=0) == 1
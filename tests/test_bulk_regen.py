@@ -0,0 +1,84 @@
+import threading
+import time
+
+import pytest
+
+import datastore
+import job_queue
+from bulk_regen import BulkRegenManager, init_bulk_tables
+
+
+@pytest.fixture(autouse=True)
+def fresh_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(datastore, 'DB_PATH', str(tmp_path / 'bulk.db'))
+    monkeypatch.setattr(job_queue, '_schema_ready', False)
+    with datastore.connection() as conn:
+        init_bulk_tables(conn)
+        conn.execute('CREATE TABLE submissions (id INTEGER PRIMARY KEY, state TEXT)')
+        conn.executemany('INSERT INTO submissions (id, state) VALUES (?, ?)', [(1, 'pending'), (2, 'pending'), (3, 'applied')])
+
+
+def worker(manager, worker_id='w1'):
+    return job_queue.JobWorker({'bulk_regen': manager.run}, worker_id=worker_id, poll_interval=0.01)
+
+
+def item_statuses(job_id):
+    return dict(datastore.query('SELECT submission_id, status FROM bulk_regen_items WHERE job_id = ?', (job_id,)))
+
+
+def test_a_bulk_job_is_queued_and_run_by_one_worker():
+    calls = []
+    manager = BulkRegenManager(lambda sub_id, bypass_cache, force: calls.append(sub_id) or ('done', 'ok'), workers=2)
+    job_id = manager.start('pending')
+    assert manager.is_running(job_id) and manager.progress(job_id)['status'] == 'running'
+    assert worker(manager).run_once()
+    # The queue job is taken, so a second worker finds nothing to do
+    assert not worker(manager, 'w2').run_once()
+    assert sorted(calls) == [1, 2]
+    progress = manager.progress(job_id)
+    assert (progress['status'], progress['total'], progress['done']) == ('done', 2, 2)
+    assert not manager.is_running(job_id)
+
+
+def test_a_job_whose_worker_died_is_resumed_by_the_next_one():
+    manager = BulkRegenManager(lambda sub_id, bypass_cache, force: ('done', 'ok'))
+    job_id = manager.start()
+    # A worker claimed it, finished one item and died in the middle of another
+    job_queue.claim('dead-worker', ['bulk_regen'], lease_seconds=60)
+    datastore.execute("UPDATE bulk_regen_items SET status = 'done' WHERE job_id = ? AND submission_id = 1", (job_id,))
+    datastore.execute("UPDATE bulk_regen_items SET status = 'running' WHERE job_id = ? AND submission_id = 2", (job_id,))
+    assert not worker(manager).run_once()
+    job_queue.requeue_expired(now=time.time() + 61)
+    assert worker(manager).run_once()
+    assert item_statuses(job_id) == {1: 'done', 2: 'done', 3: 'done'}
+    assert manager.progress(job_id)['status'] == 'done'
+
+
+def test_cancel_reaches_the_worker_running_the_job():
+    started = threading.Event()
+    release = threading.Event()
+
+    def regen_item(sub_id, bypass_cache, force):
+        started.set()
+        release.wait(5)
+        return 'done', 'ok'
+
+    manager = BulkRegenManager(regen_item, workers=1)
+    job_id = manager.start()
+    runner = threading.Thread(target=worker(manager).run_once)
+    runner.start()
+    assert started.wait(5)
+    manager.cancel(job_id)
+    release.set()
+    runner.join(5)
+    assert not runner.is_alive()
+    assert manager.progress(job_id)['status'] == 'cancelled'
+    assert list(item_statuses(job_id).values()).count('pending') == 2
+
+
+def test_a_job_that_failed_on_the_queue_is_reported_failed():
+    manager = BulkRegenManager(lambda sub_id, bypass_cache, force: ('done', 'ok'))
+    job_id = manager.start()
+    job_queue.claim('w1', ['bulk_regen'])
+    job_queue.fail(datastore.query_one('SELECT queue_job_id FROM bulk_regen_jobs WHERE id = ?', (job_id,))[0], 'w1', 'boom')
+    assert manager.progress(job_id)['status'] == 'failed'
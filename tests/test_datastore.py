@@ -0,0 +1,100 @@
+import sqlite3
+import threading
+
+import pytest
+
+import datastore
+from datastore import ConnectionPool
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(str(tmp_path / 'pool.db'), size=2)
+    with pool.connection() as conn:
+        conn.execute('CREATE TABLE items (id INTEGER PRIMARY KEY, worker INTEGER)')
+    yield pool
+    pool.close()
+
+
+def test_connections_run_in_wal_mode(pool):
+    with pool.connection() as conn:
+        assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        assert conn.execute('PRAGMA synchronous').fetchone()[0] == 1  # NORMAL
+
+
+def test_released_connections_are_reused(pool):
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        assert second is first
+    assert pool._created == 1
+
+
+def test_checkout_waits_for_a_free_connection_once_the_pool_is_full(pool):
+    held = [pool.acquire(), pool.acquire()]
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.acquire()))
+    waiter.start()
+    waiter.join(0.2)
+    assert waiter.is_alive() and pool._created == 2
+    pool.release(held[0])
+    waiter.join(5)
+    assert got == [held[0]]
+    pool.release(held[1])
+    pool.release(got[0])
+    stats = pool.stats()
+    assert (stats['acquires'], stats['waits'], stats['open'], stats['size']) == (4, 1, 2, 2)
+    assert stats['max_wait_seconds'] >= 0.2
+
+
+
+def test_checkout_gives_up_when_no_connection_comes_back(tmp_path):
+    pool = ConnectionPool(str(tmp_path / 'small.db'), size=1, acquire_timeout=0.1)
+    held = pool.acquire()
+    with pytest.raises(sqlite3.OperationalError, match='No free connection'):
+        pool.acquire()
+    assert pool.stats()['timeouts'] == 1
+    pool.release(held)
+    assert pool.acquire() is held
+    pool.release(held)
+    pool.close()
+
+def test_errors_roll_back_and_return_the_connection(pool):
+    with pytest.raises(sqlite3.IntegrityError):
+        with pool.connection() as conn:
+            conn.execute('INSERT INTO items (id, worker) VALUES (1, 0)')
+            conn.execute('INSERT INTO items (id, worker) VALUES (1, 0)')
+    with pool.connection() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM items').fetchone()[0] == 0
+    assert pool._idle.qsize() == pool._created
+
+
+def test_concurrent_writers_share_a_small_pool(pool):
+    errors = []
+
+    def write(worker):
+        try:
+            for _ in range(50):
+                with pool.connection() as conn:
+                    conn.execute('INSERT INTO items (worker) VALUES (?)', (worker,))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    with pool.connection() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM items').fetchone()[0] == 400
+    assert pool._created <= 2
+
+
+def test_helpers_use_one_pool_per_path(tmp_path):
+    path = str(tmp_path / 'helpers.db')
+    assert datastore.get_pool(path) is datastore.get_pool(path)
+    datastore.execute('CREATE TABLE notes (body TEXT)', path=path)
+    row_id = datastore.execute('INSERT INTO notes (body) VALUES (?)', ('hello',), path=path)
+    assert datastore.query_one('SELECT rowid, body FROM notes', path=path) == (row_id, 'hello')
+    assert datastore.query('SELECT body FROM notes', path=path) == [('hello',)]
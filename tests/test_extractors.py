@@ -0,0 +1,75 @@
+import io
+import zipfile
+
+import pytest
+
+import extractors
+from extractors import choose_extractor, detect_format, extract_text
+from pdfs import make_pdf
+
+
+def make_docx(paragraphs, table=()):
+    docx = pytest.importorskip('docx')
+    document = docx.Document()
+    for text in paragraphs:
+        document.add_paragraph(text)
+    if table:
+        grid = document.add_table(rows=len(table), cols=len(table[0]))
+        for row, values in zip(grid.rows, table):
+            for cell, value in zip(row.cells, values):
+                cell.text = value
+    out = io.BytesIO()
+    document.save(out)
+    return out.getvalue()
+
+
+def test_word_documents_are_recognised_by_content():
+    assert detect_format(make_docx(['Jane Doe'])) == 'docx'
+    assert detect_format(make_pdf(['Jane Doe'])) == 'pdf'
+    other_zip = io.BytesIO()
+    with zipfile.ZipFile(other_zip, 'w') as archive:
+        archive.writestr('data/sheet.xml', '<x/>')
+    assert detect_format(other_zip.getvalue()) == 'pdf'
+
+
+def test_engine_selection_and_fallbacks(monkeypatch):
+    pdf = make_pdf(['Jane Doe'])
+    monkeypatch.setattr(extractors, 'PDF_EXTRACTOR', 'pypdf2')
+    assert choose_extractor(pdf) == 'pypdf2'
+    assert choose_extractor(pdf, 'no-such-engine') == 'pypdf2'
+    monkeypatch.setitem(extractors.EXTRACTORS, 'pdfminer', (extractors.pdfminer_pages, 'module_that_is_not_installed', '1'))
+    assert choose_extractor(pdf, 'pdfminer') == 'pypdf2'
+    if extractors.is_available('pypdfium2'):
+        monkeypatch.setattr(extractors, 'PDF_EXTRACTOR', 'pypdfium2')
+        assert choose_extractor(pdf) == 'pypdfium2'
+    # A .docx is read as one whatever PDF engine was asked for
+    assert choose_extractor(make_docx(['Jane Doe']), 'pypdfium2') == 'docx'
+
+
+@pytest.mark.parametrize('engine', ['pypdf2', 'pdfminer', 'pypdfium2'])
+def test_pdf_engines_agree_on_plain_text(engine):
+    if not extractors.is_available(engine):
+        pytest.skip(f'{engine} is not installed')
+    pages = ['Jane Doe', 'Senior Engineer']
+    assert extract_text(make_pdf(pages), engine).split() == 'Jane Doe Senior Engineer'.split()
+
+
+def test_docx_text_keeps_tables_in_place():
+    data = make_docx(['Jane Doe', 'Skills'], table=[('Python', 'SQL'), ('Go', 'Rust')])
+    assert extract_text(data) == 'Jane Doe\nSkills\nPython | SQL\nGo | Rust\n'
+
+
+def test_broken_word_documents_are_reported_as_docx():
+    pytest.importorskip('docx')
+    broken = io.BytesIO()
+    with zipfile.ZipFile(broken, 'w') as archive:
+        archive.writestr('word/document.xml', 'not really xml')
+    with pytest.raises(extractors.PartialExtraction, match='^DOCX could not be read'):
+        extract_text(broken.getvalue())
+
+
+def test_word_documents_without_python_docx_say_what_is_missing(monkeypatch):
+    real = extractors.is_available
+    monkeypatch.setattr(extractors, 'is_available', lambda name: name != 'docx' and real(name))
+    with pytest.raises(extractors.PartialExtraction, match='needs python-docx'):
+        choose_extractor(make_docx(['Jane Doe']))
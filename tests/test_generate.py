@@ -0,0 +1,47 @@
+import tailored_resume_bot as bot
+
+
+class FakeLLM:
+    def __init__(self, metadata_reply):
+        self.metadata_reply = metadata_reply
+        self.prompts = []
+
+    def chat(self, messages, model, max_tokens, temperature, **kwargs):
+        return self.metadata_reply
+
+    def stream_chat(self, messages, model, **kwargs):
+        prompt = messages[-1]['content']
+        self.prompts.append(prompt)
+        yield 'Dear hiring team,' if 'Write a complete, ATS-friendly cover letter' in prompt else 'Jane Doe\nSenior Engineer'
+
+
+def run(monkeypatch, llm, **fields):
+    monkeypatch.setattr(bot, 'llm', llm)
+    monkeypatch.setattr(bot, 'resolve_model', lambda backend: 'gpt-4o')
+    monkeypatch.setattr(bot, 'resolve_small_model', lambda backend: 'gpt-4o-mini')
+    monkeypatch.setattr(bot, 'extract_text_with_warning', lambda pdf_file, extractor=None: ('Jane Doe\nPython, SQL', None))
+    return bot.generate('We build data pipelines.', pdf_file='resume.pdf', **fields)
+
+
+def test_a_posting_without_company_or_title_is_turned_away_before_generating(monkeypatch):
+    llm = FakeLLM('{"company_name": "", "job_title": ""}')
+    result = run(monkeypatch, llm)
+    assert result['message'].startswith('[Action Required]')
+    assert result['resume'] is None and llm.prompts == []
+
+
+def test_the_early_metadata_is_what_the_submission_is_filed_under(monkeypatch):
+    llm = FakeLLM('{"company_name": "Initech", "job_title": "Data Engineer"}')
+    result = run(monkeypatch, llm)
+    assert result['message'] is None
+    assert result['cover_letter'] == 'Dear hiring team,'
+    assert len(llm.prompts) == 2 and 'company_name' not in llm.prompts[1]
+    rows, _ = bot.list_submissions_page(company='Initech')
+    assert [(r[3], r[2]) for r in rows] == [('Initech', 'Data Engineer')]
+
+
+def test_entered_fields_need_no_model_call(monkeypatch):
+    llm = FakeLLM(None)
+    llm.chat = None
+    result = run(monkeypatch, llm, company_name='Globex', job_title='Platform Engineer')
+    assert result['message'] is None and len(llm.prompts) == 2
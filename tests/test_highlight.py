@@ -0,0 +1,27 @@
+from highlight import MARK_CLOSE, MARK_OPEN, PhraseMatcher, highlight_html, matcher_for
+
+
+def marked(text):
+    return f"{MARK_OPEN}{text}{MARK_CLOSE}"
+
+
+def test_find_prefers_leftmost_then_longest_without_overlaps():
+    matcher = PhraseMatcher(['data', 'data engineer', 'engineer', 'neer ma'])
+    assert matcher.find('senior data engineer manager') == [(7, 20)]
+    assert matcher.find('engineer manager') == [(0, 8)]
+
+
+def test_find_follows_failure_links():
+    matcher = PhraseMatcher(['abcd', 'bc', 'c'])
+    assert matcher.find('abcx abcd') == [(1, 3), (5, 9)]
+    assert PhraseMatcher(['', '']).find('anything') == []
+
+
+def test_highlight_only_touches_text_nodes():
+    markup = '<p title="Python">Python &amp; R&amp;D</p><!-- Python -->'
+    result = highlight_html(markup, matcher_for(['Python', 'R&D']))
+    assert result == f'<p title="Python">{marked("Python")} &amp; {marked("R&amp;D")}</p><!-- Python -->'
+
+
+def test_matchers_are_shared_per_phrase_set():
+    assert matcher_for(['a', 'b', '']) is matcher_for(['b', 'a'])
@@ -0,0 +1,36 @@
+from job_metadata import extract_metadata, extract_metadata_regex, parse_metadata_response
+
+
+def test_labelled_fields_and_hiring_phrases():
+    assert extract_metadata_regex('Company: Acme Corp.\nJob Title: Data Engineer\n\nWe build things.') == ('Acme Corp', 'Data Engineer')
+    assert extract_metadata_regex('Globex is hiring a Senior Platform Engineer to own our CI.') == ('Globex', 'Senior Platform Engineer')
+    assert extract_metadata_regex('About us:\nWe are a small team.') == (None, None)
+
+
+def test_explicit_values_win_and_the_model_only_fills_gaps():
+    prompts = []
+
+    def ask_model(prompt):
+        prompts.append(prompt)
+        return 'Sure: {"company_name": "Hooli", "job_title": "Ignored"}'
+
+    assert extract_metadata('Title: Staff SRE', ask_model=ask_model) == ('Hooli', 'Staff SRE')
+    assert 'Title: Staff SRE' in prompts[0]
+    assert extract_metadata('Title: Staff SRE', company_name='Pied Piper', ask_model=ask_model) == ('Pied Piper', 'Staff SRE')
+    assert len(prompts) == 1
+
+
+def test_model_failures_leave_fields_missing():
+    def broken(prompt):
+        raise TimeoutError('slow model')
+
+    assert extract_metadata('We build things.', ask_model=broken) == (None, None)
+    assert extract_metadata('We build things.', ask_model=lambda prompt: 'no idea') == (None, None)
+    assert parse_metadata_response('{"company_name": "", "job_title": "  "}') == (None, None)
+    assert parse_metadata_response('{not json}') == (None, None)
+
+
+def test_about_headings_in_any_case():
+    assert extract_metadata_regex('About Initech:\nWe make TPS reports.')[0] == 'Initech'
+    assert extract_metadata_regex('ABOUT Initech\nWe make TPS reports.')[0] == 'Initech'
+    assert extract_metadata_regex('about the role:\nYou will...')[0] is None
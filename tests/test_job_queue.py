@@ -0,0 +1,151 @@
+import os
+import time
+
+import pytest
+
+import datastore
+import job_queue
+
+
+@pytest.fixture(autouse=True)
+def fresh_queue(tmp_path, monkeypatch):
+    monkeypatch.setattr(datastore, 'DB_PATH', str(tmp_path / 'jobs.db'))
+    monkeypatch.setattr(job_queue, '_schema_ready', False)
+
+
+def worker(handlers, **kwargs):
+    return job_queue.JobWorker(handlers, worker_id='test-worker', poll_interval=0.01, **kwargs)
+
+
+def test_claim_takes_the_oldest_job_of_a_handled_kind_once():
+    other = job_queue.enqueue('other', {})
+    first = job_queue.enqueue('generate', {'n': 1})
+    job_queue.enqueue('generate', {'n': 2})
+    job = job_queue.claim('w1', ['generate'])
+    assert (job['id'], job['status'], job['attempts'], job['lease_owner'], job['payload']) == (first, 'running', 1, 'w1', {'n': 1})
+    assert job_queue.claim('w2', ['generate'])['payload'] == {'n': 2}
+    assert job_queue.claim('w3', ['generate']) is None
+    assert job_queue.get_job(other)['status'] == 'queued'
+
+
+def test_queue_position_counts_jobs_ahead():
+    ids = [job_queue.enqueue('generate', {}) for _ in range(3)]
+    assert [job_queue.queue_position(job_id) for job_id in ids] == [0, 1, 2]
+
+
+def test_expired_lease_is_requeued_until_max_attempts():
+    job_id = job_queue.enqueue('generate', {}, max_attempts=2)
+    job_queue.claim('w1', ['generate'], lease_seconds=60)
+    assert job_queue.requeue_expired() == 0
+    assert job_queue.requeue_expired(now=time.time() + 61) == 1
+    job = job_queue.claim('w2', ['generate'], lease_seconds=60)
+    assert (job['id'], job['attempts']) == (job_id, 2)
+    # The first worker lost its lease: its heartbeats and result are ignored
+    assert not job_queue.heartbeat(job_id, 'w1')
+    job_queue.complete(job_id, 'w1', 'stale')
+    assert job_queue.get_job(job_id)['status'] == 'running'
+    job_queue.requeue_expired(now=time.time() + 61)
+    job = job_queue.get_job(job_id)
+    assert job['status'] == 'failed'
+    assert 'Lease expired after 2 attempt(s)' in job['error']
+
+
+def test_worker_runs_handler_and_stores_progress_and_result():
+    seen = []
+
+    def handler(payload, report, job_id):
+        seen.append(job_id)
+        report({'step': 1})
+        assert job_queue.get_job(job_id)['progress'] == {'step': 1}
+        return {'doubled': payload['n'] * 2}
+
+    job_id = job_queue.enqueue('double', {'n': 21})
+    assert worker({'double': handler}, progress_interval=0).run_once()
+    assert not worker({'double': handler}).run_once()
+    job = job_queue.get_job(job_id)
+    assert (job['status'], job['result'], seen) == ('done', {'doubled': 42}, [job_id])
+
+
+def test_handler_error_fails_the_job():
+    def handler(payload, report, job_id):
+        raise ValueError('boom')
+
+    job_id = job_queue.enqueue('broken', {})
+    worker({'broken': handler}).run_once()
+    job = job_queue.get_job(job_id)
+    assert (job['status'], job['error']) == ('failed', 'ValueError: boom')
+
+
+def test_cancel_stops_the_handler_at_its_next_report():
+    reached = []
+
+    def handler(payload, report, job_id):
+        job_queue.cancel(job_id)
+        report({'step': 1})
+        reached.append(True)
+
+    job_id = job_queue.enqueue('slow', {})
+    worker({'slow': handler}, progress_interval=0).run_once()
+    assert reached == []
+    assert job_queue.get_job(job_id)['status'] == 'cancelled'
+
+
+def test_heartbeat_errors_are_retried_before_the_lease_runs_out(monkeypatch):
+    real_heartbeat = job_queue.heartbeat
+    calls = []
+
+    def flaky_heartbeat(*args, **kwargs):
+        calls.append(args)
+        if len(calls) <= 2:
+            raise RuntimeError('database is locked')
+        return real_heartbeat(*args, **kwargs)
+
+    monkeypatch.setattr(job_queue, 'heartbeat', flaky_heartbeat)
+
+    def handler(payload, report, job_id):
+        time.sleep(1.0)
+        return job_queue.get_job(job_id)['lease_expires'] - time.time()
+
+    job_id = job_queue.enqueue('long', {})
+    worker({'long': handler}, lease_seconds=0.6).run_once()
+    job = job_queue.get_job(job_id)
+    assert job['status'] == 'done'
+    assert job['result'] > 0  # the lease was still held when the handler finished
+    assert len(calls) > 2
+
+
+def test_run_job_blocks_until_a_worker_finishes():
+    workers = job_queue.start_workers({'echo': lambda payload, report, job_id: payload}, count=1)
+    try:
+        job = job_queue.run_job('echo', {'text': 'hi'}, interval=0.01)
+    finally:
+        for w in workers:
+            w.stop()
+    assert (job['status'], job['result']) == ('done', {'text': 'hi'})
+
+
+def test_stash_upload_copies_by_content_hash(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_queue, 'JOB_UPLOAD_DIR', str(tmp_path / 'uploads'))
+    upload = tmp_path / 'Resume.PDF'
+    upload.write_bytes(b'%PDF-1.4 resume')
+    stashed = job_queue.stash_upload(str(upload))
+    assert stashed.endswith('.pdf') and os.path.dirname(stashed) == str(tmp_path / 'uploads')
+    assert open(stashed, 'rb').read() == b'%PDF-1.4 resume'
+    assert job_queue.stash_upload(str(upload)) == stashed
+    assert job_queue.stash_upload(None) is None
+
+
+def test_collect_uploads_spares_kept_recent_and_in_use_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(job_queue, 'JOB_UPLOAD_DIR', str(tmp_path / 'uploads'))
+    stashed = {}
+    for name in ('orphan', 'kept', 'queued'):
+        upload = tmp_path / f'{name}.pdf'
+        upload.write_bytes(name.encode())
+        stashed[name] = job_queue.stash_upload(str(upload))
+    job_queue.keep_upload(stashed['kept'])
+    job_queue.enqueue('generate', {'pdf_file': stashed['queued']})
+    assert job_queue.collect_uploads() == 0
+    assert job_queue.collect_uploads(max_age_days=0) == 1
+    assert sorted(os.listdir(tmp_path / 'uploads')) == sorted(os.path.basename(stashed[n]) for n in ('kept', 'queued'))
+    # Stashing the same file again brings it back
+    assert os.path.exists(job_queue.stash_upload(str(tmp_path / 'orphan.pdf')))
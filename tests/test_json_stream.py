@@ -0,0 +1,82 @@
+import pytest
+
+from json_stream import StreamingJSONObject, parse_json_reply, structured_reply
+
+# reply -> (fields, complete, defects)
+CASES = [
+    ('{"job_title": "Engineer", "resume": "# Jane\\n- Python"}',
+     {'job_title': 'Engineer', 'resume': '# Jane\n- Python'}, True, []),
+    ('Sure! Here it is:\n```json\n{"resume": "x"}\n```',
+     {'resume': 'x'}, True, []),
+    ('{"resume": "line one\nline two"}',
+     {'resume': 'line one\nline two'}, True, ['control character in string']),
+    ('{"resume": "She said "ship it", then shipped", "job_title": "PM"}',
+     {'resume': 'She said "ship it", then shipped', 'job_title': 'PM'}, True, ['unescaped quote in string']),
+    ('{ job_title : "Eng", resume: "x"}',
+     {'job_title': 'Eng', 'resume': 'x'}, True, ['unquoted key']),
+    ('{"resume": "a", company_name: "B",}',
+     {'resume': 'a', 'company_name': 'B'}, True, ['unquoted key']),
+    ("{'job_title': 'Eng', 'resume': 'it\\'s \"quoted\"'}",
+     {'job_title': 'Eng', 'resume': 'it\'s "quoted"'}, True, ['single-quoted string']),
+    ('{"resume": "C:\\dev \\u00e9t\\u00e9", "years": 5, "tags": ["a", "b"]}',
+     {'resume': 'C:\\dev été', 'years': 5, 'tags': ['a', 'b']}, True, ['invalid escape']),
+    ('{"resume": "bad \\u12 escape"}',
+     {'resume': 'bad \\u12 escape'}, True, ['invalid escape']),
+    ('{"job_title": "Eng", "resume": "cut off mid',
+     {'job_title': 'Eng', 'resume': 'cut off mid'}, False, ['truncated string', 'unterminated object']),
+    ('no JSON here', {}, False, []),
+]
+
+
+@pytest.mark.parametrize('reply, fields, complete, defects', CASES)
+def test_parse(reply, fields, complete, defects):
+    parser = parse_json_reply(reply)
+    assert (parser.fields, parser.complete, parser.defects) == (fields, complete, defects)
+
+
+@pytest.mark.parametrize('reply, fields, complete, defects', CASES)
+def test_chunking_does_not_change_the_result(reply, fields, complete, defects):
+    for size in (1, 2, 7):
+        parser = StreamingJSONObject()
+        for i in range(0, len(reply), size):
+            parser.feed(reply[i:i + size])
+        assert parser.close() == fields
+
+
+def test_body_is_published_while_it_streams():
+    parser = StreamingJSONObject()
+    assert parser.feed('{"job_title": "Eng", "res') == {'job_title'}
+    assert parser.fields == {'job_title': 'Eng'}
+    assert parser.feed('ume": "# Jane') == {'resume'}
+    assert parser.fields['resume'] == '# Jane'
+    parser.feed('\\nmore')
+    assert parser.fields['resume'] == '# Jane\nmore'
+    parser.feed('"}')
+    assert parser.complete and parser.close() == {'job_title': 'Eng', 'resume': '# Jane\nmore'}
+
+
+def test_structured_reply_falls_back_to_plain_text():
+    reply = '```markdown\n# Jane Doe\n- Python\n```'
+    assert structured_reply(parse_json_reply(reply), reply, 'resume') == {'resume': '# Jane Doe\n- Python'}
+
+
+def test_structured_reply_repairs_only_when_the_body_is_missing():
+    calls = []
+
+    def repair(raw):
+        calls.append(raw)
+        return '{"resume": "fixed"}'
+
+    good = '{"resume": "fine"}'
+    assert structured_reply(parse_json_reply(good), good, 'resume', repair) == {'resume': 'fine'}
+    assert calls == []
+    broken = '{"job_title": "Eng", "cv": "wrong key"}'
+    parser = parse_json_reply(broken)
+    assert structured_reply(parser, broken, 'resume', repair) == {'resume': 'fixed'}
+    assert calls == [broken] and 'repaired' in parser.defects
+
+
+def test_structured_reply_raises_without_a_body():
+    broken = '{"job_title": "Eng"}'
+    with pytest.raises(ValueError, match="no 'resume' field"):
+        structured_reply(parse_json_reply(broken), broken, 'resume')
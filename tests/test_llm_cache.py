@@ -0,0 +1,58 @@
+import llm_cache
+from llm_cache import ResponseCache, cache_key
+
+MESSAGES = [{"role": "system", "content": "You are helpful."}, {"role": "user", "content": "Tailor this resume"}]
+
+
+def key(**overrides):
+    args = dict(backend='openai', model='gpt-4o', messages=MESSAGES, temperature=0.7, max_tokens=1800)
+    args.update(overrides)
+    return cache_key(**args)
+
+
+def test_key_ignores_line_endings_and_trailing_whitespace():
+    messy = [{"role": "system", "content": "You are helpful.  \r\n"}, {"role": "user", "content": "\nTailor this resume\t"}]
+    assert key(messages=messy) == key()
+
+
+def test_key_depends_on_every_request_parameter():
+    variants = [key(backend='lmstudio'), key(model='gpt-4o-mini'), key(temperature=0), key(max_tokens=1200),
+                key(messages=[{"role": "user", "content": "You are helpful."}, MESSAGES[1]]),
+                key(messages=[MESSAGES[0], {"role": "user", "content": "Tailor this CV"}])]
+    assert len(set(variants + [key()])) == len(variants) + 1
+
+
+def test_round_trip_and_stats(tmp_path):
+    cache = ResponseCache(path=str(tmp_path / 'cache.db'), enabled=True)
+    assert cache.get(key()) is None
+    cache.put(key(), 'gpt-4o', 'the reply')
+    assert cache.get(key()) == 'the reply'
+    assert cache.stats() == {"enabled": True, "hits": 1, "misses": 1, "hit_rate": 0.5}
+
+
+def test_disabled_cache_stores_nothing(tmp_path):
+    cache = ResponseCache(path=str(tmp_path / 'cache.db'), enabled=False)
+    cache.put(key(), 'gpt-4o', 'the reply')
+    cache.enabled = True
+    assert cache.get(key()) is None
+
+
+def test_entries_expire_after_ttl(tmp_path, monkeypatch):
+    cache = ResponseCache(path=str(tmp_path / 'cache.db'), enabled=True, ttl=60)
+    now = 1_000_000.0
+    monkeypatch.setattr(llm_cache.time, 'time', lambda: now)
+    cache.put(key(), 'gpt-4o', 'the reply')
+    now += 60
+    assert cache.get(key()) == 'the reply'
+    now += 1
+    assert cache.get(key()) is None
+
+
+def test_oldest_entries_are_dropped_past_max_entries(tmp_path, monkeypatch):
+    cache = ResponseCache(path=str(tmp_path / 'cache.db'), enabled=True, max_entries=2)
+    clock = iter(range(1_000_000, 1_000_100))
+    monkeypatch.setattr(llm_cache.time, 'time', lambda: float(next(clock)))
+    for n in range(3):
+        cache.put(key(max_tokens=n), 'gpt-4o', f'reply {n}')
+    assert cache.get(key(max_tokens=0)) is None
+    assert cache.get(key(max_tokens=2)) == 'reply 2'
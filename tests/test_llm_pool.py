@@ -0,0 +1,148 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+import llm_pool
+from llm_cache import ResponseCache
+from llm_pool import ChatClient, chat_messages
+
+MESSAGES = chat_messages('Tailor this resume')
+
+
+def reply(text):
+    return httpx.Response(200, json={"choices": [{"message": {"content": text}}]})
+
+
+def sse(*deltas):
+    chunks = [{"choices": [{"delta": {"content": delta}}]} for delta in deltas]
+    return httpx.Response(200, text=''.join(f"data: {json.dumps(chunk)}\n\n" for chunk in chunks) + "data: [DONE]\n\n")
+
+
+@pytest.fixture
+def backend():
+    """A ChatClient whose backends are served by `backend.respond`; requests land in `backend.requests`."""
+    class Backend:
+        requests = []
+        respond = staticmethod(lambda request: reply(' tailored resume\n'))
+
+    transport = httpx.MockTransport(lambda request: Backend.requests.append(request) or Backend.respond(request))
+    client = ChatClient(openai_api_base='http://openai.test/v1/', lmstudio_url='http://lmstudio.test/v1/chat/completions')
+    client._ensure_loop()
+    for name in ('openai', 'lmstudio'):
+        client._async_client._clients[name] = httpx.AsyncClient(transport=transport)
+    Backend.client = client
+    yield Backend
+    client.close()
+
+
+def test_requests_reach_the_backend_with_its_url_and_key(backend, monkeypatch):
+    monkeypatch.setenv('OPENAI_API_KEY', 'sk-env')
+    assert backend.client.chat(MESSAGES, 'gpt-4o', 100, 0.7) == 'tailored resume'
+    assert backend.client.chat(MESSAGES, 'local', 100, 0.7, backend='lmstudio') == 'tailored resume'
+    backend.client.chat(MESSAGES, 'gpt-4o', 100, 0.7, api_key='sk-explicit')
+    openai, lmstudio, explicit = backend.requests
+    assert str(openai.url) == 'http://openai.test/v1/chat/completions'
+    assert openai.headers['authorization'] == 'Bearer sk-env'
+    assert str(lmstudio.url) == 'http://lmstudio.test/v1/chat/completions'
+    assert 'authorization' not in lmstudio.headers
+    assert explicit.headers['authorization'] == 'Bearer sk-explicit'
+
+
+def test_unknown_backend_is_rejected(backend):
+    with pytest.raises(ValueError, match='Unknown LLM backend'):
+        backend.client.chat(MESSAGES, 'gpt-4o', 100, 0.7, backend='nope')
+
+
+def test_achat_works_from_any_event_loop(backend):
+    async def two_calls():
+        return await asyncio.gather(backend.client.achat(MESSAGES, 'gpt-4o', 100, 0.7),
+                                    backend.client.achat(MESSAGES, 'gpt-4o', 100, 0.7))
+
+    assert asyncio.run(two_calls()) == ['tailored resume', 'tailored resume']
+    assert asyncio.run(backend.client.achat(MESSAGES, 'gpt-4o', 100, 0.7)) == 'tailored resume'
+
+
+def test_http_errors_are_raised(backend):
+    backend.respond = staticmethod(lambda request: httpx.Response(401, json={"error": "bad key"}))
+    with pytest.raises(httpx.HTTPStatusError):
+        backend.client.chat(MESSAGES, 'gpt-4o', 100, 0.7)
+
+
+def test_streams_yield_each_delta(backend):
+    backend.respond = staticmethod(lambda request: sse('# Jane', ' Doe', '', '\n- Python'))
+    assert list(backend.client.stream_chat(MESSAGES, 'gpt-4o', 100, 0.7)) == ['# Jane', ' Doe', '\n- Python']
+    assert json.loads(backend.requests[0].content)['stream'] is True
+
+    async def collect():
+        return [delta async for delta in backend.client.astream_chat(MESSAGES, 'gpt-4o', 100, 0.7)]
+
+    assert asyncio.run(collect()) == ['# Jane', ' Doe', '\n- Python']
+
+
+def test_stream_errors_reach_the_caller(backend):
+    backend.respond = staticmethod(lambda request: httpx.Response(500, text='upstream down'))
+    with pytest.raises(httpx.HTTPStatusError):
+        list(backend.client.stream_chat(MESSAGES, 'gpt-4o', 100, 0.7))
+
+
+def test_cache_is_consulted_before_the_network(backend, monkeypatch, tmp_path):
+    monkeypatch.setattr(llm_pool, 'response_cache', ResponseCache(path=str(tmp_path / 'cache.db'), enabled=True))
+    assert backend.client.chat(MESSAGES, 'gpt-4o', 100, 0.7) == 'tailored resume'
+    assert backend.client.chat(MESSAGES, 'gpt-4o', 100, 0.7) == 'tailored resume'
+    assert list(backend.client.stream_chat(MESSAGES, 'gpt-4o', 100, 0.7)) == ['tailored resume']
+    assert asyncio.run(backend.client.achat(MESSAGES, 'gpt-4o', 100, 0.7)) == 'tailored resume'
+    assert len(backend.requests) == 1
+    # A different request, or an explicit bypass, still goes out
+    backend.client.chat(MESSAGES, 'gpt-4o', 100, 0)
+    backend.client.chat(MESSAGES, 'gpt-4o', 100, 0.7, bypass_cache=True)
+    assert len(backend.requests) == 3
+
+
+def test_only_completed_streams_are_cached(backend, monkeypatch, tmp_path):
+    monkeypatch.setattr(llm_pool, 'response_cache', ResponseCache(path=str(tmp_path / 'cache.db'), enabled=True))
+    backend.respond = staticmethod(lambda request: httpx.Response(500, text='upstream down'))
+    with pytest.raises(httpx.HTTPStatusError):
+        list(backend.client.stream_chat(MESSAGES, 'gpt-4o', 100, 0.7))
+    backend.respond = staticmethod(lambda request: sse('# Jane', ' Doe'))
+    assert list(backend.client.stream_chat(MESSAGES, 'gpt-4o', 100, 0.7)) == ['# Jane', ' Doe']
+    assert backend.client.chat(MESSAGES, 'gpt-4o', 100, 0.7) == '# Jane Doe'
+    assert len(backend.requests) == 2
+
+
+def test_rate_limited_and_unavailable_responses_are_retried(backend, monkeypatch):
+    monkeypatch.setattr(llm_pool, 'backoff_delay', lambda attempt, retry_after=None: 0)
+    statuses = iter([429, 503, 200])
+    backend.respond = staticmethod(lambda request: reply('third time lucky') if next(statuses) == 200 else httpx.Response(429))
+    assert backend.client.chat(MESSAGES, 'local', 100, 0.7, backend='lmstudio') == 'third time lucky'
+    assert len(backend.requests) == 3
+
+    statuses = iter([502, 200])
+    backend.respond = staticmethod(lambda request: sse('streamed') if next(statuses) == 200 else httpx.Response(502))
+    assert list(backend.client.stream_chat(MESSAGES, 'local', 100, 0.7, backend='lmstudio')) == ['streamed']
+    assert len(backend.requests) == 5
+
+
+def test_retries_give_up_after_max_retries_and_skip_client_errors(backend, monkeypatch):
+    monkeypatch.setattr(llm_pool, 'backoff_delay', lambda attempt, retry_after=None: 0)
+    monkeypatch.setattr(llm_pool, 'LLM_MAX_RETRIES', 2)
+    backend.respond = staticmethod(lambda request: httpx.Response(503))
+    with pytest.raises(httpx.HTTPStatusError):
+        backend.client.chat(MESSAGES, 'local', 100, 0.7, backend='lmstudio')
+    assert len(backend.requests) == 3
+    backend.respond = staticmethod(lambda request: httpx.Response(400))
+    with pytest.raises(httpx.HTTPStatusError):
+        backend.client.chat(MESSAGES, 'local', 100, 0.7, backend='lmstudio')
+    assert len(backend.requests) == 4
+
+
+def test_prefix_cache_counts_from_openai_and_llama_cpp():
+    assert llm_pool.prefix_cached_tokens({"usage": {"prompt_tokens_details": {"cached_tokens": 1024}}}) == 1024
+    assert llm_pool.prefix_cached_tokens({"usage": {"prompt_tokens_details": {"cached_tokens": 0}}, "timings": {"cache_n": 9}}) == 0
+    assert llm_pool.prefix_cached_tokens({"timings": {"cache_n": 300}}) == 300
+    assert llm_pool.prefix_cached_tokens({"usage": {"prompt_tokens": 5}}) is None
+
+
+def test_process_shares_one_client():
+    assert llm_pool.get_chat_client() is llm_pool.get_chat_client()
@@ -0,0 +1,25 @@
+import threading
+
+import model_registry
+
+
+def test_a_slow_backend_does_not_block_the_others(monkeypatch):
+    release = threading.Event()
+
+    def slow_openai():
+        release.wait(5)
+        return ['gpt-4o']
+
+    monkeypatch.setattr(model_registry, '_registries', {})
+    monkeypatch.setitem(model_registry.LISTERS, 'openai', slow_openai)
+    monkeypatch.setitem(model_registry.LISTERS, 'lmstudio', lambda: ['local-model'])
+    first = threading.Thread(target=model_registry.get_registry, args=('openai',))
+    first.start()
+    try:
+        assert model_registry.get_registry('lmstudio').resolve() == 'local-model'
+        assert first.is_alive()
+    finally:
+        release.set()
+        first.join(5)
+    assert model_registry.get_registry('openai').resolve() == 'gpt-4o'
+    assert model_registry.get_registry('openai') is model_registry.get_registry('openai')
@@ -0,0 +1,53 @@
+import io
+import itertools
+
+import pytest
+
+import pdf_cache
+from pdf_cache import cached_extract
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    pdf_cache.clear_cache()
+
+
+def counting(calls, suffix=''):
+    def extract(stream):
+        text = stream.read().decode() + suffix
+        calls.append(text)
+        return text
+    return extract
+
+
+def test_unchanged_file_is_parsed_once(tmp_path):
+    calls = []
+    path = tmp_path / 'resume.pdf'
+    path.write_bytes(b'resume one')
+    assert cached_extract(str(path), counting(calls), 'fake', '1') == 'resume one'
+    # A path and an upload stream with the same bytes share one entry
+    assert cached_extract(io.BytesIO(b'resume one'), counting(calls), 'fake', '1') == 'resume one'
+    assert calls == ['resume one']
+
+
+def test_extractor_name_and_version_are_part_of_the_key():
+    calls = []
+    cached_extract(io.BytesIO(b'resume'), counting(calls), 'fake', '1')
+    assert cached_extract(io.BytesIO(b'resume'), counting(calls, ' (other)'), 'other', '1') == 'resume (other)'
+    assert cached_extract(io.BytesIO(b'resume'), counting(calls, ' (v2)'), 'fake', '2') == 'resume (v2)'
+    assert cached_extract(io.BytesIO(b'resume'), counting(calls), 'other', '1') == 'resume (other)'
+    assert len(calls) == 3
+
+
+def test_least_recently_used_entries_are_evicted(monkeypatch):
+    monkeypatch.setattr(pdf_cache, 'PDF_CACHE_MAX_BYTES', 25)
+    clock = itertools.count(1_000_000)
+    monkeypatch.setattr(pdf_cache.time, 'time', lambda: float(next(clock)))
+    calls = []
+    for data in (b'first file', b'other file', b'first file', b'third file'):
+        cached_extract(io.BytesIO(data), counting(calls), 'fake', '1')
+    assert calls == ['first file', 'other file', 'third file']
+    # 'other file' was used least recently, so it is the one that had to go
+    cached_extract(io.BytesIO(b'first file'), counting(calls), 'fake', '1')
+    cached_extract(io.BytesIO(b'other file'), counting(calls), 'fake', '1')
+    assert calls[3:] == ['other file']
@@ -0,0 +1,88 @@
+import os
+import threading
+import time
+
+import pytest
+
+from pdf_extract import ExtractionPool, PartialExtraction, pypdf2_pages
+from pdfs import make_pdf
+
+PAGES = [f"Page {n} of the resume" for n in range(1, 6)]
+
+
+def failing_page_reader(data, start, end):
+    # Page 2 cannot be read; the rest can
+    count, pages = pypdf2_pages(data, start, end)
+    return count, [(n, None, 'ValueError: bad stream') if n == 1 else (n, text, error) for n, text, error in pages]
+
+
+def slow_page_reader(data, start, end):
+    if start > 0:
+        time.sleep(30)
+    return pypdf2_pages(data, start, end)
+
+
+def hanging_page_reader(data, start, end):
+    time.sleep(60)
+
+
+def page_reader_waiting_for_file(data, start, end):
+    # Page 1 names a file; the first range is only done once it exists
+    count, pages = pypdf2_pages(data, start, end)
+    while start == 0 and not os.path.exists(pages[0][1]):
+        time.sleep(0.02)
+    return count, pages
+
+
+@pytest.fixture
+def pool():
+    return ExtractionPool(workers=2, timeout=5, pages_per_chunk=2)
+
+
+def test_long_documents_are_split_and_reassembled_in_order(pool):
+    assert pool.extract(make_pdf(PAGES)).splitlines() == PAGES
+
+
+def test_failed_pages_are_reported_with_the_rest_of_the_text(pool):
+    with pytest.raises(PartialExtraction) as raised:
+        pool.extract(make_pdf(PAGES), failing_page_reader)
+    assert raised.value.text.splitlines() == PAGES[:1] + PAGES[2:]
+    assert raised.value.warning == 'Extracted 4 of 5 PDF pages; page 2 failed (ValueError: bad stream).'
+
+
+def test_unreadable_documents_fail_cleanly(pool):
+    with pytest.raises(PartialExtraction, match='PDF could not be read'):
+        pool.extract(b'not a pdf at all')
+
+
+def test_pages_past_the_deadline_are_dropped(pool):
+    pool.timeout = 1
+    with pytest.raises(PartialExtraction) as raised:
+        pool.extract(make_pdf(PAGES), slow_page_reader)
+    assert raised.value.text.splitlines() == PAGES[:2]
+    assert 'pages 3-4 timed out' in raised.value.warning
+    # The pool is rebuilt for the next document
+    pool.timeout = 5
+    assert pool.extract(make_pdf(PAGES[:1])).splitlines() == PAGES[:1]
+
+
+def test_a_stuck_document_does_not_affect_others_in_flight(tmp_path):
+    pool = ExtractionPool(workers=2, timeout=3, pages_per_chunk=2)
+    marker = str(tmp_path / 'first-document-gave-up')
+    pages = [marker] + PAGES
+    outcome = {}
+
+    def slow_but_fine():
+        try:
+            outcome['text'] = pool.extract(make_pdf(pages), page_reader_waiting_for_file).splitlines()
+        except PartialExtraction as e:
+            outcome['error'] = e.warning
+
+    with pytest.raises(PartialExtraction, match='timed out'):
+        other = threading.Thread(target=slow_but_fine)
+        threading.Timer(1, other.start).start()
+        pool.extract(make_pdf(PAGES), hanging_page_reader)
+    # The second document was still being parsed when the first one's workers were killed
+    open(marker, 'w').close()
+    other.join(5)
+    assert outcome == {'text': pages}
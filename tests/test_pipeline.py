@@ -0,0 +1,71 @@
+import threading
+
+import pytest
+
+from pipeline import Pipeline, StageError
+
+
+def test_stages_get_their_dependencies_results():
+    pipeline = (Pipeline()
+                .stage('text', lambda ctx: 'resume text')
+                .stage('resume', lambda ctx: ctx['text'].upper(), deps=['text'])
+                .stage('cover', lambda ctx: f"cover for {ctx['resume']}", deps=['text', 'resume']))
+    events = list(pipeline.run())
+    assert [(name, kind) for name, kind, _ in events] == [('text', 'done'), ('resume', 'done'), ('cover', 'done')]
+    assert pipeline.results['cover'] == 'cover for RESUME TEXT'
+
+
+def test_published_values_start_dependants_while_the_stage_runs():
+    cover_started = threading.Event()
+
+    def resume(ctx):
+        ctx.emit('writing')
+        ctx.publish('resume_prefix', '# Jane')
+        # Only finishes once the cover letter is already running alongside it
+        assert cover_started.wait(5)
+        return '# Jane Doe'
+
+    def cover(ctx):
+        cover_started.set()
+        return f"cover from {ctx['resume_prefix']}"
+
+    pipeline = Pipeline().stage('resume', resume).stage('cover', cover, deps=['resume_prefix'])
+    events = list(pipeline.run())
+    assert ('resume', 'progress', 'writing') in events
+    assert ('resume', 'published', ('resume_prefix', '# Jane')) in events
+    assert pipeline.results['cover'] == 'cover from # Jane'
+    assert pipeline.results['resume'] == '# Jane Doe'
+
+
+def test_first_error_cancels_the_rest():
+    seen_cancel = threading.Event()
+
+    def slow(ctx):
+        for _ in range(500):
+            if ctx.cancelled:
+                seen_cancel.set()
+                return None
+            threading.Event().wait(0.01)
+
+    def broken(ctx):
+        raise ValueError('no job description')
+
+    pipeline = Pipeline().stage('slow', slow).stage('broken', broken)
+    with pytest.raises(StageError) as raised:
+        list(pipeline.run())
+    assert raised.value.stage == 'broken' and isinstance(raised.value.error, ValueError)
+    assert seen_cancel.wait(5)
+
+
+def test_unmet_dependencies_are_reported():
+    pipeline = Pipeline().stage('a', lambda ctx: 1).stage('b', lambda ctx: 2, deps=['never'])
+    with pytest.raises(RuntimeError, match='unmet dependencies'):
+        list(pipeline.run())
+
+
+def test_closing_the_run_early_cancels():
+    pipeline = Pipeline().stage('a', lambda ctx: 1).stage('b', lambda ctx: 2, deps=['a'])
+    events = pipeline.run()
+    next(events)
+    events.close()
+    assert pipeline.cancelled.is_set()
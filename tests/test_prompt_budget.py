@@ -0,0 +1,68 @@
+import base64
+import hashlib
+
+import pytest
+
+import prompt_budget
+from prompt_budget import TRUNCATION_MARKER, PromptSection, count_tokens, fit_sections
+
+
+@pytest.fixture(autouse=True)
+def estimated_counts(monkeypatch):
+    # No tokenizer download in tests: counts come from the regex estimate
+    monkeypatch.setattr(prompt_budget, 'get_encoding', lambda name: None)
+    prompt_budget._count.cache_clear()
+    yield
+    prompt_budget._count.cache_clear()
+
+
+def words(n):
+    return ' '.join(f'word{i}' for i in range(n))
+
+
+def test_model_lookup_uses_longest_prefix():
+    assert prompt_budget.context_window('gpt-4o-mini-2024-07-18') == 128000
+    assert prompt_budget.context_window('gpt-4-0613') == 8192
+    assert prompt_budget.context_window('some-local-model') == prompt_budget.DEFAULT_CONTEXT_WINDOW
+    assert prompt_budget.encoding_name_for_model('gpt-4o') == 'o200k_base'
+    assert prompt_budget.encoding_name_for_model('gpt-4') == 'cl100k_base'
+
+
+def test_estimate_is_conservative():
+    assert count_tokens('') == 0
+    assert count_tokens('hello world') >= 2
+
+
+def test_sections_that_fit_are_untouched():
+    sections = [PromptSection('resume_text', words(50), priority=3), PromptSection('job_desc', words(50), priority=1)]
+    texts, trimmed = fit_sections(sections, 'gpt-4', max_output_tokens=1000)
+    assert trimmed == []
+    assert texts == {'resume_text': words(50), 'job_desc': words(50)}
+
+
+def test_lowest_priority_is_trimmed_first():
+    sections = [PromptSection('resume_text', words(1000), priority=3),
+                PromptSection('company_details', words(3000), priority=0)]
+    budget = prompt_budget.prompt_budget('gpt-4', 1800)
+    texts, trimmed = fit_sections(sections, 'gpt-4', max_output_tokens=1800)
+    assert trimmed == ['company_details']
+    assert texts['resume_text'] == words(1000)
+    assert texts['company_details'].endswith(TRUNCATION_MARKER)
+    assert sum(count_tokens(text, 'gpt-4') for text in texts.values()) <= budget
+
+
+def test_min_tokens_is_kept_and_overflow_raises():
+    sections = [PromptSection('resume_text', words(4000), priority=3, min_tokens=10000)]
+    with pytest.raises(ValueError, match='context window'):
+        fit_sections(sections, 'gpt-4', max_output_tokens=1800)
+
+
+def test_vendored_rank_file_is_loaded_and_hash_checked(tmp_path, monkeypatch):
+    pytest.importorskip('tiktoken')
+    ranks = b''.join(base64.b64encode(bytes([i])) + b' %d\n' % i for i in range(256))
+    (tmp_path / 'cl100k_base.tiktoken').write_bytes(ranks)
+    monkeypatch.setattr(prompt_budget, 'TOKENIZER_DIR', str(tmp_path))
+    assert prompt_budget._load_encoding('cl100k_base') is None  # not tiktoken's published file
+    monkeypatch.setitem(prompt_budget._LOCAL_ENCODINGS['cl100k_base'], 'expected_hash', hashlib.sha256(ranks).hexdigest())
+    encoding = prompt_budget._load_encoding('cl100k_base')
+    assert encoding.decode(encoding.encode('hi there')) == 'hi there'
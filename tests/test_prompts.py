@@ -0,0 +1,21 @@
+import tailored_resume_bot as bot
+
+FACTS = 'FACTS (persistent):\n- Led a team of five\n'
+RESUME = 'Jane Doe\nSenior Engineer\n- Python, SQL'
+
+
+def test_resume_prompts_for_different_jobs_share_the_static_prefix():
+    prefix = bot.resume_prompt_prefix(FACTS, RESUME)
+    first = bot.build_resume_prompt('Formal', 'Skills', 'Resume', FACTS, 'Build data pipelines at Acme.', 'Acme', RESUME)
+    second = bot.build_resume_prompt('Casual', 'Leadership', 'CV', FACTS, 'Lead platform work at Globex.', 'Globex', RESUME)
+    assert first.startswith(prefix) and second.startswith(prefix)
+    assert RESUME in prefix and FACTS in prefix
+    assert 'Acme' in first[len(prefix):] and 'Formal' in first[len(prefix):]
+
+
+def test_cover_prompts_for_different_jobs_share_the_static_prefix():
+    prefix = bot.cover_prompt_prefix(FACTS)
+    first = bot.build_cover_prompt('Formal', 'Resume', 'March 3, 2025', FACTS, 'Build data pipelines at Acme.', 'Acme', 'TAILORED A')
+    second = bot.build_cover_prompt('Casual', 'CV', 'March 4, 2025', FACTS, 'Lead platform work at Globex.', 'Globex', 'TAILORED B')
+    assert first.startswith(prefix) and second.startswith(prefix)
+    assert 'March 3, 2025' not in prefix and 'TAILORED A' in first[len(prefix):]
@@ -0,0 +1,54 @@
+import pytest
+
+import rate_limit
+from rate_limit import RateLimiter, TokenBucket, backoff_delay
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_bucket_waits_once_capacity_is_spent(clock):
+    bucket = TokenBucket(60)  # one per second, burst of 60
+    assert all(bucket.reserve() == 0 for _ in range(60))
+    assert bucket.reserve() == pytest.approx(1.0)
+    assert bucket.reserve() == pytest.approx(2.0)
+    clock[0] += 2
+    assert bucket.reserve() == pytest.approx(1.0)
+
+
+def test_penalize_delays_later_reservations(clock):
+    bucket = TokenBucket(60)
+    bucket.penalize(5)
+    assert bucket.reserve() == pytest.approx(6.0)
+
+
+def test_no_limits_by_default(monkeypatch):
+    for name in ('LLM_RPM_OPENAI', 'LLM_TPM_OPENAI', 'LLM_RPM_LMSTUDIO', 'LLM_TPM_LMSTUDIO'):
+        monkeypatch.delenv(name, raising=False)
+    limiter = RateLimiter()
+    assert all(limiter.reserve('openai', tokens=100000) == 0 for _ in range(1000))
+    assert limiter.reserve('lmstudio', tokens=100000) == 0
+
+
+def test_limits_from_environment_and_config(monkeypatch, clock):
+    monkeypatch.setenv('LLM_TPM_OPENAI', '6000')
+    monkeypatch.setenv('LLM_RPM_LMSTUDIO', '0')
+    limiter = RateLimiter(limits={'lmstudio': {'rpm': 1}})
+    assert limiter.reserve('openai', tokens=6000) == 0
+    assert limiter.reserve('openai', tokens=100) == pytest.approx(1.0)
+    # Explicit limits win over the environment
+    assert limiter.reserve('lmstudio') == 0
+    assert limiter.reserve('lmstudio') == pytest.approx(60.0)
+
+
+def test_backoff_honours_retry_after_and_caps(monkeypatch):
+    monkeypatch.setattr(rate_limit, 'LLM_BACKOFF_BASE', 1.0)
+    monkeypatch.setattr(rate_limit, 'LLM_BACKOFF_MAX', 60.0)
+    assert 7.0 <= backoff_delay(0, retry_after='7') <= 8.0
+    assert 60.0 <= backoff_delay(0, retry_after='600') <= 61.0
+    assert all(0 <= backoff_delay(attempt) <= min(60.0, 2 ** attempt) for attempt in range(10) for _ in range(20))
+    assert 0 <= backoff_delay(3, retry_after='Wed, 21 Oct 2015 07:28:00 GMT') <= 8.0
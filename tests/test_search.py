@@ -0,0 +1,48 @@
+import uuid
+
+import datastore as db
+import tailored_resume_bot as bot
+
+
+def store(company='Acme', title='Engineer', resume='resume text', cover='cover text', description='job description'):
+    return bot.store_submission(description, 'Direct to company', company, title, 'https://example.com/job', 'Resume', 'Formal', '',
+                                [], [], 'resume.pdf', resume, cover)
+
+
+def ids(results):
+    return [row[0] for row in results]
+
+
+def test_fts_query_prefix_matches_every_word():
+    assert bot.fts_query('Senior Data-Engineer') == '"Senior"* "Data"* "Engineer"*'
+
+
+def test_fts_query_drops_syntax_and_empty_input():
+    assert bot.fts_query('"x" OR (y*') == '"x"* "OR"* "y"*'
+    assert bot.fts_query('  -- ') == ''
+    assert bot.fts_query(None) == ''
+    assert bot.search_submissions('!!!') == []
+
+
+def test_search_matches_word_prefixes_in_blob_backed_text():
+    word = f"kubernetes{uuid.uuid4().hex[:8]}"
+    sub_id = store(resume=f"Ran {word} clusters")
+    assert ids(bot.search_submissions(word[:-3])) == [sub_id]
+    assert '**' in bot.search_submissions(word)[0][5]
+
+
+def test_company_and_title_rank_above_long_text():
+    word = f"zephyr{uuid.uuid4().hex[:8]}"
+    in_body = store(cover=f"I admire {word} deeply")
+    in_company = store(company=f"{word} Labs")
+    assert ids(bot.search_submissions(word)) == [in_company, in_body]
+
+
+def test_index_follows_regen_updates_and_deletes():
+    old, new = f"old{uuid.uuid4().hex[:8]}", f"new{uuid.uuid4().hex[:8]}"
+    sub_id = store(resume=f"uses {old}")
+    bot.update_submission_outputs(sub_id, f"uses {new}", 'cover text')
+    assert bot.search_submissions(old) == []
+    assert ids(bot.search_submissions(new)) == [sub_id]
+    db.execute('DELETE FROM submissions WHERE id = ?', (sub_id,))
+    assert bot.search_submissions(new) == []
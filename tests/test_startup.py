@@ -0,0 +1,15 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_import_is_cheap(tmp_path):
+    db_path = tmp_path / 'facts_tweaks.db'
+    env = dict(os.environ, FACTS_DB_PATH=str(db_path))
+    heavy = subprocess.run([sys.executable, '-c', 'import sys, tailored_resume_bot; '
+                            'print(sorted(m for m in ("gradio", "PyPDF2", "openai") if m in sys.modules))'],
+                           cwd=ROOT, env=env, capture_output=True, text=True, check=True).stdout
+    assert heavy.strip() == '[]'
+    assert not db_path.exists()
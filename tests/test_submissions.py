@@ -0,0 +1,88 @@
+import json
+import uuid
+
+import datastore as db
+import tailored_resume_bot as bot
+
+
+def store(resume='resume text', cover='cover text', company='Acme', title='Engineer', state='pending', job_id=None):
+    return bot.store_submission('job description', 'Direct to company', company, title, 'https://example.com/job', 'Resume', 'Formal', '',
+                                ['a fact'], [], 'resume.pdf', resume, cover, state=state, job_id=job_id)
+
+
+def ids(page):
+    rows, total = page
+    return [row[0] for row in rows], total
+
+
+def test_list_is_paged_filtered_and_counted_in_sql():
+    prefix = uuid.uuid4().hex
+    subs = [store(company=f"{prefix} {n}") for n in range(5)]
+    assert ids(bot.list_submissions_page(page=1, page_size=2, company=prefix, sort='Company')) == (subs[:2], 5)
+    assert ids(bot.list_submissions_page(page=3, page_size=2, company=prefix, sort='Company')) == (subs[4:], 5)
+    assert ids(bot.list_submissions_page(page=0, page_size=2, company=prefix, sort='Newest')) == (subs[:2:-1], 5)
+    assert ids(bot.list_submissions_page(company=prefix.upper())) == (subs[::-1], 5)
+
+
+def test_state_filter_and_unknown_sort():
+    prefix = uuid.uuid4().hex
+    pending, approved = store(company=prefix), store(company=prefix, state='approved')
+    assert ids(bot.list_submissions_page(state='approved', company=prefix)) == ([approved], 1)
+    assert ids(bot.list_submissions_page(company=prefix, sort='DROP TABLE submissions')) == ([approved, pending], 2)
+
+
+def test_company_filter_is_a_literal_prefix():
+    prefix = uuid.uuid4().hex
+    literal = store(company=f"{prefix}_50%")
+    store(company=f"{prefix}x50 Labs")
+    assert ids(bot.list_submissions_page(company=f"{prefix}_5")) == ([literal], 1)
+    assert ids(bot.list_submissions_page(company=f"{prefix}_50%")) == ([literal], 1)
+
+
+def test_retried_job_updates_its_submission_instead_of_adding_one():
+    job_id = 1_000_001
+    first = store('resume, attempt 1', 'cover, attempt 1', job_id=job_id)
+    second = store('resume, attempt 2', 'cover, attempt 2', job_id=job_id)
+    assert first == second
+    assert db.query_one('SELECT COUNT(*) FROM submissions WHERE job_id = ?', (job_id,))[0] == 1
+    assert bot.load_submission_texts(first, ('tailored_resume', 'cover_letter')) == {
+        'tailored_resume': 'resume, attempt 2', 'cover_letter': 'cover, attempt 2'}
+
+
+def test_submissions_without_a_job_are_always_inserted():
+    assert store('same resume', 'same cover') != store('same resume', 'same cover')
+
+
+def test_only_outputs_scoped_to_a_change_are_regenerated():
+    stored = [('Python', 'both'), ('Led a team of five', 'cover')]
+    facts_json = json.dumps(bot.snapshot_items(stored))
+    assert bot.outputs_affected(facts_json, '[]', stored, []) == (set(), 0)
+    assert bot.outputs_affected(facts_json, '[]', stored[:1], []) == ({'cover'}, 1)
+    assert bot.outputs_affected(facts_json, '[]', stored, [('Keep it to one page', 'resume')]) == ({'resume', 'cover'}, 1)
+    assert bot.outputs_affected(facts_json, '[]', [('Python', 'cover'), stored[1]], []) == ({'resume', 'cover'}, 2)
+    # Rows written before facts had a scope stored plain strings
+    assert bot.outputs_affected('["Python"]', None, [('Python', 'both')], []) == (set(), 0)
+
+
+def test_regen_of_a_missing_submission_fails_cleanly(monkeypatch):
+    assert bot.regen_submission(999_999_999) == ("", "", "[Error] Submission not found.", 'failed')
+    # Deleted between the row lookup and loading its texts
+    sub_id = store('resume', 'cover')
+    monkeypatch.setattr(bot, 'load_submission_texts', lambda sub_id, columns: None)
+    assert bot.regen_submission(sub_id) == ("", "", "[Error] Submission not found.", 'failed')
+    assert bot.bulk_regen_item(sub_id) == ('failed', "[Error] Submission not found.")
+
+
+def test_regen_with_unchanged_facts_is_skipped():
+    sub_id = bot.store_submission('job description', 'Direct to company', 'Acme', 'Engineer', '', 'Resume', 'Formal', '',
+                                  bot.snapshot_items(bot.get_fact_items()), bot.snapshot_items(bot.get_tweak_items()),
+                                  'resume.pdf', 'stored resume', 'stored cover')
+    resume, cover, message, status = bot.regen_submission(sub_id)
+    assert (resume, cover, status) == ('stored resume', 'stored cover', 'skipped')
+    assert bot.bulk_regen_item(sub_id)[0] == 'skipped'
+
+
+def test_queued_regen_of_a_submission_deleted_while_the_job_ran(monkeypatch):
+    monkeypatch.setattr(bot.job_queue, 'run_job', lambda kind, payload: {'status': 'failed', 'error': 'worker died'})
+    monkeypatch.setattr(bot, 'load_submission_texts', lambda sub_id, columns: None)
+    assert bot.queued_regen(store('resume', 'cover')) == ("", "", "[Error] Submission not found.")
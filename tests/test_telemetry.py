@@ -0,0 +1,90 @@
+import json
+import socket
+import urllib.request
+
+import pytest
+
+import telemetry
+from pipeline import Pipeline
+from telemetry import Histogram, llm_span, recording, span
+
+
+@pytest.fixture
+def log_lines(tmp_path, monkeypatch):
+    path = tmp_path / 'spans.jsonl'
+    monkeypatch.setattr(telemetry, 'TELEMETRY_LOG', str(path))
+    monkeypatch.setattr(telemetry, '_log_file', None)
+
+    def read():
+        telemetry._log_file.flush()
+        return [json.loads(line) for line in path.read_text().splitlines()]
+    yield read
+    telemetry._log_file.close()
+
+
+def test_nested_spans_share_a_trace(log_lines):
+    with span('generate', mode='Resume') as outer:
+        with span('pdf_extract') as inner:
+            inner.set(pages=2)
+    child, parent = log_lines()
+    assert (child['name'], child['pages'], child['parent_id']) == ('pdf_extract', 2, outer.span_id)
+    assert child['trace_id'] == parent['trace_id'] == outer.trace_id
+    assert (parent['name'], parent['mode'], parent['parent_id'], parent['status']) == ('generate', 'Resume', None, 'ok')
+
+
+def test_errors_and_cancellation_are_recorded(log_lines):
+    with pytest.raises(ValueError):
+        with span('generate'):
+            raise ValueError('no resume')
+
+    def stream():
+        with recording(llm_span('openai', 'gpt-4o', [], 10)) as s:
+            s.first_token()
+            yield 'chunk'
+
+    chunks = stream()
+    next(chunks)
+    chunks.close()
+    failed, cancelled = log_lines()
+    assert (failed['status'], failed['error']) == ('error', 'ValueError: no resume')
+    assert (cancelled['name'], cancelled['status'], cancelled['prompt_tokens']) == ('llm', 'cancelled', 10)
+    assert 'ttft_ms' in cancelled
+
+
+def test_pipeline_stages_nest_under_the_creating_span(log_lines):
+    with span('generate') as outer:
+        pipeline = Pipeline().stage('resume', lambda ctx: 'r').stage('cover', lambda ctx: 'c', deps=['resume'])
+    list(pipeline.run())
+    stages = [line for line in log_lines() if line['name'].startswith('stage.')]
+    assert sorted(line['name'] for line in stages) == ['stage.cover', 'stage.resume']
+    assert all(line['parent_id'] == outer.span_id for line in stages)
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram('test_seconds', 'Test.', ('span',), buckets=(0.1, 1))
+    for value in (0.05, 0.5, 5):
+        histogram.observe(value, span='a"b')
+    assert histogram.render()[2:] == [
+        'test_seconds_bucket{span="a\\"b",le="0.1"} 1',
+        'test_seconds_bucket{span="a\\"b",le="1"} 2',
+        'test_seconds_bucket{span="a\\"b",le="+Inf"} 3',
+        'test_seconds_sum{span="a\\"b"} 5.55',
+        'test_seconds_count{span="a\\"b"} 3',
+    ]
+
+
+def test_metrics_endpoint(monkeypatch):
+    monkeypatch.setattr(telemetry, '_server', None)
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    server = telemetry.start_metrics_server(port=port)
+    try:
+        assert telemetry.start_metrics_server(port=port) is server
+        with span('metrics_probe'):
+            pass
+        body = urllib.request.urlopen(f'http://127.0.0.1:{port}/metrics').read().decode()
+        assert 'resume_bot_span_seconds_count{span="metrics_probe",status="ok"} 1' in body
+    finally:
+        server.shutdown()
+        server.server_close()